@@ -0,0 +1,69 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/circuit_breaker.py
+# Per-BMC circuit breaker. After repeated failures the breaker opens and the
+# server is left alone for an exponentially growing, jittered backoff. When the
+# backoff expires it goes half-open: one cheap probe decides whether the full
+# poll resumes (closed) or the breaker opens again with a longer backoff.
+import random
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=2, base_backoff=30, max_backoff=900, jitter=0.2, clock=time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max(base_backoff, max_backoff)
+        self.jitter = jitter
+        self._clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.probes = 0
+        self.skipped_cycles = 0
+        self._open_streak = 0
+        self._retry_at = 0.0
+
+    def allow_request(self):
+        """True if the server should be contacted now. Moves an expired OPEN breaker to HALF_OPEN."""
+        if self.state == OPEN:
+            if self._clock() < self._retry_at:
+                self.skipped_cycles += 1
+                return False
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            self.probes += 1
+        return True
+
+    def record_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._open_streak = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** self._open_streak)
+        backoff *= 1 + random.uniform(-self.jitter, self.jitter)
+        self._open_streak += 1
+        self.trips += 1
+        self.state = OPEN
+        self._retry_at = self._clock() + backoff
+
+    def seconds_until_retry(self):
+        return max(0.0, self._retry_at - self._clock()) if self.state == OPEN else 0.0
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "probes": self.probes,
+            "skipped_cycles": self.skipped_cycles,
+            "retry_in_seconds": round(self.seconds_until_retry()),
+        }
@@ -0,0 +1,114 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/discovery_registry.py
+# Remembers, per server, a hash of every MQTT discovery config it has published
+# (they are retained by the broker), persisted under DATA_DIR/discovery. After
+# a restart only configs that actually changed are sent again. A sensor that
+# stops being reported for STALE_AFTER_POLLS successful polls in a row has its
+# config removed, so a CPU reading that drops out once or twice doesn't make
+# its entity disappear. Everything is re-announced when Home Assistant sends
+# its birth message, since it may have lost the configs.
+import hashlib
+import json
+import os
+import re
+import time
+
+from .sdr_cache import write_json_atomic
+
+REGISTRY_VERSION = 1
+STALE_AFTER_POLLS = 10
+
+
+def _digest(payload):
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _safe_name(key):
+    return re.sub(r'[^a-zA-Z0-9_.-]+', '_', key)
+
+
+class DiscoveryRegistry:
+    def __init__(self, registry_dir, key, log=None):
+        self.registry_dir = registry_dir
+        self.key = key
+        self._log = log or (lambda level, message: None)
+        self.configs = {}  # config topic -> {"hash": ..., "missed": polls in a row it wasn't reported}
+        self._dirty = False
+
+    def _path(self):
+        return os.path.join(self.registry_dir, f"{_safe_name(self.key)}.json")
+
+    def load(self):
+        try:
+            with open(self._path(), 'r') as f:
+                data = json.load(f)
+        except (IOError, ValueError):  # missing, truncated or not UTF-8
+            return
+        if not isinstance(data, dict) or data.get("version") != REGISTRY_VERSION or data.get("key") != self.key:
+            return
+        self.configs = data.get("configs", {})
+        self._log("info", f"Loaded {len(self.configs)} published discovery config(s) from the registry.")
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(self.registry_dir, exist_ok=True)
+            write_json_atomic(self._path(), {
+                "version": REGISTRY_VERSION, "key": self.key,
+                "configs": self.configs, "updated": int(time.time()),
+            })
+            self._dirty = False
+        except (IOError, OSError) as e:
+            self._log("warning", f"Could not persist discovery registry: {e}")
+
+    def is_published(self, topic, payload):
+        entry = self.configs.get(topic)
+        return bool(entry and entry.get("hash") == _digest(payload))
+
+    def record(self, topic, payload):
+        self.configs[topic] = {"hash": _digest(payload), "missed": 0}
+        self._dirty = True
+
+    def invalidate(self):
+        """Treats every config as unpublished, while still remembering them for removal."""
+        for entry in self.configs.values():
+            entry["hash"] = None
+        self._dirty = True
+
+    def sweep(self, current_topics):
+        """Called once per successful poll with the configs still in use. Returns the topics to remove."""
+        stale = []
+        for topic, entry in self.configs.items():
+            missed = 0 if topic in current_topics else entry.get("missed", 0) + 1
+            if missed != entry.get("missed", 0):
+                entry["missed"] = missed
+                self._dirty = True
+            if missed >= STALE_AFTER_POLLS:
+                stale.append(topic)
+        for topic in stale:
+            del self.configs[topic]
+        return stale
+
+
+def remove_orphaned(registry_dir, keys, publish, log=None):
+    """Clears the configs of servers that are no longer configured and deletes their registries."""
+    log = log or (lambda level, message: None)
+    keep = {f"{_safe_name(key)}.json" for key in keys}
+    try:
+        names = [name for name in os.listdir(registry_dir) if name.endswith(".json") and name not in keep]
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(registry_dir, name)
+        try:
+            with open(path, 'r') as f:
+                configs = json.load(f).get("configs", {})
+        except (IOError, ValueError, AttributeError):
+            configs = {}
+        for topic in configs:
+            publish(topic, "", retain=True)
+        log("info", f"Removed {len(configs)} discovery config(s) of unconfigured server '{name[:-5]}'.")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
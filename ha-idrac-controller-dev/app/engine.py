@@ -0,0 +1,121 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/engine.py
+# Drives every ServerWorker from one asyncio event loop instead of one OS thread
+# per server. Each server is a task that sleeps on the loop between cycles; the
+# blocking IPMI/MQTT work of a cycle runs on a thread pool sized to the global
+# concurrency limit, so hundreds of idle servers cost a task each, not a thread.
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TIMEOUT_RETRY_SECONDS = 60
+CLEANUP_TIMEOUT_SECONDS = 30
+
+
+class PollingEngine:
+    def __init__(self, workers, max_concurrency=32, cycle_timeout_seconds=120):
+        self.workers = workers
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.cycle_timeout_seconds = cycle_timeout_seconds
+        self.loop = None
+        self._thread = None
+        self._tasks = []
+        self._inflight = {}
+        self._semaphore = None
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="idrac-worker")
+
+    def _log(self, level, message):
+        print(f"[{level.upper()}] [ENGINE] {message}", flush=True)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run_loop, name="idrac-engine", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self.loop.close()
+            self._executor.shutdown(wait=False)
+
+    async def _main(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._log("info", f"Polling {len(self.workers)} server(s), at most {self.max_concurrency} at a time.")
+        self._tasks = [asyncio.ensure_future(self._run_server(worker)) for worker in self.workers]
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self, timeout=60):
+        """Cancels every server task, waits for in-flight cycles and reverts each server to Dell auto fans."""
+        for worker in self.workers:
+            worker.stop()
+        if self.loop is not None and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self._cancel_all)
+            except RuntimeError:
+                pass  # loop already finished
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def _cancel_all(self):
+        for task in self._tasks:
+            task.cancel()
+
+    async def _call(self, worker, func, timeout):
+        """Runs one blocking worker step on the pool. A step that overruns `timeout` keeps its concurrency
+        slot until its thread really returns (threads can't be interrupted), so the pool never oversubscribes."""
+        async with self._semaphore:
+            future = self.loop.run_in_executor(self._executor, func)
+            self._inflight[worker] = future
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                self._log("warning", f"[{worker.alias}] {func.__name__} exceeded {timeout}s. Marking server offline once it returns.")
+                # mark_offline shares the scheduler, fan and availability state with the overrunning step,
+                # so it runs on the pool after that step's thread has returned, never alongside it
+                await asyncio.wait([future])
+                await self.loop.run_in_executor(self._executor, worker.mark_offline)
+                if future.exception() is not None:
+                    self._log("warning", f"[{worker.alias}] {func.__name__} failed after its timeout: {future.exception()}")
+                return None
+            finally:
+                if future.done():
+                    self._inflight.pop(worker, None)
+
+    async def _run_server(self, worker):
+        initialized = False
+        try:
+            while True:
+                try:
+                    initialized = await self._call(worker, worker.initialize, self.cycle_timeout_seconds)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._log("error", f"[{worker.alias}] Initialization failed: {e}. Retrying in {TIMEOUT_RETRY_SECONDS}s.")
+                    worker.mark_offline()
+                    await asyncio.sleep(TIMEOUT_RETRY_SECONDS)
+                    if not worker.running:
+                        return
+            if not initialized:
+                self._log("error", f"[{worker.alias}] Initialization failed. Stopping worker.")
+                return
+            await asyncio.sleep(worker.first_poll_delay())
+            while worker.running:
+                try:
+                    delay = await self._call(worker, worker.run_cycle, self.cycle_timeout_seconds)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._log("error", f"[{worker.alias}] Cycle failed: {e}")
+                    delay = None
+                await asyncio.sleep(TIMEOUT_RETRY_SECONDS if delay is None else delay)
+        finally:
+            # Cancellation lands while the task awaits; a cycle thread may still be talking to the BMC,
+            # so let it finish before cleanup uses the same IPMI session.
+            inflight = self._inflight.pop(worker, None)
+            if inflight is not None and not inflight.done():
+                await asyncio.wait([inflight], timeout=self.cycle_timeout_seconds)
+            if initialized:
+                cleanup = self.loop.run_in_executor(self._executor, worker.cleanup)
+                await asyncio.wait([cleanup], timeout=CLEANUP_TIMEOUT_SECONDS)
@@ -0,0 +1,108 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/event_hub.py
+# Pushes status changes to open dashboards as Server-Sent Events. One fan-out
+# thread waits on the StatusStore, formats each changed server once, and hands
+# the same message to every subscriber, so the cost of a change doesn't grow
+# with the number of open dashboards. Each subscriber has a small bounded
+# queue; one that falls behind is dropped rather than buffered without limit, and
+# its browser reconnects with Last-Event-ID to fetch what it missed.
+# Every event's id is the version of that server's own change, and events go
+# out oldest first, so whatever id a client last saw, everything it never got
+# is newer than that id.
+import json
+import queue
+import threading
+import time
+
+
+class _Subscriber:
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class EventHub:
+    def __init__(self, store, render, max_clients=32, queue_size=64, coalesce_seconds=0.2, keepalive_seconds=15, log=None):
+        self.store = store
+        self.render = render  # entry -> HTML of its dashboard card
+        self.max_clients = max_clients
+        self.queue_size = queue_size
+        self.coalesce_seconds = coalesce_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self._log = log or (lambda level, message: print(f"[{level.upper()}] [WEB] {message}", flush=True))
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self.events_sent = 0
+        self.clients_dropped = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sse-hub", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        version = self.store.version
+        while True:
+            try:
+                if self.store.wait_for_change(version, timeout=5) == version or not self._subscribers:
+                    version = self.store.version
+                    continue
+                # A cycle updates the store more than once; wait a moment so it goes out as one event
+                time.sleep(self.coalesce_seconds)
+                latest, changes = self.store.changes_since(version)
+                for entry_version, entry in changes:
+                    self.publish(self.format(entry_version, entry))
+                version = latest
+            except Exception as e:
+                # Skip past whatever failed to render rather than retrying it forever; the next change re-sends the server
+                self._log("error", f"Could not push status events ({type(e).__name__}: {e}).")
+                version = self.store.version
+                time.sleep(1)
+
+    def format(self, version, entry):
+        """One `server` event; `version` is the version of this server's change, used as the event id."""
+        data = json.dumps({"alias": entry.get("alias"), "html": self.render(entry)})
+        return f"id: {self.store.epoch}-{version}\nevent: server\ndata: {data}\n\n"
+
+    # --- Subscribers ---
+    def subscribe(self):
+        """A new subscriber, or None when max_clients are already connected."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscriber = _Subscriber(self.queue_size)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+                self.events_sent += 1
+            except queue.Full:
+                subscriber.dropped = True
+                self.unsubscribe(subscriber)
+                self.clients_dropped += 1
+
+    def stream(self, subscriber, backlog=()):
+        """The response body for one subscriber: its backlog, then live events, with keepalive comments in between."""
+        try:
+            yield "retry: 5000\n\n"
+            for message in backlog:
+                yield message
+            while not subscriber.dropped:
+                try:
+                    yield subscriber.queue.get(timeout=self.keepalive_seconds)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {"clients": len(self._subscribers), "events_sent": self.events_sent, "clients_dropped": self.clients_dropped}
@@ -0,0 +1,85 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/fan_actuator.py
+# Remembers the fan mode and speed last confirmed on a BMC and only sends the
+# IPMI writes a real change needs. State is re-asserted periodically and after
+# the session to the BMC is re-established, since an iDRAC reset puts the fans
+# back into Dell auto mode without telling us.
+import time
+
+MODE_AUTO = "auto"
+MODE_MANUAL = "manual"
+
+
+class FanActuator:
+    def __init__(self, ipmi, reassert_seconds=300, log=None):
+        self.ipmi = ipmi
+        self.reassert_seconds = reassert_seconds
+        self._log = log or (lambda level, message: None)
+        self.mode = None
+        self.speed = None
+        self._confirmed_at = 0.0
+        self._generation = ipmi.connection_generation
+        self.writes_sent = 0
+        self.writes_skipped = 0
+
+    def invalidate(self):
+        """Forget the confirmed state, so the next request is written in full."""
+        self.mode = None
+        self.speed = None
+
+    def _reassert_due(self):
+        generation = self.ipmi.connection_generation
+        if generation != self._generation:
+            self._generation = generation
+            if self.mode is not None:
+                self._log("info", "BMC session was re-established. Re-asserting fan state.")
+            self.invalidate()
+        return self.mode is not None and time.monotonic() - self._confirmed_at >= self.reassert_seconds
+
+    def _confirmed(self, mode, speed):
+        self.mode = mode
+        self.speed = speed
+        self._confirmed_at = time.monotonic()
+        self._generation = self.ipmi.connection_generation
+
+    def set_auto(self):
+        """Hands fan control back to the iDRAC. Returns False if the write failed."""
+        if self.mode == MODE_AUTO and not self._reassert_due():
+            self.writes_skipped += 1
+            return True
+        self.writes_sent += 1
+        if self.ipmi.apply_dell_fan_control_profile() is None:
+            self.invalidate()
+            return False
+        self._confirmed(MODE_AUTO, None)
+        return True
+
+    def set_manual(self, speed):
+        """Sets a static fan speed (percent). Returns False if a write failed."""
+        speed = max(0, min(100, int(speed)))
+        reassert = self._reassert_due()
+
+        if self.mode != MODE_MANUAL or reassert:
+            self._log("info", f"Applying user static fan control: {speed}%")
+            self.writes_sent += 1
+            if self.ipmi.enable_manual_fan_control() is None:
+                self.invalidate()
+                return False
+            self._confirmed(MODE_MANUAL, None)
+            # The iDRAC ignores a speed written right after the mode switch.
+            time.sleep(0.5)
+        else:
+            self.writes_skipped += 1
+
+        if self.speed != speed:
+            self.writes_sent += 1
+            if self.ipmi.set_fan_speed(speed) is None:
+                self.invalidate()
+                return False
+            self._confirmed(MODE_MANUAL, speed)
+        else:
+            self.writes_skipped += 1
+        return True
+
+    def stats(self):
+        return {"mode": self.mode, "speed": self.speed,
+                "writes_sent": self.writes_sent, "writes_skipped": self.writes_skipped}
@@ -0,0 +1,62 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/fru_cache.py
+# Server model info (from `ipmitool fru`) persisted per iDRAC IP together with
+# the BMC's identity from Get Device ID. Workers start from the cached model
+# straight away; the FRU is only read again when the identity stops matching.
+import json
+import os
+import re
+import time
+
+from .sdr_cache import write_json_atomic
+
+CACHE_VERSION = 1
+IDENTITY_FIELDS = ("manufacturer_id", "product_id", "device_id", "firmware")
+
+
+def bmc_identity(device_id):
+    """The Get Device ID fields that change when the board or its firmware is swapped."""
+    if not device_id:
+        return None
+    return {field: device_id.get(field) for field in IDENTITY_FIELDS}
+
+
+class FruCache:
+    def __init__(self, cache_dir, ip, log=None):
+        self.cache_dir = cache_dir
+        self.ip = ip
+        self._log = log or (lambda level, message: None)
+        self.identity = None
+        self.model_info = None
+
+    def _path(self):
+        safe = re.sub(r'[^a-zA-Z0-9_.-]+', '_', self.ip)
+        return os.path.join(self.cache_dir, f"{safe}.json")
+
+    def load(self):
+        """Returns the cached model info for this IP, or None."""
+        try:
+            with open(self._path(), 'r') as f:
+                data = json.load(f)
+        except (IOError, ValueError):  # missing, truncated or not UTF-8
+            return None
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION or data.get("ip") != self.ip or not data.get("model_info"):
+            return None
+        self.identity = data.get("identity")
+        self.model_info = data["model_info"]
+        self._log("info", f"Using cached model info: {self.model_info.get('model')}")
+        return self.model_info
+
+    def matches(self, identity):
+        return bool(self.model_info and identity and self.identity == identity)
+
+    def store(self, identity, model_info):
+        self.identity = identity
+        self.model_info = model_info
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_json_atomic(self._path(), {
+                "version": CACHE_VERSION, "ip": self.ip, "identity": identity,
+                "model_info": model_info, "updated": int(time.time()),
+            })
+        except (IOError, OSError) as e:
+            self._log("warning", f"Could not persist FRU cache: {e}")
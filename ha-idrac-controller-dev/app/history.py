@@ -0,0 +1,202 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/history.py
+# Recent sensor history per server in fixed-size ring buffers, for sparklines
+# and the history API. Three tiers are kept: every poll ("raw"), and min/mean/max
+# rollups per minute ("1m") and per 15 minutes ("15m"). Values are stored in
+# `array` buffers as 16-bit integers (temperatures in tenths of a degree), and
+# each tier's timestamps are shared by all of a server's sensors, so a server
+# costs a few kilobytes per sensor however long the add-on runs.
+import threading
+from array import array
+
+MISSING = -32768
+RAW_POINTS = 120
+MINUTE_POINTS = 180
+QUARTER_POINTS_PER_DAY = 96
+RESOLUTIONS = {"raw": 0, "1m": 60, "15m": 900}
+
+
+def scale_for(sensor):
+    """Temperatures are kept to 0.1 °C; RPM, watts and percentages to whole units."""
+    return 10 if sensor.endswith("_temp") else 1
+
+
+def encode_value(value, scale):
+    if type(value) not in (int, float) or value != value:  # None, "Dell Auto", NaN
+        return MISSING
+    value = round(value * scale)
+    return value if -32767 <= value <= 32767 else (32767 if value > 0 else -32767)
+
+
+def decode_value(stored, scale):
+    if stored == MISSING:
+        return None
+    return stored / scale if scale != 1 else stored
+
+
+class _Tier:
+    """One ring of timestamps plus, per sensor, one value ring (raw) or min/mean/max rings (rollups)."""
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.width = width
+        self.times = array('I', [0] * capacity)
+        self.series = {}
+        self.head = 0  # next slot to write
+        self.count = 0
+        self.bucket = None  # start of the rollup bucket being accumulated
+        self.acc = {}  # sensor -> [min, max, sum, n] for that bucket
+
+    def _rings(self, sensor):
+        rings = self.series.get(sensor)
+        if rings is None:
+            rings = tuple(array('h', [MISSING] * self.capacity) for _ in range(1 if self.width == 0 else 3))
+            self.series[sensor] = rings
+        return rings
+
+    def _advance(self, timestamp):
+        slot = self.head
+        self.times[slot] = timestamp
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return slot
+
+    def add_raw(self, timestamp, encoded):
+        for sensor in encoded.keys() - self.series.keys():
+            self._rings(sensor)
+        slot = self._advance(timestamp)
+        for sensor, rings in self.series.items():
+            rings[0][slot] = encoded.get(sensor, MISSING)
+
+    def accumulate(self, timestamp, encoded):
+        bucket = timestamp - timestamp % self.width
+        if self.bucket is not None and bucket != self.bucket:
+            self._close_bucket()
+        self.bucket = bucket
+        for sensor, value in encoded.items():
+            if value == MISSING:
+                continue
+            acc = self.acc.get(sensor)
+            if acc is None:
+                self.acc[sensor] = [value, value, value, 1]
+                continue
+            if value < acc[0]:
+                acc[0] = value
+            elif value > acc[1]:
+                acc[1] = value
+            acc[2] += value
+            acc[3] += 1
+
+    def _close_bucket(self):
+        for sensor in self.acc.keys() - self.series.keys():
+            self._rings(sensor)
+        slot = self._advance(self.bucket)
+        for sensor, (low, mean, high) in self.series.items():
+            acc = self.acc.get(sensor)
+            if acc:
+                low[slot], high[slot], mean[slot] = acc[0], acc[1], int(round(acc[2] / acc[3]))
+            else:
+                low[slot] = mean[slot] = high[slot] = MISSING
+        self.acc = {}
+
+    def read(self, sensors, points):
+        """(times, {sensor: values}) for the newest `points` slots, oldest first; rollups include the open bucket."""
+        count = min(self.count, points)
+        slots = [(self.head - count + i) % self.capacity for i in range(count)]
+        times = [self.times[slot] for slot in slots]
+        data = {}
+        for sensor in sensors:
+            scale = scale_for(sensor)
+            rings = self.series.get(sensor)
+            if rings is None and sensor not in self.acc:
+                continue
+            if self.width == 0:
+                data[sensor] = [decode_value(rings[0][slot], scale) for slot in slots]
+                continue
+            columns = [[decode_value(ring[slot], scale) for slot in slots] for ring in rings] if rings else [[None] * count for _ in range(3)]
+            data[sensor] = {"min": columns[0], "mean": columns[1], "max": columns[2]}
+        if self.width and self.bucket is not None:
+            times = (times + [self.bucket])[-points:]
+            for sensor, columns in data.items():
+                acc = self.acc.get(sensor)
+                current = (acc[0], int(round(acc[2] / acc[3])), acc[1]) if acc else (MISSING,) * 3
+                for key, stored in zip(("min", "mean", "max"), current):
+                    columns[key] = (columns[key] + [decode_value(stored, scale_for(sensor))])[-points:]
+        return times, data
+
+    def memory_bytes(self):
+        arrays = [self.times] + [ring for rings in self.series.values() for ring in rings]
+        return sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+
+
+class ServerHistory:
+    def __init__(self, days=2):
+        self._lock = threading.Lock()
+        self._scales = {}
+        self.tiers = {
+            "raw": _Tier(RAW_POINTS, 0),
+            "1m": _Tier(MINUTE_POINTS, 60),
+            "15m": _Tier(max(1, int(days * QUARTER_POINTS_PER_DAY)), 900),
+        }
+
+    def record(self, timestamp, values):
+        timestamp = int(timestamp)
+        scales = self._scales
+        encoded = {}
+        for sensor, value in values.items():
+            scale = scales.get(sensor)
+            if scale is None:
+                scale = scales[sensor] = scale_for(sensor)
+            encoded[sensor] = encode_value(value, scale)
+        with self._lock:
+            self.tiers["raw"].add_raw(timestamp, encoded)
+            self.tiers["1m"].accumulate(timestamp, encoded)
+            self.tiers["15m"].accumulate(timestamp, encoded)
+
+    def sensors(self):
+        with self._lock:
+            return sorted(set(self.tiers["raw"].series) | set(self.tiers["1m"].series) | set(self.tiers["1m"].acc))
+
+    def query(self, sensors=None, resolution="raw", points=None):
+        tier = self.tiers[resolution]
+        with self._lock:
+            sensors = sensors or sorted(set(tier.series) | set(tier.acc))
+            return tier.read(sensors, min(points or tier.capacity, tier.capacity))
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(tier.memory_bytes() for tier in self.tiers.values())
+
+
+class HistoryStore:
+    """Every server's ServerHistory, keyed by alias. With days=0 nothing is recorded."""
+
+    def __init__(self, days=2):
+        self.days = days
+        self._servers = {}
+        self._lock = threading.Lock()
+
+    def configure(self, days):
+        """Sets how many days of 15-minute rollups each server keeps. Call before anything is recorded."""
+        self.days = days
+
+    @property
+    def enabled(self):
+        return self.days > 0
+
+    def record(self, alias, timestamp, values):
+        if not self.enabled:
+            return
+        with self._lock:
+            history = self._servers.get(alias)
+            if history is None:
+                history = self._servers[alias] = ServerHistory(self.days)
+        history.record(timestamp, values)
+
+    def get(self, alias):
+        with self._lock:
+            return self._servers.get(alias)
+
+    def memory_bytes(self):
+        with self._lock:
+            servers = list(self._servers.values())
+        return sum(history.memory_bytes() for history in servers)
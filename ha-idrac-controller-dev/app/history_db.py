@@ -0,0 +1,306 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/history_db.py
+# Optional on-disk sensor history in an SQLite database (WAL mode), so readings
+# survive restarts and can be studied for fan-curve tuning without Home
+# Assistant's recorder. Each cycle of a server is one row: its readings packed
+# as 16-bit integers like the in-memory history, with the list of sensor names
+# stored once per layout. The workers only queue rows; one writer thread inserts
+# everything queued in a single transaction per flush, so the cost of a flush
+# grows with the number of servers and not the number of sensors.
+# Settled 5-minute buckets are rolled up from raw rows, and hourly ones from
+# 5-minute rows (min/mean/max per sensor). Each table is trimmed to its own
+# retention once an hour.
+import json
+import sqlite3
+import threading
+import time
+from array import array
+
+from .history import MISSING, decode_value, encode_value, scale_for
+
+RESOLUTIONS = ("raw", "5m", "1h")
+TABLES = {"raw": "raw", "5m": "rollup_5m", "1h": "rollup_1h"}
+ROLLUPS = [("raw", "5m", 300), ("5m", "1h", 3600)]  # (source, target, bucket width)
+DEFAULT_RETENTION = {"raw": 24 * 3600, "5m": 30 * 86400, "1h": 365 * 86400}
+DEFAULT_WINDOW = {"raw": 3600, "5m": 86400, "1h": 30 * 86400}  # what a query returns without from/to
+SETTLE_SECONDS = 180  # rows can be queued this long after their cycle started (cycle timeout plus a flush)
+RETENTION_CHECK_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS servers (id INTEGER PRIMARY KEY, alias TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS layouts (id INTEGER PRIMARY KEY, sensors TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+CREATE TABLE IF NOT EXISTS raw (
+    server_id INTEGER NOT NULL, ts INTEGER NOT NULL, layout_id INTEGER NOT NULL, vals BLOB NOT NULL,
+    PRIMARY KEY (server_id, ts)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_5m (
+    server_id INTEGER NOT NULL, ts INTEGER NOT NULL, layout_id INTEGER NOT NULL, samples INTEGER NOT NULL,
+    mins BLOB NOT NULL, means BLOB NOT NULL, maxs BLOB NOT NULL,
+    PRIMARY KEY (server_id, ts)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_1h (
+    server_id INTEGER NOT NULL, ts INTEGER NOT NULL, layout_id INTEGER NOT NULL, samples INTEGER NOT NULL,
+    mins BLOB NOT NULL, means BLOB NOT NULL, maxs BLOB NOT NULL,
+    PRIMARY KEY (server_id, ts)) WITHOUT ROWID;
+"""
+
+
+def _pack(values):
+    return array('h', values).tobytes()
+
+
+def _unpack(blob):
+    values = array('h')
+    values.frombytes(blob)
+    return values
+
+
+class HistoryDatabase:
+    def __init__(self, path, retention=None, flush_seconds=15, log=None):
+        self.path = path
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
+        self.flush_seconds = flush_seconds
+        self._log = log or (lambda level, message: None)
+        self._db = None
+        self._lock = threading.Lock()
+        self._pending = []  # (alias, timestamp, values) queued by the workers
+        self._stop = threading.Event()
+        self._thread = None
+        self._servers = {}  # alias -> id
+        self._layouts = {}  # tuple of sensor names -> id
+        self._layout_names = {}  # id -> tuple of sensor names
+        self._retention_checked = 0.0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.rollups_written = 0
+
+    # --- Lifecycle ---
+    def open(self):
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # with WAL, a power cut can lose the last commits but not corrupt the file
+        self._db.executescript(SCHEMA)
+        self._load_ids()
+
+    def _load_ids(self):
+        self._servers = dict(self._db.execute("SELECT alias, id FROM servers"))
+        self._layout_names = {i: tuple(json.loads(sensors)) for i, sensors in self._db.execute("SELECT id, sensors FROM layouts")}
+        self._layouts = {names: i for i, names in self._layout_names.items()}
+
+    def start(self):
+        self.open()
+        self._thread = threading.Thread(target=self._run, name="history-db", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+            self.maintain()
+
+    def stop(self):
+        """Writes what is still queued and closes the database."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+        if self._db:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    # --- Writing ---
+    def enqueue(self, alias, timestamp, values):
+        with self._lock:
+            self._pending.append((alias, int(timestamp), values))
+
+    def _server_id(self, alias):
+        server_id = self._servers.get(alias)
+        if server_id is None:
+            server_id = self._db.execute("INSERT INTO servers (alias) VALUES (?)", (alias,)).lastrowid
+            self._servers[alias] = server_id
+        return server_id
+
+    def _layout_id(self, names):
+        layout_id = self._layouts.get(names)
+        if layout_id is None:
+            layout_id = self._db.execute("INSERT INTO layouts (sensors) VALUES (?)", (json.dumps(names),)).lastrowid
+            self._layouts[names] = layout_id
+            self._layout_names[layout_id] = names
+        return layout_id
+
+    def flush(self):
+        """Inserts every queued row in one transaction. Returns the number of rows written."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        start = time.perf_counter()
+        try:
+            with self._db:
+                rows = []
+                for alias, timestamp, values in pending:
+                    names = tuple(sorted(values))
+                    encoded = _pack([encode_value(values[name], scale_for(name)) for name in names])
+                    rows.append((self._server_id(alias), timestamp, self._layout_id(names), encoded))
+                self._db.executemany("INSERT OR REPLACE INTO raw (server_id, ts, layout_id, vals) VALUES (?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            self._load_ids()  # ids added in the rolled-back transaction are gone too
+            self.rows_dropped += len(pending)
+            self._log("warning", f"Could not write {len(pending)} history row(s) to {self.path}: {e}")
+            return 0
+        self.rows_written += len(rows)
+        self.flushes += 1
+        self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+        return len(rows)
+
+    # --- Rollups and retention ---
+    def maintain(self, now=None):
+        now = int(now if now is not None else time.time())
+        try:
+            for source, target, width in ROLLUPS:
+                self._roll_up(source, target, width, now)
+            if now - self._retention_checked >= RETENTION_CHECK_SECONDS:
+                self._retention_checked = now
+                self._apply_retention(now)
+        except sqlite3.Error as e:
+            self._load_ids()
+            self._log("warning", f"History database maintenance failed: {e}")
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _roll_up(self, source, target, width, now):
+        """Rolls every settled bucket since the last run from `source` into `target`, one transaction per bucket."""
+        end = (now - SETTLE_SECONDS) // width * width
+        if source != "raw":
+            end = min(end, (self._meta(f"rolled_{source}") or 0) // width * width)  # only once the source is complete
+        rolled = self._meta(f"rolled_{target}") or 0
+        if rolled >= end:
+            return
+        start = self._first_row(source, rolled)
+        if start is None or start >= end:
+            # Nothing settled to roll up: move past the empty buckets, so the next tier isn't held back
+            with self._db:
+                self._set_rolled(target, end)
+            return
+        # Skips straight over a gap (the add-on was stopped) instead of walking every empty bucket in it
+        start = start // width * width
+        server_ids = list(self._servers.values())
+        for bucket in range(start, end, width):
+            with self._db:
+                rows = self._rollup_bucket(source, server_ids, bucket, bucket + width)
+                self._db.executemany(f"INSERT OR REPLACE INTO {TABLES[target]} (server_id, ts, layout_id, samples, mins, means, maxs) "
+                                     f"VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._set_rolled(target, bucket + width)
+            self.rollups_written += len(rows)
+
+    def _set_rolled(self, target, until):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (f"rolled_{target}", until))
+
+    def _first_row(self, source, since):
+        """The oldest timestamp at or after `since` in `source`, looked up per server so it uses the primary key."""
+        firsts = [self._db.execute(f"SELECT MIN(ts) FROM {TABLES[source]} WHERE server_id = ? AND ts >= ?", (i, since)).fetchone()[0]
+                  for i in self._servers.values()]
+        firsts = [ts for ts in firsts if ts is not None]
+        return min(firsts) if firsts else None
+
+    def _read_bucket(self, source, server_id, start, end):
+        """{layout id: [(samples, mins, means, maxs), ...]} for one server's rows in [start, end). A raw row is its own min, mean and max."""
+        groups = {}
+        if source == "raw":
+            for layout_id, vals in self._db.execute("SELECT layout_id, vals FROM raw WHERE server_id = ? AND ts >= ? AND ts < ?",
+                                                    (server_id, start, end)):
+                values = _unpack(vals)
+                groups.setdefault(layout_id, []).append((1, values, values, values))
+            return groups
+        for layout_id, samples, mins, means, maxs in self._db.execute(
+                f"SELECT layout_id, samples, mins, means, maxs FROM {TABLES[source]} WHERE server_id = ? AND ts >= ? AND ts < ?",
+                (server_id, start, end)):
+            groups.setdefault(layout_id, []).append((samples, _unpack(mins), _unpack(means), _unpack(maxs)))
+        return groups
+
+    def _rollup_bucket(self, source, server_ids, start, end):
+        rows = []
+        for server_id in server_ids:
+            groups = self._read_bucket(source, server_id, start, end)
+            sensors = {}  # sensor -> [min, max, weighted sum, weight]
+            samples = 0
+            for layout_id, group in groups.items():
+                counts = [row[0] for row in group]
+                samples += sum(counts)
+                # Column by column: one sensor's values across the bucket's rows
+                columns = zip(zip(*(row[1] for row in group)), zip(*(row[2] for row in group)), zip(*(row[3] for row in group)))
+                for name, (mins, means, maxs) in zip(self._layout_names[layout_id], columns):
+                    weights = counts
+                    if MISSING in means:
+                        present = [i for i, mean in enumerate(means) if mean != MISSING]
+                        if not present:
+                            continue
+                        mins, means, maxs = [mins[i] for i in present], [means[i] for i in present], [maxs[i] for i in present]
+                        weights = [counts[i] for i in present]
+                    weighted = sum(means) if source == "raw" else sum(m * w for m, w in zip(means, weights))
+                    entry = sensors.get(name)
+                    if entry is None:
+                        sensors[name] = [min(mins), max(maxs), weighted, sum(weights)]
+                        continue
+                    entry[0] = min(entry[0], min(mins))
+                    entry[1] = max(entry[1], max(maxs))
+                    entry[2] += weighted
+                    entry[3] += sum(weights)
+            if not sensors:
+                continue
+            names = tuple(sorted(sensors))
+            columns = [[sensors[name][0] for name in names],
+                       [int(round(sensors[name][2] / sensors[name][3])) for name in names],
+                       [sensors[name][1] for name in names]]
+            rows.append((server_id, start, self._layout_id(names), samples, *(_pack(c) for c in columns)))
+        return rows
+
+    def _apply_retention(self, now):
+        server_ids = list(self._servers.values())
+        with self._db:
+            for tier, table in TABLES.items():
+                cutoff = now - self.retention[tier]
+                self._db.executemany(f"DELETE FROM {table} WHERE server_id = ? AND ts < ?", [(i, cutoff) for i in server_ids])
+
+    # --- Reading ---
+    def query(self, alias, sensors=None, resolution="raw", start=None, end=None):
+        """(times, {sensor: values}) between start and end (default: the last DEFAULT_WINDOW), shaped like ServerHistory.query."""
+        end = int(end if end is not None else time.time())
+        start = int(start if start is not None else end - DEFAULT_WINDOW[resolution])
+        # A connection of its own, so web requests read alongside the writer (WAL) without sharing its connection
+        db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            row = db.execute("SELECT id FROM servers WHERE alias = ?", (alias,)).fetchone()
+            if row is None:
+                return None
+            layouts = {i: tuple(json.loads(s)) for i, s in db.execute("SELECT id, sensors FROM layouts")}
+            if resolution == "raw":
+                rows = db.execute("SELECT ts, layout_id, vals FROM raw WHERE server_id = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                                  (row[0], start, end)).fetchall()
+            else:
+                rows = db.execute(f"SELECT ts, layout_id, mins, means, maxs FROM {TABLES[resolution]} "
+                                  f"WHERE server_id = ? AND ts >= ? AND ts <= ? ORDER BY ts", (row[0], start, end)).fetchall()
+        finally:
+            db.close()
+
+        names = sensors or sorted({name for _, layout_id, *_ in rows for name in layouts[layout_id]})
+        times = [r[0] for r in rows]
+        data = {name: [] if resolution == "raw" else {"min": [], "mean": [], "max": []} for name in names}
+        for _, layout_id, *blobs in rows:
+            index = {name: i for i, name in enumerate(layouts[layout_id])}
+            columns = [_unpack(blob) for blob in blobs]
+            for name in names:
+                i = index.get(name)
+                if resolution == "raw":
+                    data[name].append(decode_value(columns[0][i], scale_for(name)) if i is not None else None)
+                    continue
+                for key, column in zip(("min", "mean", "max"), columns):
+                    data[name][key].append(decode_value(column[i], scale_for(name)) if i is not None else None)
+        return times, data
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {"rows_written": self.rows_written, "rows_dropped": self.rows_dropped, "rows_pending": pending,
+                "flushes": self.flushes, "last_flush_ms": self.last_flush_ms, "rollups_written": self.rollups_written}
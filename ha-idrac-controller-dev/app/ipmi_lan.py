@@ -0,0 +1,481 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/ipmi_lan.py
+# Native IPMI v2.0 / RMCP+ ("lanplus") client. Keeps one authenticated session
+# open per BMC so that readings and fan writes don't pay for an ipmitool
+# process spawn and a full RAKP handshake on every call.
+import hmac
+import os
+import socket
+import struct
+import threading
+import time
+
+RMCP_HEADER = b"\x06\x00\xff\x07"
+AUTH_TYPE_RMCP_PLUS = 0x06
+
+PAYLOAD_IPMI = 0x00
+PAYLOAD_OPEN_SESSION_REQUEST = 0x10
+PAYLOAD_OPEN_SESSION_RESPONSE = 0x11
+PAYLOAD_RAKP1 = 0x12
+PAYLOAD_RAKP2 = 0x13
+PAYLOAD_RAKP3 = 0x14
+PAYLOAD_RAKP4 = 0x15
+
+BMC_ADDRESS = 0x20
+REMOTE_CONSOLE_ADDRESS = 0x81
+
+PRIVILEGE_LEVELS = {"callback": 0x01, "user": 0x02, "operator": 0x03, "administrator": 0x04}
+
+# suite id: (auth algorithm, integrity algorithm, confidentiality algorithm, hash)
+CIPHER_SUITES = {
+    1: (0x01, 0x00, 0x00, "sha1"),
+    2: (0x01, 0x01, 0x00, "sha1"),
+    3: (0x01, 0x01, 0x01, "sha1"),
+    17: (0x03, 0x04, 0x01, "sha256"),
+}
+# Truncated HMAC length used for the RAKP4 ICV and per-packet integrity.
+ICV_LENGTHS = {"sha1": 12, "sha256": 16}
+
+RAKP_STATUS_CODES = {
+    0x01: "insufficient resources to create a session",
+    0x02: "invalid session ID",
+    0x03: "invalid payload type",
+    0x04: "invalid authentication algorithm",
+    0x05: "invalid integrity algorithm",
+    0x06: "no matching authentication payload",
+    0x07: "no matching integrity payload",
+    0x08: "inactive session ID",
+    0x09: "invalid role",
+    0x0A: "unauthorized role or privilege level requested",
+    0x0B: "insufficient resources to create a session at the requested role",
+    0x0C: "invalid name length",
+    0x0D: "unauthorized name",
+    0x0E: "unauthorized GUID",
+    0x0F: "invalid integrity check value",
+    0x10: "invalid confidentiality algorithm",
+    0x11: "no cipher suite match with proposed security algorithms",
+    0x12: "illegal or unrecognized parameter",
+}
+# The BMC is out of session slots (typically until stale sessions from a crashed client time out); worth retrying
+RAKP_RESOURCE_STATUSES = {0x01, 0x0B}
+
+
+class IpmiLanError(Exception):
+    """Transport-level failure: the BMC did not answer or the packet was bad."""
+
+
+class IpmiSessionRejected(IpmiLanError):
+    """The BMC answered but refused the session (credentials, cipher suite, role)."""
+
+
+class NativeUnsupported(Exception):
+    """The native transport can't carry this request; the caller should use ipmitool for it."""
+
+
+# --- AES-128-CBC (pure Python; the payloads are tiny so speed is irrelevant) ---
+def _build_aes_tables():
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        p = (p ^ (p << 1) ^ (0x1B if p & 0x80 else 0)) & 0xFF
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xFF
+        if q & 0x80:
+            q ^= 0x09
+        x = q ^ ((q << 1 | q >> 7) & 0xFF) ^ ((q << 2 | q >> 6) & 0xFF) ^ ((q << 3 | q >> 5) & 0xFF) ^ ((q << 4 | q >> 4) & 0xFF)
+        sbox[p] = x ^ 0x63
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    inv_sbox = [0] * 256
+    for i, v in enumerate(sbox):
+        inv_sbox[v] = i
+
+    def gmul(a, b):
+        r = 0
+        while b:
+            if b & 1:
+                r ^= a
+            a = ((a << 1) ^ 0x1B) & 0xFF if a & 0x80 else a << 1
+            b >>= 1
+        return r
+
+    muls = {n: [gmul(i, n) for i in range(256)] for n in (2, 3, 9, 11, 13, 14)}
+    return sbox, inv_sbox, muls
+
+_SBOX, _INV_SBOX, _MUL = _build_aes_tables()
+_RCON = [0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1B, 0x36]
+
+
+def _aes_expand_key(key):
+    words = [list(key[i:i + 4]) for i in range(0, 16, 4)]
+    for i in range(4, 44):
+        t = list(words[i - 1])
+        if i % 4 == 0:
+            t = [_SBOX[b] for b in t[1:] + t[:1]]
+            t[0] ^= _RCON[i // 4 - 1]
+        words.append([a ^ b for a, b in zip(words[i - 4], t)])
+    return [sum(words[r * 4:r * 4 + 4], []) for r in range(11)]
+
+
+def _aes_encrypt_block(round_keys, block):
+    s = [b ^ k for b, k in zip(block, round_keys[0])]
+    m2, m3 = _MUL[2], _MUL[3]
+    for rnd in range(1, 11):
+        s = [_SBOX[b] for b in s]
+        s = [s[(i + 4 * (i % 4)) % 16] for i in range(16)]
+        if rnd != 10:
+            out = []
+            for c in range(0, 16, 4):
+                a0, a1, a2, a3 = s[c:c + 4]
+                out += [m2[a0] ^ m3[a1] ^ a2 ^ a3, a0 ^ m2[a1] ^ m3[a2] ^ a3,
+                        a0 ^ a1 ^ m2[a2] ^ m3[a3], m3[a0] ^ a1 ^ a2 ^ m2[a3]]
+            s = out
+        s = [b ^ k for b, k in zip(s, round_keys[rnd])]
+    return bytes(s)
+
+
+def _aes_decrypt_block(round_keys, block):
+    s = [b ^ k for b, k in zip(block, round_keys[10])]
+    m9, m11, m13, m14 = _MUL[9], _MUL[11], _MUL[13], _MUL[14]
+    for rnd in range(9, -1, -1):
+        s = [s[(i - 4 * (i % 4)) % 16] for i in range(16)]
+        s = [_INV_SBOX[b] for b in s]
+        s = [b ^ k for b, k in zip(s, round_keys[rnd])]
+        if rnd != 0:
+            out = []
+            for c in range(0, 16, 4):
+                a0, a1, a2, a3 = s[c:c + 4]
+                out += [m14[a0] ^ m11[a1] ^ m13[a2] ^ m9[a3], m9[a0] ^ m14[a1] ^ m11[a2] ^ m13[a3],
+                        m13[a0] ^ m9[a1] ^ m14[a2] ^ m11[a3], m11[a0] ^ m13[a1] ^ m9[a2] ^ m14[a3]]
+            s = out
+    return bytes(s)
+
+
+def aes_cbc_encrypt(key, iv, data):
+    round_keys = _aes_expand_key(key)
+    out, prev = bytearray(), iv
+    for i in range(0, len(data), 16):
+        prev = _aes_encrypt_block(round_keys, bytes(a ^ b for a, b in zip(data[i:i + 16], prev)))
+        out += prev
+    return bytes(out)
+
+
+def aes_cbc_decrypt(key, iv, data):
+    round_keys = _aes_expand_key(key)
+    out, prev = bytearray(), iv
+    for i in range(0, len(data), 16):
+        block = data[i:i + 16]
+        out += bytes(a ^ b for a, b in zip(_aes_decrypt_block(round_keys, block), prev))
+        prev = block
+    return bytes(out)
+
+
+# --- IPMI message framing (shared with the BMC stand-in in tools/fake_bmc.py) ---
+def ipmi_checksum(data):
+    return (-sum(data)) & 0xFF
+
+
+def build_ipmi_request(netfn, cmd, data, rq_seq, lun=0):
+    header = bytes([BMC_ADDRESS, (netfn << 2) | (lun & 0x03)])
+    body = bytes([REMOTE_CONSOLE_ADDRESS, (rq_seq << 2) & 0xFF, cmd]) + bytes(data)
+    return header + bytes([ipmi_checksum(header)]) + body + bytes([ipmi_checksum(body)])
+
+
+def parse_ipmi_response(message):
+    """Returns (rq_seq, netfn, cmd, completion_code, data) for a LAN response message."""
+    if len(message) < 8:
+        raise IpmiLanError(f"Short IPMI response ({len(message)} bytes)")
+    if ipmi_checksum(message[:2]) != message[2] or ipmi_checksum(message[3:-1]) != message[-1]:
+        raise IpmiLanError("IPMI response checksum mismatch")
+    return message[4] >> 2, message[1] >> 2, message[5], message[6], bytes(message[7:-1])
+
+
+def encrypt_payload(key, payload):
+    pad_len = (16 - (len(payload) + 1) % 16) % 16
+    plain = payload + bytes(range(1, pad_len + 1)) + bytes([pad_len])
+    iv = os.urandom(16)
+    return iv + aes_cbc_encrypt(key, iv, plain)
+
+
+def decrypt_payload(key, data):
+    if len(data) < 32 or len(data) % 16:
+        raise IpmiLanError("Encrypted payload has an invalid length")
+    plain = aes_cbc_decrypt(key, data[:16], data[16:])
+    return plain[:-1 - plain[-1]]
+
+
+def build_v2_packet(payload_type, payload, session_id=0, sequence=0, integrity_key=None, hash_name="sha1", confidentiality_key=None):
+    if confidentiality_key:
+        payload = encrypt_payload(confidentiality_key, payload)
+        payload_type |= 0x80
+    if integrity_key:
+        payload_type |= 0x40
+    body = bytes([AUTH_TYPE_RMCP_PLUS, payload_type]) + struct.pack("<IIH", session_id, sequence, len(payload)) + payload
+    if integrity_key:
+        pad = (4 - (len(body) + 2) % 4) % 4
+        body += b"\xff" * pad + bytes([pad, 0x07])
+        body += hmac.new(integrity_key, body, hash_name).digest()[:ICV_LENGTHS[hash_name]]
+    return RMCP_HEADER + body
+
+
+def parse_v2_packet(packet, integrity_key=None, hash_name="sha1", confidentiality_key=None):
+    """Returns (payload_type, session_id, sequence, payload) for an RMCP+ packet."""
+    if len(packet) < 16 or packet[:4] != RMCP_HEADER or packet[4] != AUTH_TYPE_RMCP_PLUS:
+        raise IpmiLanError("Not an RMCP+ packet")
+    payload_type = packet[5]
+    session_id, sequence, length = struct.unpack_from("<IIH", packet, 6)
+    payload = packet[16:16 + length]
+    if payload_type & 0x40:
+        if not integrity_key:
+            raise IpmiLanError("Authenticated packet received outside of a session")
+        icv_len = ICV_LENGTHS[hash_name]
+        expected = hmac.new(integrity_key, packet[4:-icv_len], hash_name).digest()[:icv_len]
+        if not hmac.compare_digest(expected, packet[-icv_len:]):
+            raise IpmiLanError("Packet integrity check failed")
+    if payload_type & 0x80:
+        if not confidentiality_key:
+            raise IpmiLanError("Encrypted packet received outside of a session")
+        payload = decrypt_payload(confidentiality_key, payload)
+    return payload_type & 0x3F, session_id, sequence, payload
+
+
+def build_v15_packet(message):
+    return RMCP_HEADER + bytes([0x00]) + struct.pack("<II", 0, 0) + bytes([len(message)]) + message
+
+
+# --- RAKP key derivation (IPMI v2.0 section 13.31-13.32) ---
+# Const1 and Const2 are 20 bytes for every authentication algorithm, HMAC-SHA256 included
+KEY_CONSTANT_LENGTH = 20
+
+
+def session_integrity_key(kuid, rm, rc, role, username, hash_name):
+    return hmac.new(kuid, rm + rc + bytes([role, len(username)]) + username, hash_name).digest()
+
+
+def derive_k1(sik, hash_name):
+    """The integrity key."""
+    return hmac.new(sik, b"\x01" * KEY_CONSTANT_LENGTH, hash_name).digest()
+
+
+def derive_k2(sik, hash_name):
+    """The confidentiality key; AES-128 uses its first 16 bytes."""
+    return hmac.new(sik, b"\x02" * KEY_CONSTANT_LENGTH, hash_name).digest()
+
+
+# --- Session ---
+class LanplusSession:
+    def __init__(self, host, username, password, port=623, cipher_suite=3, privilege="administrator",
+                 idle_timeout=45, log=None):
+        if cipher_suite not in CIPHER_SUITES:
+            raise ValueError(f"Unsupported cipher suite {cipher_suite}. Supported: {sorted(CIPHER_SUITES)}")
+        self.host = host
+        self.port = int(port)
+        self.username = (username or "").encode()
+        self.password = (password or "").encode()[:20]
+        self.cipher_suite = cipher_suite
+        self.privilege = PRIVILEGE_LEVELS.get(str(privilege).lower(), PRIVILEGE_LEVELS["administrator"])
+        self.idle_timeout = idle_timeout
+        self._log = log or (lambda level, message: None)
+        self._lock = threading.Lock()
+        self._sock = None
+        self._reset_state()
+        self.sessions_opened = 0
+        self.requests_sent = 0
+
+    def _reset_state(self):
+        self._open = False
+        self._console_session_id = 0
+        self._bmc_session_id = 0
+        self._out_seq = 0
+        self._rq_seq = 0
+        self._k1 = None
+        self._aes_key = None
+        self._last_activity = 0.0
+
+    @property
+    def is_open(self):
+        return self._open
+
+    def _socket(self):
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.connect((self.host, self.port))
+        return self._sock
+
+    def _exchange(self, packet, accept, timeout, retries=3):
+        """Sends `packet` until `accept(reply)` returns a non-None value or the timeout runs out."""
+        sock = self._socket()
+        deadline = time.monotonic() + timeout
+        per_try = timeout / max(1, retries)
+        for _ in range(max(1, retries)):
+            try:
+                sock.send(packet)
+            except OSError as e:
+                raise IpmiLanError(f"Send to {self.host}:{self.port} failed: {e}")
+            try_deadline = min(deadline, time.monotonic() + per_try)
+            while True:
+                remaining = try_deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                sock.settimeout(remaining)
+                try:
+                    reply = sock.recv(1024)
+                except socket.timeout:
+                    break
+                except OSError as e:
+                    raise IpmiLanError(f"Receive from {self.host}:{self.port} failed: {e}")
+                try:
+                    result = accept(reply)
+                except IpmiLanError as e:
+                    self._log("debug", f"Discarding packet: {e}")
+                    continue
+                if result is not None:
+                    return result
+            if time.monotonic() >= deadline:
+                break
+        raise IpmiLanError(f"No response from {self.host}:{self.port} within {timeout}s")
+
+    def _hash(self):
+        return CIPHER_SUITES[self.cipher_suite][3]
+
+    # --- Handshake ---
+    def open(self, timeout=5):
+        with self._lock:
+            self._open_locked(timeout)
+
+    def _open_locked(self, timeout):
+        self._close_locked(send=False)
+        auth_alg, integ_alg, conf_alg, hash_name = CIPHER_SUITES[self.cipher_suite]
+        kuid = self.password
+
+        # Get Channel Authentication Capabilities (pre-session). Doubles as a reachability check.
+        get_caps = build_v15_packet(build_ipmi_request(0x06, 0x38, bytes([0x8E, self.privilege]), 0))
+
+        def accept_caps(reply):
+            if len(reply) > 14 and reply[:4] == RMCP_HEADER and reply[4] == 0x00:
+                return parse_ipmi_response(reply[14:14 + reply[13]])
+            return None
+        self._exchange(get_caps, accept_caps, timeout)
+
+        tag = 0
+        self._console_session_id = struct.unpack("<I", os.urandom(4))[0] | 1
+        open_request = (bytes([tag, self.privilege, 0, 0]) + struct.pack("<I", self._console_session_id) +
+                        bytes([0x00, 0, 0, 0x08, auth_alg, 0, 0, 0]) +
+                        bytes([0x01, 0, 0, 0x08, integ_alg, 0, 0, 0]) +
+                        bytes([0x02, 0, 0, 0x08, conf_alg, 0, 0, 0]))
+        response = self._exchange(build_v2_packet(PAYLOAD_OPEN_SESSION_REQUEST, open_request),
+                                  self._accept_payload(PAYLOAD_OPEN_SESSION_RESPONSE), timeout)
+        self._check_rakp_status("Open Session", response[1])
+        self._bmc_session_id = struct.unpack_from("<I", response, 8)[0]
+
+        rm = os.urandom(16)
+        role = self.privilege | 0x10  # name-only lookup, as ipmitool does
+        rakp1 = (bytes([tag, 0, 0, 0]) + struct.pack("<I", self._bmc_session_id) + rm +
+                 bytes([role, 0, 0, len(self.username)]) + self.username)
+        rakp2 = self._exchange(build_v2_packet(PAYLOAD_RAKP1, rakp1), self._accept_payload(PAYLOAD_RAKP2), timeout)
+        self._check_rakp_status("RAKP 2", rakp2[1])
+        rc, guid, bmc_auth = rakp2[8:24], rakp2[24:40], rakp2[40:]
+        expected = hmac.new(kuid, struct.pack("<II", self._console_session_id, self._bmc_session_id) + rm + rc + guid +
+                            bytes([role, len(self.username)]) + self.username, hash_name).digest()
+        if not hmac.compare_digest(expected, bmc_auth):
+            raise IpmiSessionRejected("RAKP 2 HMAC mismatch (wrong password?)")
+
+        rakp3 = (bytes([tag, 0, 0, 0]) + struct.pack("<I", self._bmc_session_id) +
+                 hmac.new(kuid, rc + struct.pack("<I", self._console_session_id) + bytes([role, len(self.username)]) +
+                          self.username, hash_name).digest())
+        rakp4 = self._exchange(build_v2_packet(PAYLOAD_RAKP3, rakp3), self._accept_payload(PAYLOAD_RAKP4), timeout)
+        self._check_rakp_status("RAKP 4", rakp4[1])
+        sik = session_integrity_key(kuid, rm, rc, role, self.username, hash_name)
+        icv = hmac.new(sik, rm + struct.pack("<I", self._bmc_session_id) + guid, hash_name).digest()[:ICV_LENGTHS[hash_name]]
+        if not hmac.compare_digest(icv, rakp4[8:8 + len(icv)]):
+            raise IpmiSessionRejected("RAKP 4 integrity check value mismatch")
+
+        self._k1 = derive_k1(sik, hash_name) if integ_alg else None
+        self._aes_key = derive_k2(sik, hash_name)[:16] if conf_alg else None
+        self._open = True
+        self._last_activity = time.monotonic()
+
+        cc, _ = self._raw_locked(0x06, 0x3B, bytes([self.privilege]), 0, timeout)
+        if cc != 0:
+            self._close_locked(send=True)
+            raise IpmiSessionRejected(f"Set Session Privilege Level failed (completion code 0x{cc:02x})")
+        self.sessions_opened += 1
+        self._log("info", f"RMCP+ session established (cipher suite {self.cipher_suite}, BMC session 0x{self._bmc_session_id:08x})")
+
+    def _accept_payload(self, expected_type):
+        def accept(reply):
+            if len(reply) < 6 or reply[4] != AUTH_TYPE_RMCP_PLUS:
+                return None
+            payload_type, _, _, payload = parse_v2_packet(reply)
+            if payload_type != expected_type or len(payload) < 8:
+                return None
+            if struct.unpack_from("<I", payload, 4)[0] != self._console_session_id:
+                return None
+            return payload
+        return accept
+
+    def _check_rakp_status(self, stage, status):
+        if status == 0:
+            return
+        message = f"{stage} rejected by BMC: {RAKP_STATUS_CODES.get(status, f'status 0x{status:02x}')}"
+        if status in RAKP_RESOURCE_STATUSES:
+            raise IpmiLanError(message)
+        raise IpmiSessionRejected(message)
+
+    # --- Requests ---
+    def raw(self, netfn, cmd, data=b"", lun=0, timeout=5):
+        """Sends one IPMI request inside the session, opening it first if needed. Returns (completion_code, data)."""
+        with self._lock:
+            if self._open and time.monotonic() - self._last_activity > self.idle_timeout:
+                # The BMC may have expired an idle session; a cheap Get Device ID tells us without a long timeout.
+                try:
+                    self._raw_locked(0x06, 0x01, b"", 0, min(timeout, 2), retries=1)
+                except IpmiLanError:
+                    self._log("debug", "Idle session no longer answers. Re-establishing.")
+                    self._close_locked(send=False)
+            if not self._open:
+                self._open_locked(timeout)
+            try:
+                return self._raw_locked(netfn, cmd, data, lun, timeout)
+            except IpmiLanError:
+                self._close_locked(send=False)
+                raise
+
+    def _raw_locked(self, netfn, cmd, data, lun, timeout, retries=3):
+        _, _, _, hash_name = CIPHER_SUITES[self.cipher_suite]
+        self._rq_seq = (self._rq_seq + 1) & 0x3F
+        rq_seq = self._rq_seq
+        self._out_seq = (self._out_seq + 1) & 0xFFFFFFFF or 1
+        packet = build_v2_packet(PAYLOAD_IPMI, build_ipmi_request(netfn, cmd, data, rq_seq, lun),
+                                 self._bmc_session_id, self._out_seq, self._k1, hash_name, self._aes_key)
+
+        def accept(reply):
+            payload_type, session_id, _, payload = parse_v2_packet(reply, self._k1, hash_name, self._aes_key)
+            if payload_type != PAYLOAD_IPMI or session_id != self._console_session_id:
+                return None
+            seq, _, rsp_cmd, cc, rsp_data = parse_ipmi_response(payload)
+            if seq != rq_seq or rsp_cmd != cmd:
+                return None
+            return cc, rsp_data
+
+        result = self._exchange(packet, accept, timeout, retries)
+        self.requests_sent += 1
+        self._last_activity = time.monotonic()
+        return result
+
+    def close(self):
+        with self._lock:
+            self._close_locked(send=True)
+
+    def _close_locked(self, send=True):
+        if self._open and send:
+            try:
+                self._raw_locked(0x06, 0x3C, struct.pack("<I", self._bmc_session_id), 0, 1, retries=1)
+            except IpmiLanError:
+                pass
+        self._reset_state()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
@@ -1,22 +1,65 @@
 # HA-iDRAC/ha-idrac-controller-dev/app/ipmi_manager.py
+import struct
 import subprocess
 import time
 import re
+from . import ipmi_sdr
+from .ipmi_lan import LanplusSession, IpmiLanError, IpmiSessionRejected, NativeUnsupported
+from .ipmi_shell import IpmitoolShell, ShellError
+from .sdr_cache import SdrCache
+from .sdr_parser import SdrParser, SensorSnapshot
+
+TRANSPORTS = ["ipmitool", "shell", "native"]
+
+POWER_SENSOR_NAME_REGEX = re.compile(r"^Pwr Consumption", re.IGNORECASE)
+# What a short, garbled or unexpected reply raises while it is decoded; treated as a failed read
+BAD_REPLY_ERRORS = (ipmi_sdr.SdrError, IndexError, ValueError, struct.error)
 
 class IPMIManager:
-    def __init__(self, ip, user, password, conn_type="lanplus", log_level="info"):
+    def __init__(self, ip, user, password, conn_type="lanplus", log_level="info", transport="ipmitool", port=623, cipher_suite=3,
+                 sdr_cache_dir=None):
         self.ip = ip
         self.user = user
         self.password = password
+        self.port = int(port or 623)
         self.log_level = log_level.lower()
         self.base_args = self._build_base_args(conn_type)
-        self._log("info", f"IPMI Manager initialized for host: {self.ip}")
+        self.transport = (transport or "ipmitool").lower()
+        if self.transport not in TRANSPORTS:
+            self._log("warning", f"Unknown IPMI transport '{transport}'. Using ipmitool.")
+            self.transport = "ipmitool"
+        self.native_session = None
+        self.shell = None
+        if self.transport == "native" and conn_type.lower() not in ["local", "open"]:
+            self.native_session = LanplusSession(self.ip, self.user, self.password, port=self.port,
+                                                 cipher_suite=int(cipher_suite), log=self._log)
+        elif self.transport == "shell":
+            self.shell = IpmitoolShell(self.base_args, log=self._log)
+        # Targeted per-sensor reads only pay off when commands share a session; with one ipmitool
+        # process per command a single `sdr elist` sweep is cheaper.
+        self.sdr_cache = None
+        if sdr_cache_dir and (self.native_session or self.shell):
+            self.sdr_cache = SdrCache(sdr_cache_dir, self.endpoint, log=self._log)
+        self._cache_loaded = False
+        self._sdr_refresh = False
+        self._targeted_sensors = None
+        self._targeted_patterns = None
+        self._parser = None
+        self._log("info", f"IPMI Manager initialized for host: {self.ip} (transport: {self.transport})")
+
+    @property
+    def endpoint(self):
+        """IP, plus the port when it isn't the standard one; identifies the BMC for the on-disk caches."""
+        return self.ip if self.port == 623 else f"{self.ip}:{self.port}"
 
     def _build_base_args(self, conn_type):
         if conn_type.lower() in ["local", "open"]:
             return ["-I", "open"]
         else:
-            return ["-I", "lanplus", "-H", self.ip, "-U", self.user, "-P", self.password]
+            args = ["-I", "lanplus", "-H", self.ip, "-U", self.user, "-P", self.password]
+            if self.port != 623:
+                args += ["-p", str(self.port)]
+            return args
 
     def _log(self, level, message):
         levels = {"trace": -1, "debug": 0, "info": 1, "warning": 2, "error": 3, "fatal": 4}
@@ -28,6 +71,20 @@ class IPMIManager:
             self._log("error", "IPMI not configured.")
             return None
 
+        if self.native_session:
+            try:
+                return self._run_native_command(args_list, is_raw_command, timeout)
+            except IpmiSessionRejected as e:
+                self._drop_native_session(e)
+            except NativeUnsupported:
+                self._log("debug", f"Command not supported natively, using ipmitool: {' '.join(args_list)}")
+            except (IpmiLanError, *BAD_REPLY_ERRORS) as e:
+                self._log("error", f"Native IPMI command failed: {' '.join(args_list)}: {e}")
+                return None
+
+        if self.shell:
+            return self._run_shell_command(["raw"] + args_list if is_raw_command else args_list, timeout)
+
         base_command = ["ipmitool"] + self.base_args
         command_to_run = base_command + (["raw"] + args_list if is_raw_command else args_list)
         
@@ -53,6 +110,91 @@ class IPMIManager:
             self._log("error", f"An unexpected error occurred with command: {e}")
         return None
 
+    def _run_shell_command(self, shell_args, timeout):
+        self._log("debug", f"Executing command in ipmitool shell: {' '.join(shell_args)}")
+        try:
+            ok, output = self.shell.run(shell_args, timeout=timeout)
+        except FileNotFoundError:
+            self._log("error", "ipmitool command not found. Is it installed and in the system PATH?")
+            return None
+        except subprocess.TimeoutExpired:
+            self._log("error", f"Command timed out in ipmitool shell: {' '.join(shell_args)}")
+            return None
+        except ShellError as e:
+            self._log("error", f"ipmitool shell failed ({e}) on command: {' '.join(shell_args)}")
+            return None
+
+        if not ok:
+            self._log("error", f"Command failed: {' '.join(shell_args)}")
+            self._log("error", f"OUTPUT: {output.strip()}")
+            return None
+        self._log("debug", f"Command STDOUT: {output.strip()}")
+        return output.strip()
+
+    def raw_request(self, netfn, cmd, data=b"", lun=0, timeout=5):
+        """Sends one raw IPMI request over whichever transport is active. Returns (completion_code, data).
+        If the BMC refuses the native session, the request is sent again with ipmitool."""
+        try:
+            return self._transport_raw(netfn, cmd, data, lun, timeout)
+        except IpmiSessionRejected as e:
+            self._drop_native_session(e)
+            return self._transport_raw(netfn, cmd, data, lun, timeout)
+
+    def _transport_raw(self, netfn, cmd, data=b"", lun=0, timeout=5):
+        if self.native_session:
+            return self._native_raw(netfn, cmd, data, lun, timeout)
+        args = [f"0x{netfn:02x}", f"0x{cmd:02x}"] + [f"0x{b:02x}" for b in data]
+        output = self._run_ipmi_command(args, timeout=timeout)
+        if output is None:
+            # ipmitool only tells us that it failed; callers treat this like a non-zero completion code.
+            return 0xFF, b""
+        return 0, bytes.fromhex("".join(output.split()))
+
+    def get_device_id(self):
+        try:
+            return ipmi_sdr.get_device_id(self.raw_request)
+        except (IpmiLanError, *BAD_REPLY_ERRORS) as e:
+            self._log("warning", f"Get Device ID failed: {e}")
+            return None
+
+    def _drop_native_session(self, error):
+        """The BMC refused the RMCP+ session (credentials, cipher suite, role): use ipmitool for this server from now on."""
+        self._log("error", f"BMC rejected the native RMCP+ session ({error}). Falling back to ipmitool for this server.")
+        self.native_session.close()
+        self.native_session = None
+        # Targeted reads cost one ipmitool process per sensor; full sweeps are cheaper without a session
+        self.sdr_cache = None
+
+    def _native_raw(self, netfn, cmd, data, lun=0, timeout=5):
+        return self.native_session.raw(netfn, cmd, data, lun=lun, timeout=timeout)
+
+    def _run_native_command(self, args_list, is_raw_command, timeout):
+        """Serves a command over the persistent RMCP+ session, returning the text ipmitool would print."""
+        per_request_timeout = min(timeout, 5)
+        raw = lambda netfn, cmd, data, lun=0: self._native_raw(netfn, cmd, data, lun, per_request_timeout)
+
+        if is_raw_command:
+            values = [int(a, 0) for a in args_list]
+            cc, data = raw(values[0], values[1], bytes(values[2:]))
+            if cc != 0:
+                raise ipmi_sdr.SdrError(f"completion code 0x{cc:02x}")
+            return "\n".join(" ".join(f"{b:02x}" for b in data[i:i + 16]) for i in range(0, len(data), 16))
+
+        if args_list == ["fru"]:
+            return ipmi_sdr.format_fru(ipmi_sdr.decode_fru(ipmi_sdr.read_fru(raw)))
+        if args_list == ["sdr", "elist"]:
+            return ipmi_sdr.read_sensor_lines(raw, ipmi_sdr.read_sensors(raw))
+        if len(args_list) == 3 and args_list[:2] == ["sdr", "type"] and args_list[2].lower() in ipmi_sdr.SENSOR_TYPES:
+            sensors = ipmi_sdr.read_sensors(raw)
+            return ipmi_sdr.read_sensor_lines(raw, sensors, ipmi_sdr.SENSOR_TYPES[args_list[2].lower()])
+        raise NativeUnsupported(' '.join(args_list))
+
+    def close(self):
+        if self.native_session:
+            self.native_session.close()
+        if self.shell:
+            self.shell.close()
+
     def _decimal_to_hex_for_ipmi(self, decimal_value):
         try:
             val = int(decimal_value)
@@ -68,15 +210,14 @@ class IPMIManager:
         self._log("info", "Applying Dell default dynamic fan control.")
         return self._run_ipmi_command(["0x30", "0x30", "0x01", "0x01"])
 
-    def apply_user_fan_control_profile(self, decimal_fan_speed):
-        hex_fan_speed = self._decimal_to_hex_for_ipmi(decimal_fan_speed)
-        self._log("info", f"Applying user static fan control: {decimal_fan_speed}% ({hex_fan_speed})")
-        
-        if self._run_ipmi_command(["0x30", "0x30", "0x01", "0x00"]) is None:
+    def enable_manual_fan_control(self):
+        result = self._run_ipmi_command(["0x30", "0x30", "0x01", "0x00"])
+        if result is None:
             self._log("error", "Failed to enable manual fan control mode.")
-            return None
-        time.sleep(0.5)
-        
+        return result
+
+    def set_fan_speed(self, decimal_fan_speed):
+        hex_fan_speed = self._decimal_to_hex_for_ipmi(decimal_fan_speed)
         result = self._run_ipmi_command(["0x30", "0x30", "0x02", "0xff", hex_fan_speed])
         if result is None:
             self._log("error", f"Failed to set fan speed to {hex_fan_speed}.")
@@ -84,6 +225,23 @@ class IPMIManager:
             self._log("info", f"Successfully applied user fan control: {decimal_fan_speed}%")
         return result
 
+    def apply_user_fan_control_profile(self, decimal_fan_speed):
+        self._log("info", f"Applying user static fan control: {decimal_fan_speed}%")
+        if self.enable_manual_fan_control() is None:
+            return None
+        time.sleep(0.5)
+        return self.set_fan_speed(decimal_fan_speed)
+
+    @property
+    def connection_generation(self):
+        """Changes whenever the persistent session to the BMC is lost and re-established (always 0 for plain
+        ipmitool). The shell's planned recycle of an idle process is not a lost session and doesn't count."""
+        if self.native_session:
+            return ("native", self.native_session.sessions_opened)
+        if self.shell:
+            return ("shell", self.shell.failures)
+        return (self.transport, 0)
+
     def get_server_model_info(self):
         self._log("info", "Retrieving server model information...")
         fru_data = self._run_ipmi_command(["fru"], is_raw_command=False, timeout=20)
@@ -119,80 +277,113 @@ class IPMIManager:
         self._log("info", f"Server Info: Manufacturer='{model_info['manufacturer']}', Model='{model_info['model']}'")
         return model_info
 
+    def retrieve_sdr_raw(self):
+        """One `sdr elist` sweep covering every sensor the cycle needs (temperatures, fans, power, voltages, PSUs)."""
+        self._log("debug", "Retrieving full SDR sensor list...")
+        return self._run_ipmi_command(["sdr", "elist"], is_raw_command=False, timeout=30)
+
+    def parse_sdr(self, sdr_data, cpu_pattern_str=None, inlet_pattern_str=None, exhaust_pattern_str=None):
+        """Parses an SDR listing in a single pass into a SensorSnapshot that the parse_* views read from."""
+        patterns = (cpu_pattern_str, inlet_pattern_str, exhaust_pattern_str)
+        if self._parser is None or self._parser.patterns != patterns:
+            self._parser = SdrParser(*patterns, log=self._log)
+        return self._parser.parse(sdr_data)
+
+    def read_sensor_snapshot(self, cpu_pattern_str, inlet_pattern_str, exhaust_pattern_str):
+        """Returns this cycle's parse_sdr snapshot, or None if the BMC could not be read."""
+        patterns = (cpu_pattern_str, inlet_pattern_str, exhaust_pattern_str)
+        if self.sdr_cache is not None:
+            try:
+                lines = self._read_targeted_sensor_lines(patterns)
+            except IpmiSessionRejected as e:
+                self._drop_native_session(e)
+                lines = None
+            except (IpmiLanError, *BAD_REPLY_ERRORS) as e:
+                self._log("error", f"Targeted sensor read failed: {e}")
+                return None
+            if lines is not None:
+                return self.parse_sdr(lines, *patterns)
+            if self.sdr_cache is not None:
+                return None
+        raw_sdr_data = self.retrieve_sdr_raw()
+        return None if raw_sdr_data is None else self.parse_sdr(raw_sdr_data, *patterns)
+
+    def _read_targeted_sensor_lines(self, patterns):
+        """Reads only the sensors the controller uses, by sensor number, using the cached SDR records.
+        Returns None if the BMC did not answer (and disables the cache if the BMC can't support it).
+        Raises IpmiSessionRejected rather than falling back part way through."""
+        try:
+            repository = ipmi_sdr.get_sdr_repository_info(self._transport_raw)
+        except BAD_REPLY_ERRORS as e:
+            self._log("warning", f"Get SDR Repository Info failed: {e}")
+            return None
+
+        if not self._cache_loaded or self._sdr_refresh or not self.sdr_cache.is_current(repository):
+            try:
+                device = ipmi_sdr.get_device_id(self._transport_raw)
+                if self._sdr_refresh or not self.sdr_cache.load(device["firmware"]) or not self.sdr_cache.is_current(repository):
+                    self._log("info", f"Enumerating SDR repository ({repository['record_count']} records)...")
+                    self.sdr_cache.store(repository, ipmi_sdr.read_sensors(self._transport_raw))
+            except BAD_REPLY_ERRORS as e:
+                self._log("warning", f"SDR enumeration failed ({e}). Using full SDR sweeps for this server.")
+                self.sdr_cache = None
+                return None
+            self._cache_loaded = True
+            self._sdr_refresh = False
+            self._targeted_sensors = None
+
+        if self._targeted_sensors is None or self._targeted_patterns != patterns:
+            self._targeted_sensors = self._select_targeted_sensors(self.sdr_cache.sensors, patterns)
+            self._targeted_patterns = patterns
+            self._log("debug", f"Reading {len(self._targeted_sensors)} of {len(self.sdr_cache.sensors)} SDR sensors by number.")
+
+        return "\n".join(ipmi_sdr.format_sensor_line(sensor, ipmi_sdr.get_sensor_reading(self._transport_raw, sensor))
+                         for sensor in self._targeted_sensors)
+
+    def refresh_sdr_cache(self):
+        """Re-enumerates the SDR repository on the next targeted read, ignoring what is cached on disk
+        (the IP now answers as a different board, whose records may differ even where the timestamps don't)."""
+        self._sdr_refresh = True
+
+    def _select_targeted_sensors(self, sensors, patterns):
+        selected = []
+        for sensor in sensors:
+            if sensor["sensor_type"] == ipmi_sdr.SENSOR_TYPES["temperature"]:
+                wanted = any(p and re.search(p, sensor["name"], re.IGNORECASE) for p in patterns)
+            elif sensor["sensor_type"] in (ipmi_sdr.SENSOR_TYPES["fan"], ipmi_sdr.SENSOR_TYPES["voltage"],
+                                           ipmi_sdr.SENSOR_TYPES["power supply"]):
+                wanted = True
+            else:
+                wanted = bool(POWER_SENSOR_NAME_REGEX.match(sensor["name"]))
+            if wanted:
+                selected.append(sensor)
+        return selected
+
+    def _as_snapshot(self, sdr_data, *patterns):
+        return sdr_data if isinstance(sdr_data, SensorSnapshot) else self.parse_sdr(sdr_data, *patterns)
+
     def retrieve_temperatures_raw(self):
         self._log("debug", "Retrieving raw temperature SDR data...")
         return self._run_ipmi_command(["sdr", "type", "temperature"], is_raw_command=False)
 
-    def parse_temperatures(self, sdr_data, cpu_pattern_str, inlet_pattern_str, exhaust_pattern_str):
-        temps = {"cpu_temps": [], "inlet_temp": None, "exhaust_temp": None}
-        if not sdr_data:
-            self._log("warning", "SDR data empty for temp parsing.")
-            return temps
-
-        temp_line_regex = re.compile(r"^(.*?)\s*\|\s*[\da-fA-F]+h\s*\|\s*ok\s*.*?\|\s*([-+]?\d*\.?\d+)\s*degrees C", re.IGNORECASE)
-        
-        for line in sdr_data.splitlines():
-            match = temp_line_regex.match(line.strip())
-            if not match: continue
-            
-            sensor_name, temp_val_str = match.groups()
-            sensor_name = sensor_name.strip()
-            try:
-                temp_value = int(float(temp_val_str))
-            except ValueError:
-                continue
-
-            if re.search(inlet_pattern_str, sensor_name, re.IGNORECASE):
-                temps["inlet_temp"] = temp_value
-            elif re.search(exhaust_pattern_str, sensor_name, re.IGNORECASE):
-                temps["exhaust_temp"] = temp_value
-            elif re.search(cpu_pattern_str, sensor_name, re.IGNORECASE):
-                temps["cpu_temps"].append(temp_value)
-                
-        return temps
+    def parse_temperatures(self, sdr_data, cpu_pattern_str=None, inlet_pattern_str=None, exhaust_pattern_str=None):
+        """Accepts a parse_sdr snapshot, or raw SDR text for callers that still fetch per sensor type."""
+        snapshot = self._as_snapshot(sdr_data, cpu_pattern_str, inlet_pattern_str, exhaust_pattern_str)
+        return {"cpu_temps": snapshot.cpu_temps, "inlet_temp": snapshot.inlet_temp, "exhaust_temp": snapshot.exhaust_temp}
 
     def retrieve_fan_rpms_raw(self):
         self._log("debug", "Retrieving raw fan SDR data...")
         return self._run_ipmi_command(["sdr", "type", "fan"], is_raw_command=False, timeout=10)
 
     def parse_fan_rpms(self, sdr_data):
-        fans = []
-        if not sdr_data:
-            return fans
-
-        fan_line_regex = re.compile(r"^(.*?)\s*\|\s*[\da-fA-F]+h\s*\|\s*ok\s*.*?\|\s*([\d\.]+)\s*RPM", re.IGNORECASE)
-        for line in sdr_data.splitlines():
-            match = fan_line_regex.match(line.strip())
-            if not match: continue
-            
-            fan_name, rpm_str = match.groups()
-            try:
-                fans.append({"name": fan_name.strip(), "rpm": int(float(rpm_str))})
-            except ValueError:
-                continue
-        return fans
+        return self._as_snapshot(sdr_data).fans
 
     def retrieve_power_sdr_raw(self):
         self._log("debug", "Retrieving raw power SDR data...")
         return self._run_ipmi_command(["sdr", "type", "current"], is_raw_command=False, timeout=10)
 
     def parse_power_consumption(self, sdr_data):
-        if not sdr_data:
-            self._log("warning", "SDR data is empty for power consumption parsing.")
-            return None
-        
-        # This more robust regex looks for a line with "Pwr Consumption" and "Watts"
-        power_line_regex = re.compile(r"^(Pwr Consumption.*?)\s*\|.*?\s*([\d\.]+)\s*Watts", re.IGNORECASE)
-        
-        for line in sdr_data.splitlines():
-            match = power_line_regex.search(line)
-            if match:
-                try:
-                    power_watts = int(float(match.group(2)))
-                    self._log("debug", f"MATCHED POWER: '{match.group(1).strip()}' as {power_watts} Watts")
-                    return power_watts
-                except (ValueError, IndexError):
-                    continue # Try next line if parsing fails
-        
-        self._log("warning", "Power Consumption sensor (Watts) not found in SDR data.")
-        return None
\ No newline at end of file
+        power_watts = self._as_snapshot(sdr_data).power
+        if power_watts is None:
+            self._log("warning", "Power Consumption sensor (Watts) not found in SDR data.")
+        return power_watts
@@ -0,0 +1,260 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/ipmi_sdr.py
+# SDR repository, sensor reading and FRU decoding on top of a raw IPMI request
+# callable: raw(netfn, cmd, data, lun=0) -> (completion_code, data_bytes).
+# Output is rendered in the same layout ipmitool prints, so the existing
+# parsers work unchanged regardless of which transport produced it.
+import math
+import struct
+
+SENSOR_TYPES = {"temperature": 0x01, "voltage": 0x02, "current": 0x03, "fan": 0x04, "power supply": 0x08}
+
+UNIT_NAMES = {1: "degrees C", 2: "degrees F", 3: "degrees K", 4: "Volts", 5: "Amps", 6: "Watts", 18: "RPM"}
+
+PSU_STATES = ["Presence detected", "Failure detected", "Predictive failure", "Power Supply AC lost",
+              "AC lost or out-of-range", "AC out-of-range, but present", "Config Error"]
+
+_LINEARIZATION = {
+    0: lambda v: v, 1: math.log, 2: math.log10, 3: math.log2, 4: math.exp,
+    5: lambda v: 10 ** v, 6: lambda v: 2 ** v, 7: lambda v: 1 / v, 8: lambda v: v * v,
+    9: lambda v: v ** 3, 10: math.sqrt, 11: lambda v: v ** (1 / 3),
+}
+
+SDR_CHUNK_SIZE = 24
+
+
+class SdrError(Exception):
+    pass
+
+
+def _signed(value, bits):
+    return value - (1 << bits) if value & (1 << (bits - 1)) else value
+
+
+def _check(cc, what):
+    if cc != 0:
+        raise SdrError(f"{what} failed with completion code 0x{cc:02x}")
+
+
+def get_device_id(raw):
+    cc, data = raw(0x06, 0x01, b"")
+    _check(cc, "Get Device ID")
+    return {
+        "device_id": data[0],
+        "device_revision": data[1] & 0x0F,
+        "firmware": f"{data[2] & 0x7F}.{data[3]:02x}",
+        "ipmi_version": f"{data[4] & 0x0F}.{data[4] >> 4}",
+        "manufacturer_id": data[6] | data[7] << 8 | data[8] << 16,
+        "product_id": data[9] | data[10] << 8,
+    }
+
+
+def get_sdr_repository_info(raw):
+    cc, data = raw(0x0A, 0x20, b"")
+    _check(cc, "Get SDR Repository Info")
+    count, _, added, erased = struct.unpack_from("<HHII", data, 1)
+    return {"record_count": count, "addition_timestamp": added, "erase_timestamp": erased}
+
+
+def _reserve(raw):
+    cc, data = raw(0x0A, 0x22, b"")
+    _check(cc, "Reserve SDR Repository")
+    return data[:2]
+
+
+def read_sdr_records(raw):
+    """Reads every record in the SDR repository. Returns a list of raw record bytes."""
+    records = []
+    reservation = _reserve(raw)
+    record_id = 0
+    chunk = SDR_CHUNK_SIZE
+    while record_id != 0xFFFF:
+        cc, data = raw(0x0A, 0x23, reservation + struct.pack("<HBB", record_id, 0, 5))
+        if cc == 0xC5:  # reservation cancelled, start this record again
+            reservation = _reserve(raw)
+            continue
+        _check(cc, f"Get SDR header for record {record_id}")
+        next_id = struct.unpack_from("<H", data)[0]
+        record = bytearray(data[2:7])
+        length = record[4]
+        while len(record) < length + 5:
+            offset = len(record)
+            cc, data = raw(0x0A, 0x23, reservation + struct.pack("<HBB", record_id, offset, min(chunk, length + 5 - offset)))
+            if cc == 0xC5:
+                reservation = _reserve(raw)
+                continue
+            if cc == 0xCA and chunk > 8:  # BMC can't return that many bytes at once
+                chunk //= 2
+                continue
+            _check(cc, f"Get SDR record {record_id} at offset {offset}")
+            record += data[2:]
+        records.append(bytes(record))
+        record_id = next_id
+    return records
+
+
+def decode_sdr_record(record):
+    """Decodes full (0x01) and compact (0x02) sensor records. Returns None for other record types."""
+    record_type = record[3]
+    if record_type not in (0x01, 0x02) or len(record) < 32:
+        return None
+    sensor = {
+        "record_id": struct.unpack_from("<H", record)[0],
+        "record_type": record_type,
+        "owner_lun": record[6] & 0x03,
+        "number": record[7],
+        "entity_id": record[8],
+        "entity_instance": record[9] & 0x7F,
+        "sensor_type": record[12],
+        "event_type": record[13],
+        "analog_format": record[20] >> 6,
+        "unit": record[21],
+        "percentage": bool(record[20] & 0x01),
+    }
+    if record_type == 0x01:
+        sensor.update({
+            "linearization": record[23] & 0x7F,
+            "m": _signed(record[24] | (record[25] & 0xC0) << 2, 10),
+            "b": _signed(record[26] | (record[27] & 0xC0) << 2, 10),
+            "r_exp": _signed(record[29] >> 4, 4),
+            "b_exp": _signed(record[29] & 0x0F, 4),
+        })
+        name_offset = 47
+    else:
+        sensor["analog_format"] = 3
+        name_offset = 31
+    name_length = record[name_offset] & 0x1F
+    sensor["name"] = record[name_offset + 1:name_offset + 1 + name_length].decode("latin-1").rstrip("\x00").strip()
+    return sensor
+
+
+def convert_reading(sensor, raw_value):
+    """Applies the SDR conversion factors. Returns None for non-analog sensors."""
+    fmt = sensor.get("analog_format", 3)
+    if fmt == 3 or "m" not in sensor:
+        return None
+    x = raw_value
+    if fmt == 1 and x & 0x80:
+        x = -((~x) & 0xFF)
+    elif fmt == 2:
+        x = _signed(x, 8)
+    value = (sensor["m"] * x + sensor["b"] * 10 ** sensor["b_exp"]) * 10 ** sensor["r_exp"]
+    try:
+        return _LINEARIZATION.get(sensor["linearization"], _LINEARIZATION[0])(value)
+    except (ValueError, ZeroDivisionError, OverflowError):
+        return None
+
+
+def get_sensor_reading(raw, sensor):
+    """Returns {"available", "value", "status", "states"} for one sensor."""
+    cc, data = raw(0x04, 0x2D, bytes([sensor["number"]]), lun=sensor.get("owner_lun", 0))
+    if cc != 0 or len(data) < 2 or data[1] & 0x20 or not data[1] & 0x40:
+        return {"available": False, "value": None, "status": "ns", "states": 0}
+    states = data[2] | (data[3] << 8 if len(data) > 3 else 0) if len(data) > 2 else 0
+    reading = {"available": True, "value": None, "status": "ok", "states": states}
+    if sensor["event_type"] == 0x01:  # threshold based
+        reading["value"] = convert_reading(sensor, data[0])
+        if states & 0x24:
+            reading["status"] = "nr"
+        elif states & 0x12:
+            reading["status"] = "cr"
+        elif states & 0x09:
+            reading["status"] = "nc"
+    return reading
+
+
+def format_sensor_line(sensor, reading):
+    """Formats one sensor the way `ipmitool sdr elist` / `sdr type` prints it."""
+    if not reading["available"]:
+        value_text = "No Reading"
+    elif reading["value"] is not None:
+        value = reading["value"]
+        unit = "percent" if sensor["percentage"] else UNIT_NAMES.get(sensor["unit"], "unspecified")
+        value_text = f"{value:.0f} {unit}" if value == int(value) else f"{value:.2f} {unit}"
+    elif sensor["sensor_type"] == SENSOR_TYPES["power supply"]:
+        value_text = ", ".join(s for bit, s in enumerate(PSU_STATES) if reading["states"] & (1 << bit))
+    else:
+        value_text = f"0x{reading['states']:02x}" if reading["states"] else ""
+    return f"{sensor['name']:<16} | {sensor['number']:02X}h | {reading['status']:<3} | {sensor['entity_id']:2d}.{sensor['entity_instance']} | {value_text}".rstrip()
+
+
+def read_sensor_lines(raw, sensors, sensor_type=None):
+    lines = []
+    for sensor in sensors:
+        if sensor_type is not None and sensor["sensor_type"] != sensor_type:
+            continue
+        lines.append(format_sensor_line(sensor, get_sensor_reading(raw, sensor)))
+    return "\n".join(lines)
+
+
+def read_sensors(raw):
+    """Enumerates the SDR repository and returns the decoded sensor records."""
+    return [s for s in (decode_sdr_record(r) for r in read_sdr_records(raw)) if s]
+
+
+# --- FRU ---
+def _decode_fru_field(data, pos):
+    type_length = data[pos]
+    if type_length == 0xC1:
+        return None, pos + 1
+    length = type_length & 0x3F
+    field = data[pos + 1:pos + 1 + length]
+    field_type = type_length >> 6
+    if field_type == 3:
+        text = field.decode("latin-1")
+    elif field_type == 2:  # 6-bit packed ASCII
+        bits = int.from_bytes(field, "little")
+        text = "".join(chr(((bits >> (6 * i)) & 0x3F) + 0x20) for i in range(length * 8 // 6))
+    elif field_type == 1:  # BCD plus
+        text = "".join("0123456789 -.???"[n] for b in field for n in (b >> 4, b & 0x0F))
+    else:
+        text = field.hex()
+    return text.rstrip("\x00").strip(), pos + 1 + length
+
+
+def _decode_fru_area(data, offset, skip, labels):
+    fields = {}
+    if not offset or offset >= len(data):
+        return fields
+    pos = offset + skip
+    for label in labels:
+        if pos >= len(data):
+            break
+        value, pos = _decode_fru_field(data, pos)
+        if value is None:
+            break
+        fields[label] = value
+    return fields
+
+
+def read_fru(raw, fru_id=0):
+    cc, data = raw(0x0A, 0x10, bytes([fru_id]))
+    _check(cc, "Get FRU Inventory Area Info")
+    size = struct.unpack_from("<H", data)[0]
+    fru = bytearray()
+    chunk = 16
+    while len(fru) < size:
+        count = min(chunk, size - len(fru))
+        cc, data = raw(0x0A, 0x11, bytes([fru_id]) + struct.pack("<HB", len(fru), count))
+        if cc in (0xC7, 0xC8, 0xCA) and chunk > 4:
+            chunk //= 2
+            continue
+        _check(cc, f"Read FRU Data at offset {len(fru)}")
+        if data[0] == 0:
+            break
+        fru += data[1:1 + data[0]]
+    return bytes(fru)
+
+
+def decode_fru(fru):
+    if len(fru) < 8 or fru[0] != 0x01:
+        raise SdrError("Unsupported FRU common header")
+    board = _decode_fru_area(fru, fru[3] * 8, 6, ["Board Mfg", "Board Product", "Board Serial", "Board Part Number"])
+    product = _decode_fru_area(fru, fru[4] * 8, 3, ["Product Manufacturer", "Product Name", "Product Part Number",
+                                                     "Product Version", "Product Serial", "Product Asset Tag"])
+    return {**board, **product}
+
+
+def format_fru(fields, fru_id=0):
+    lines = [f"FRU Device Description : Builtin FRU Device (ID {fru_id})"]
+    lines += [f" {label:<22}: {value}" for label, value in fields.items()]
+    return "\n".join(lines)
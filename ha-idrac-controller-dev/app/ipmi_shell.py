@@ -0,0 +1,144 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/ipmi_shell.py
+# One long-lived `ipmitool ... shell` process per server. Commands are written
+# to its stdin and each reply is framed by an `echo <marker>` sent right after
+# it, so a cycle costs one lanplus session instead of one per command.
+import os
+import re
+import select
+import shutil
+import subprocess
+import threading
+import time
+
+PROMPT = "ipmitool> "
+ERROR_LINE_REGEX = re.compile(r"^(Unable to |Error|Invalid |Insufficient privilege|.* command failed)", re.IGNORECASE)
+SESSION_ERROR_REGEX = re.compile(r"(RMCP\+ session|LAN session|Session Challenge|Activate Session|Close Session)", re.IGNORECASE)
+
+
+class ShellError(Exception):
+    pass
+
+
+class IpmitoolShell:
+    def __init__(self, base_args, log=None, idle_restart_seconds=50, max_commands=5000):
+        self.base_args = base_args
+        self.idle_restart_seconds = idle_restart_seconds
+        self.max_commands = max_commands
+        self._log = log or (lambda level, message: None)
+        self._lock = threading.Lock()
+        self.proc = None
+        self._buffer = b""
+        self._marker_count = 0
+        self._commands_on_proc = 0
+        self._last_used = 0.0
+        self.starts = 0
+        # Processes lost to a session error, a hang or an unexpected exit; planned idle recycles don't count
+        self.failures = 0
+        self.commands_sent = 0
+
+    def _start(self):
+        command = ["ipmitool"] + self.base_args + ["shell"]
+        if shutil.which("stdbuf"):
+            # ipmitool's stdout is block-buffered on a pipe; force line buffering so replies arrive promptly.
+            command = ["stdbuf", "-oL", "-eL"] + command
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.STDOUT, bufsize=0)
+        self._buffer = b""
+        self._commands_on_proc = 0
+        self._last_used = time.monotonic()
+        self.starts += 1
+        self._log("debug", f"Started ipmitool shell (pid {self.proc.pid}).")
+
+    def _stop(self):
+        if self.proc is None:
+            return
+        try:
+            if self.proc.poll() is None:
+                try:
+                    self.proc.stdin.write(b"exit\n")
+                    self.proc.stdin.flush()
+                    self.proc.wait(timeout=1)
+                except (OSError, subprocess.TimeoutExpired):
+                    self.proc.kill()
+                    self.proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        self.proc = None
+
+    def _fail(self):
+        self.failures += 1
+        self._stop()
+
+    def is_healthy(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def _read_until(self, marker, deadline):
+        lines = []
+        fd = self.proc.stdout.fileno()
+        while True:
+            while b"\n" in self._buffer:
+                raw_line, self._buffer = self._buffer.split(b"\n", 1)
+                line = raw_line.decode(errors="replace").rstrip("\r")
+                while line.startswith(PROMPT):
+                    line = line[len(PROMPT):]
+                if line.strip() == marker:
+                    return lines
+                lines.append(line)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise ShellError("ipmitool shell exited unexpectedly")
+            self._buffer += chunk
+
+    def run(self, args_list, timeout=15):
+        """Returns (success, output). Raises subprocess.TimeoutExpired or ShellError."""
+        command = " ".join(args_list)
+        with self._lock:
+            now = time.monotonic()
+            if self.proc is not None and (now - self._last_used > self.idle_restart_seconds or
+                                          self._commands_on_proc >= self.max_commands):
+                # The BMC drops idle sessions and ipmitool does not re-open them on its own.
+                self._stop()
+            if self.proc is not None and not self.is_healthy():
+                self._fail()
+            if self.proc is None:
+                self._start()
+
+            self._marker_count += 1
+            marker = f"__ha_idrac_{self._marker_count}__"
+            try:
+                self.proc.stdin.write(f"{command}\necho {marker}\n".encode())
+                self.proc.stdin.flush()
+                lines = self._read_until(marker, time.monotonic() + timeout)
+            except (OSError, ShellError) as e:
+                self._fail()
+                raise ShellError(str(e))
+            if lines is None:
+                # Hung on the BMC (or dead session retries); the next call gets a fresh process.
+                self._fail()
+                raise subprocess.TimeoutExpired(command, timeout)
+
+            self._last_used = time.monotonic()
+            self._commands_on_proc += 1
+            self.commands_sent += 1
+            lines = [line for line in lines if line.strip() not in (command, f"echo {marker}")]
+            errors = [line for line in lines if ERROR_LINE_REGEX.match(line.strip())]
+            if errors:
+                if any(SESSION_ERROR_REGEX.search(line) for line in errors):
+                    self._fail()
+                return False, "\n".join(lines)
+            return True, "\n".join(lines)
+
+    def close(self):
+        with self._lock:
+            self._stop()
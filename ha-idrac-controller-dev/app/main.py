@@ -6,16 +6,39 @@ import signal
 import threading
 import re
 import json
+import sqlite3
 from .ipmi_manager import IPMIManager
-from .mqtt_client import MqttClient
+from .fan_actuator import FanActuator
+from .fru_cache import FruCache, bmc_identity
+from .engine import PollingEngine
+from .scheduler import AdaptiveInterval, PhaseClock, assign_phases, phase_evenness
+from .circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN
+from .status_store import StatusStore
+from .mqtt_client import MqttClient, MqttConnection, HA_STATUS_TOPIC
+from .discovery_registry import DiscoveryRegistry, remove_orphaned
+from .publish_filter import PublishFilter, DEFAULT_DEADBANDS
+from .history import HistoryStore
+from .history_db import HistoryDatabase
 from . import web_server
 
 # --- Global Variables ---
 running = True
 threads = []
-status_lock = threading.Lock()
-ALL_SERVERS_STATUS = {}
-STATUS_FILE = "/data/current_status.json"
+STATUS = StatusStore()
+HISTORY = HistoryStore()
+HISTORY_DB = None  # HistoryDatabase when history_db is on
+DATA_DIR = os.getenv("DATA_DIR", "/data")
+STATUS_FILE = os.path.join(DATA_DIR, "current_status.json")
+SDR_CACHE_DIR = os.path.join(DATA_DIR, "sdr_cache")
+FRU_CACHE_DIR = os.path.join(DATA_DIR, "fru_cache")
+DISCOVERY_DIR = os.path.join(DATA_DIR, "discovery")
+MQTT_SPILL_FILE = os.path.join(DATA_DIR, "mqtt_unsent.json")
+HISTORY_DB_FILE = os.path.join(DATA_DIR, "history.db")
+PHASE_REPORT_SECONDS = 600
+CYCLE_ERROR_RETRY_SECONDS = 60
+
+def fan_slug(fan_name):
+    return f"fan_{re.sub(r'[^a-zA-Z0-9_]+', '', fan_name).lower()}_rpm"
 
 # --- Graceful Shutdown ---
 def graceful_shutdown(signum, frame):
@@ -28,7 +51,7 @@ signal.signal(signal.SIGINT, graceful_shutdown)
 
 # --- Server Worker Class ---
 class ServerWorker:
-    def __init__(self, server_config, global_opts):
+    def __init__(self, server_config, global_opts, phase=0.0, mqtt_connection=None):
         self.config = server_config
         self.global_opts = global_opts
         self.alias = self.config['alias']
@@ -39,139 +62,305 @@ class ServerWorker:
             ip=self.config['idrac_ip'],
             user=self.config['idrac_username'],
             password=self.config['idrac_password'],
-            log_level=self.log_level
+            log_level=self.log_level,
+            transport=self.config.get('ipmi_transport', self.global_opts['ipmi_transport']),
+            port=self.config.get('ipmi_port', 623),
+            cipher_suite=self.config.get('ipmi_cipher_suite', 3),
+            sdr_cache_dir=SDR_CACHE_DIR if self.config.get('sdr_cache', True) else None
+        )
+        self.scheduler = AdaptiveInterval(
+            self.global_opts["check_interval_seconds"],
+            min_interval=self.config.get('min_interval_seconds'),
+            max_interval=self.config.get('max_interval_seconds'),
+            low_threshold=self.config.get('low_temp_threshold', self.global_opts['low_temp_threshold']),
+            critical_threshold=self.config.get('critical_temp_threshold', self.global_opts['critical_temp_threshold'])
         )
+        self.phase_clock = PhaseClock(phase, jitter_seconds=self.global_opts["poll_jitter_seconds"])
+        self.breaker = CircuitBreaker(max_backoff=self.config.get('max_backoff_seconds', 900))
+        self._published_breaker = None
+        self._published_availability = None
+        self.fans = FanActuator(self.ipmi, reassert_seconds=self.config.get('fan_reassert_seconds', 300), log=self._log)
+        self.fru_cache = FruCache(FRU_CACHE_DIR, self.ipmi.endpoint, log=self._log) if self.config.get('fru_cache', True) else None
+        self._model_check_pending = False
+        self._sdr_refreshed_for = None  # the new BMC identity the SDR records were last re-read for
         
-        self.mqtt = MqttClient(client_id=f"ha_idrac_{self.alias}")
-        self.server_info = {}
-        self.discovered_sensors = set()
+        # Normally one connection shared by all workers; a worker created on its own gets a private one.
+        self._owns_mqtt_connection = mqtt_connection is None
+        if self._owns_mqtt_connection:
+            mqtt_connection = MqttConnection(client_id=f"ha_idrac_{self.alias}")
+            mqtt_connection.configure_broker(
+                self.global_opts["mqtt_host"], self.global_opts["mqtt_port"],
+                self.global_opts["mqtt_username"], self.global_opts["mqtt_password"],
+                self.log_level
+            )
+            mqtt_connection.configure_offline_buffer(self.global_opts.get("mqtt_offline_buffer_kb", 0))
+        self.mqtt = MqttClient(mqtt_connection, client_id=f"ha_idrac_{self.alias}")
+        self.publish_filter = PublishFilter(self.global_opts.get("mqtt_deadbands", DEFAULT_DEADBANDS),
+                                            self.global_opts.get("mqtt_heartbeat_seconds", 300))
+        self._filter_connects = None
+        self.server_info = {
+            "cpu_generic_temp_pattern": r"Temp",
+            "inlet_temp_name_pattern": r"Inlet Temp",
+            "exhaust_temp_name_pattern": r"Exhaust Temp"
+        }
+        self.discovered_sensors = {}  # slug -> config topic, announced (or found unchanged) since start-up
+        self.discovery = DiscoveryRegistry(DISCOVERY_DIR, self.alias, log=self._log)
+        self._rediscover_requested = False
+        self.cycle_count = 0
+        self.missed_deadlines = 0
+        self.last_cycle_seconds = None
+        self.last_start_lag_seconds = None
+        self._due_at = None
 
     def _log(self, level, message):
         print(f"[{level.upper()}] [{self.alias}] {message}", flush=True)
 
-    def _initialize(self):
+    def initialize(self):
         self._log("info", "Initializing server worker...")
         
-        model_data = self.ipmi.get_server_model_info()
-        if model_data:
-            self.server_info.update(model_data)
+        if self.fru_cache:
+            # Start from the cached model (or the generic defaults) and verify it during the first poll,
+            # so start-up never waits on a 20s FRU read per server.
+            cached = self.fru_cache.load()
+            if cached:
+                self.server_info.update(cached)
+            self._model_check_pending = True
+        else:
+            model_data = self.ipmi.get_server_model_info()
+            if model_data:
+                self.server_info.update(model_data)
         
-        self.mqtt.configure_broker(
-            self.global_opts["mqtt_host"], self.global_opts["mqtt_port"],
-            self.global_opts["mqtt_username"], self.global_opts["mqtt_password"],
-            self.log_level
-        )
         self.mqtt.set_device_info(
             server_alias=self.alias,
             manufacturer=self.server_info.get("manufacturer"),
             model=self.server_info.get("model"),
-            ip_address=self.config.get("idrac_ip")
+            ip_address=self.config.get("idrac_ip"),
+            log_level=self.log_level
         )
-        self.mqtt.connect()
+        self.discovery.load()
+        self.mqtt.connection.subscribe(HA_STATUS_TOPIC, self._on_ha_status)
 
-        for _ in range(10):
-            if self.mqtt.is_connected:
-                self._log("info", "MQTT connection confirmed.")
-                return True
-            time.sleep(1)
+        if self.mqtt.wait_connected(timeout=10):
+            self._log("info", "MQTT connection confirmed.")
+            return True
 
         self._log("error", "Failed to confirm MQTT connection after 10 seconds.")
         return False
 
     def run(self):
-        if not self._initialize():
+        if not self.initialize():
             self._log("error", "Initialization failed. Stopping worker.")
             return
 
+        time.sleep(self.first_poll_delay())
         while self.running and running:
-            start_time = time.time()
-            
-            raw_temp_data = self.ipmi.retrieve_temperatures_raw()
-            if raw_temp_data is None:
-                self.mqtt.publish(self.mqtt.availability_topic, "offline", retain=True)
-                self._log("warning", "Failed to retrieve data from iDRAC. Server appears to be offline.")
-                time.sleep(60)
-                continue
-
-            self.mqtt.publish(self.mqtt.availability_topic, "online", retain=True)
-            
-            temps = self.ipmi.parse_temperatures(raw_temp_data, r"Temp", r"Inlet Temp", r"Exhaust Temp")
-            fans = self.ipmi.parse_fan_rpms(self.ipmi.retrieve_fan_rpms_raw())
-            power = self.ipmi.parse_power_consumption(self.ipmi.retrieve_power_sdr_raw())
-
-            hottest_cpu = max(temps['cpu_temps']) if temps['cpu_temps'] else None
-            target_fan_speed = "Dell Auto"
-            if hottest_cpu is not None:
-                low_thresh = self.config.get('low_temp_threshold', self.global_opts['low_temp_threshold'])
-                crit_thresh = self.config.get('critical_temp_threshold', self.global_opts['critical_temp_threshold'])
-                high_fan = self.config.get('high_temp_fan_speed_percent', self.global_opts['high_temp_fan_speed_percent'])
-                base_fan = self.config.get('base_fan_speed_percent', self.global_opts['base_fan_speed_percent'])
-
-                if hottest_cpu >= crit_thresh:
-                    self.ipmi.apply_dell_fan_control_profile()
-                elif hottest_cpu >= low_thresh:
-                    target_fan_speed = high_fan
-                    self.ipmi.apply_user_fan_control_profile(target_fan_speed)
-                else:
-                    target_fan_speed = base_fan
-                    self.ipmi.apply_user_fan_control_profile(target_fan_speed)
+            try:
+                delay = self.run_cycle()
+            except Exception as e:
+                # Last resort: a bug must not kill the thread and leave the fans in manual mode unattended
+                self._log("error", f"Cycle failed unexpectedly ({type(e).__name__}: {e}). Restoring Dell auto fan control.")
+                self._restore_auto_fans()
+                delay = CYCLE_ERROR_RETRY_SECONDS
+            time.sleep(delay)
 
-            # Prepare data for both MQTT and the Web UI
-            
-            # This data structure is for MQTT publishing
-            mqtt_status_data = {
-                "hottest_cpu_temp": hottest_cpu,
-                "inlet_temp": temps.get('inlet_temp'),
-                "exhaust_temp": temps.get('exhaust_temp'),
-                "power": power,
-                "target_fan_speed": None if isinstance(target_fan_speed, str) else target_fan_speed,
-                "cpus": temps.get('cpu_temps', []),
-                "fans": fans
-            }
-            
-            # This data structure is for the Web UI, using the keys the template expects
-            with status_lock:
-                ALL_SERVERS_STATUS[self.alias] = {
-                    "alias": self.alias,
-                    "ip": self.config['idrac_ip'],
-                    "last_updated": time.strftime("%Y-%m-%d %H:%M:%S %Z"),
-                    "hottest_cpu_temp_c": hottest_cpu, # Fixed key
-                    "inlet_temp_c": temps.get('inlet_temp'), # Fixed key
-                    "exhaust_temp_c": temps.get('exhaust_temp'), # Fixed key
-                    "power_consumption_watts": power,
-                    "target_fan_speed_percent": target_fan_speed, # Fixed key
-                    "cpu_temps_c": temps.get('cpu_temps', []),
-                    "actual_fan_rpms": fans
-                }
-            
-            self._publish_mqtt_data(mqtt_status_data)
+        self.cleanup()
 
-            time_taken = time.time() - start_time
-            sleep_duration = max(0.1, self.global_opts["check_interval_seconds"] - time_taken)
-            self._log("debug", f"Cycle took {time_taken:.2f}s. Sleeping for {sleep_duration:.2f}s.")
-            time.sleep(sleep_duration)
+    def _restore_auto_fans(self):
+        self.fans.invalidate()
+        try:
+            self.ipmi.apply_dell_fan_control_profile()
+        except Exception as e:
+            self._log("error", f"Could not restore Dell auto fan control: {e}")
 
-        self.cleanup()
+    def first_poll_delay(self):
+        return self.phase_clock.first_delay(self.global_opts["check_interval_seconds"])
+
+    def run_cycle(self):
+        """Polls the iDRAC once, applies the fan profile and publishes. Returns the seconds to wait before the next cycle."""
+        due_at, self._due_at = self._due_at, None
+        if not self.breaker.allow_request():
+            return self._next_attempt_delay()
+
+        start_time = time.time()
+        start_monotonic = time.monotonic()
+        # How late this cycle started compared with when the previous one asked to be run
+        self.last_start_lag_seconds = round(max(0.0, start_monotonic - due_at), 3) if due_at else 0.0
+        self.phase_clock.mark_start()
+
+        if self.breaker.state == HALF_OPEN:
+            self._log("info", "Circuit half-open. Probing iDRAC with Get Device ID...")
+            if self.ipmi.get_device_id() is None:
+                return self._handle_failure("Probe failed.")
+
+        snapshot = self.ipmi.read_sensor_snapshot(
+            self.server_info["cpu_generic_temp_pattern"],
+            self.server_info["inlet_temp_name_pattern"], self.server_info["exhaust_temp_name_pattern"]
+        )
+        if snapshot is None:
+            return self._handle_failure("Failed to retrieve data from iDRAC. Server appears to be offline.")
+
+        if self.breaker.state != CLOSED or self.breaker.consecutive_failures:
+            self._log("info", "iDRAC is reachable again. Circuit closed.")
+        self.breaker.record_success()
+        if self._model_check_pending:
+            self._check_model_info()
+
+        if self._rediscover_requested:
+            self._rediscover()
+        self._publish_availability("online")
+        
+        temps = self.ipmi.parse_temperatures(snapshot)
+        fans = self.ipmi.parse_fan_rpms(snapshot)
+        power = self.ipmi.parse_power_consumption(snapshot)
+
+        hottest_cpu = max(temps['cpu_temps']) if temps['cpu_temps'] else None
+        target_fan_speed = "Dell Auto"
+        if hottest_cpu is not None:
+            low_thresh = self.config.get('low_temp_threshold', self.global_opts['low_temp_threshold'])
+            crit_thresh = self.config.get('critical_temp_threshold', self.global_opts['critical_temp_threshold'])
+            high_fan = self.config.get('high_temp_fan_speed_percent', self.global_opts['high_temp_fan_speed_percent'])
+            base_fan = self.config.get('base_fan_speed_percent', self.global_opts['base_fan_speed_percent'])
+
+            if hottest_cpu >= crit_thresh:
+                self.fans.set_auto()
+            elif hottest_cpu >= low_thresh:
+                target_fan_speed = high_fan
+                self.fans.set_manual(target_fan_speed)
+            else:
+                target_fan_speed = base_fan
+                self.fans.set_manual(target_fan_speed)
+
+        poll_interval = self.scheduler.update(hottest_cpu, time.monotonic())
+
+        # Prepare data for both MQTT and the Web UI
+        
+        # This data structure is for MQTT publishing
+        mqtt_status_data = {
+            "hottest_cpu_temp": hottest_cpu,
+            "inlet_temp": temps.get('inlet_temp'),
+            "exhaust_temp": temps.get('exhaust_temp'),
+            "power": power,
+            "target_fan_speed": None if isinstance(target_fan_speed, str) else target_fan_speed,
+            "poll_interval": round(poll_interval, 1),
+            "cpus": temps.get('cpu_temps', []),
+            "fans": fans
+        }
+        
+        history_values = self._history_values(mqtt_status_data)
+        HISTORY.record(self.alias, start_time, history_values)
+        if HISTORY_DB is not None:
+            HISTORY_DB.enqueue(self.alias, start_time, history_values)
+
+        # This data structure is for the Web UI, using the keys the template expects
+        STATUS.update(self.alias, {
+            "alias": self.alias,
+            "ip": self.config['idrac_ip'],
+            "last_updated": time.strftime("%Y-%m-%d %H:%M:%S %Z"),
+            "hottest_cpu_temp_c": hottest_cpu, # Fixed key
+            "inlet_temp_c": temps.get('inlet_temp'), # Fixed key
+            "exhaust_temp_c": temps.get('exhaust_temp'), # Fixed key
+            "power_consumption_watts": power,
+            "target_fan_speed_percent": target_fan_speed, # Fixed key
+            "cpu_temps_c": temps.get('cpu_temps', []),
+            "actual_fan_rpms": fans,
+            "voltages": snapshot.voltages,
+            "psu_status": snapshot.psus,
+            "fan_writes_sent": self.fans.writes_sent,
+            "fan_writes_skipped": self.fans.writes_skipped,
+            "poll_interval_seconds": round(poll_interval, 1),
+            "poll_phase": round(self.phase_clock.phase, 3),
+            "breaker": self.breaker.stats()
+        })
+        
+        self._publish_mqtt_data(mqtt_status_data)
+        self._publish_breaker_state()
+        self._record_cycle(time.monotonic() - start_monotonic, poll_interval)
+
+        time_taken = time.time() - start_time
+        sleep_duration = self.phase_clock.delay(poll_interval)
+        self._due_at = time.monotonic() + sleep_duration
+        self._log("debug", f"Cycle took {time_taken:.2f}s. Sleeping for {sleep_duration:.2f}s. "
+                           f"Fan writes sent/skipped: {self.fans.writes_sent}/{self.fans.writes_skipped}.")
+        return sleep_duration
+
+    def _check_model_info(self):
+        """Re-reads the FRU only when the BMC identity no longer matches the cached one."""
+        identity = bmc_identity(self.ipmi.get_device_id())
+        if self.fru_cache.matches(identity):
+            self._model_check_pending = False
+            return
+        if identity and self.fru_cache.identity and identity not in (self.fru_cache.identity, self._sdr_refreshed_for):
+            self._log("info", "BMC identity changed since the model was cached. Re-reading the FRU and SDR records.")
+            self.ipmi.refresh_sdr_cache()
+            self._sdr_refreshed_for = identity
+        model_data = self.ipmi.get_server_model_info()
+        if not model_data:
+            return  # try again next cycle
+        self._model_check_pending = False
+        self.fru_cache.store(identity, model_data)
+        if all(self.server_info.get(key) == value for key, value in model_data.items()):
+            return
+        self._log("info", f"Server model is {model_data.get('model')}. Updating MQTT device info.")
+        self.server_info.update(model_data)
+        self.mqtt.set_device_info(
+            server_alias=self.alias,
+            manufacturer=self.server_info.get("manufacturer"),
+            model=self.server_info.get("model"),
+            ip_address=self.config.get("idrac_ip")
+        )
+        # Re-announce every entity with the new device info on this cycle's publish
+        self.discovered_sensors.clear()
+        self._published_breaker = None
+
+    def _record_cycle(self, duration, poll_interval):
+        """A deadline is missed when a cycle finishes later than one interval after it was due to start."""
+        self.cycle_count += 1
+        self.last_cycle_seconds = round(duration, 3)
+        if self.last_start_lag_seconds + duration > poll_interval:
+            self.missed_deadlines += 1
+        STATUS.update(self.alias, {
+            "cycle_count": self.cycle_count,
+            "last_cycle_seconds": self.last_cycle_seconds,
+            "last_start_lag_seconds": self.last_start_lag_seconds,
+            "missed_deadlines": self.missed_deadlines,
+            "mqtt_publish": self.publish_filter.stats()
+        })
+
+    def _history_values(self, status):
+        """This cycle's readings keyed like the MQTT sensors, for the history store."""
+        values = {key: status[key] for key in ("hottest_cpu_temp", "inlet_temp", "exhaust_temp", "power", "target_fan_speed")}
+        for i, temp in enumerate(status['cpus']):
+            values[f"cpu_{i}_temp"] = temp
+        for fan in status['fans']:
+            values[fan_slug(fan['name'])] = fan.get('rpm')
+        return values
 
     def _publish_mqtt_data(self, status):
         sensors_to_publish = {
             "status": {"component": "binary_sensor", "device_class": "connectivity"},
-            "hottest_cpu_temp": {"component": "sensor", "device_class": "temperature", "unit": "°C"},
-            "inlet_temp": {"component": "sensor", "device_class": "temperature", "unit": "°C"},
-            "exhaust_temp": {"component": "sensor", "device_class": "temperature", "unit": "°C"},
-            "power": {"component": "sensor", "device_class": "power", "unit": "W", "state_class": "measurement", "icon": "mdi:flash"},
+            "hottest_cpu_temp": {"component": "sensor", "device_class": "temperature", "unit": "°C", "deadband": "temperature"},
+            "inlet_temp": {"component": "sensor", "device_class": "temperature", "unit": "°C", "deadband": "temperature"},
+            "exhaust_temp": {"component": "sensor", "device_class": "temperature", "unit": "°C", "deadband": "temperature"},
+            "power": {"component": "sensor", "device_class": "power", "unit": "W", "state_class": "measurement", "icon": "mdi:flash", "deadband": "power"},
             "target_fan_speed": {"component": "sensor", "unit": "%", "icon": "mdi:fan-chevron-up"},
+            "poll_interval": {"component": "sensor", "name": "Polling Interval", "device_class": "duration", "unit": "s", "icon": "mdi:timer-outline", "deadband": "interval"},
         }
         for i, temp in enumerate(status.get('cpus', [])):
-            sensors_to_publish[f"cpu_{i}_temp"] = {"component": "sensor", "name": f"CPU {i} Temperature", "device_class": "temperature", "unit": "°C"}
+            sensors_to_publish[f"cpu_{i}_temp"] = {"component": "sensor", "name": f"CPU {i} Temperature", "device_class": "temperature", "unit": "°C", "deadband": "temperature"}
         for fan in status.get('fans', []):
-            slug = f"fan_{re.sub(r'[^a-zA-Z0-9_]+', '', fan['name']).lower()}_rpm"
-            sensors_to_publish[slug] = {"component": "sensor", "name": f"{fan['name']} RPM", "unit": "RPM", "icon": "mdi:fan"}
+            slug = fan_slug(fan['name'])
+            sensors_to_publish[slug] = {"component": "sensor", "name": f"{fan['name']} RPM", "unit": "RPM", "icon": "mdi:fan", "deadband": "fan_rpm"}
 
+        # "combined": one JSON document per cycle on the server's state topic, read by each entity's value_template
+        combined = self.global_opts.get('mqtt_state_mode', 'combined') == 'combined'
+        values = {}
+        # Messages sent while the broker was away are lost, so everything goes out again after a reconnect
+        if self._filter_connects != self.mqtt.connection.connects:
+            self.publish_filter.reset()
+            self._filter_connects = self.mqtt.connection.connects
         for slug, desc in sensors_to_publish.items():
-            if slug not in self.discovered_sensors:
-                self.mqtt.publish_discovery(desc['component'], slug, desc.get('name', slug.replace("_", " ").title()), desc.get('device_class'), desc.get('unit'), desc.get('icon'), None, desc.get('state_class'))
-                self.discovered_sensors.add(slug)
+            self._announce(slug, desc['component'], desc.get('name', slug.replace("_", " ").title()), desc.get('device_class'), desc.get('unit'), desc.get('icon'), desc.get('state_class'),
+                           json_key=slug if combined else None)
             
             if desc['component'] == 'sensor':
                 value = None 
@@ -188,19 +377,122 @@ class ServerWorker:
                         pass 
                 else:
                     value = status.get(slug)
-                
+                values[slug] = value
+
+        classes = {slug: desc.get('deadband') for slug, desc in sensors_to_publish.items()}
+        if combined:
+            document = self.publish_filter.document(values, classes)
+            if document is not None:
+                self.mqtt.publish_state_document(document)
+        else:
+            for slug, value in self.publish_filter.select(values, classes).items():
                 self.mqtt.publish_state(slug, value)
+        self._remove_stale_sensors(list(sensors_to_publish) + ["breaker_state"])
+        self.discovery.save()
+
+    def _announce(self, slug, component, name, device_class=None, unit=None, icon=None, state_class=None, use_availability=True, json_key=None):
+        """Publishes an entity's discovery config, unless the broker already retains exactly this one."""
+        if slug in self.discovered_sensors or not self.mqtt.is_connected:
+            return
+        config = self.mqtt.discovery_config(component, slug, name, device_class, unit, icon, None, state_class, use_availability, json_key)
+        if not config:
+            return
+        topic, payload = config
+        if not self.discovery.is_published(topic, payload):
+            self.mqtt.publish(topic, payload, retain=True)
+            self.discovery.record(topic, payload)
+            self.publish_filter.forget(slug)
+        self.discovered_sensors[slug] = topic
+
+    def _remove_stale_sensors(self, slugs):
+        current = {self.discovered_sensors[slug] for slug in slugs if slug in self.discovered_sensors}
+        stale = set(self.discovery.sweep(current))
+        if not stale:
+            return
+        for topic in stale:
+            self.mqtt.publish(topic, "", retain=True)  # an empty retained config deletes the entity
+        for slug in [slug for slug, topic in self.discovered_sensors.items() if topic in stale]:
+            del self.discovered_sensors[slug]
+        self._log("info", f"Removed {len(stale)} sensor(s) no longer reported by the iDRAC.")
+
+    def _on_ha_status(self, payload):
+        """Runs on the MQTT network thread; the re-announce itself happens on the worker's next poll."""
+        if payload == "online":
+            self._rediscover_requested = True
+
+    def _rediscover(self):
+        """Home Assistant (re)started: send every config and state again, whatever the registry says."""
+        self._rediscover_requested = False
+        self._log("info", "Home Assistant came online. Re-announcing all entities.")
+        self.discovered_sensors.clear()
+        self.discovery.invalidate()
+        self.publish_filter.reset()
+        self._published_breaker = None
+
+    def _publish_availability(self, state):
+        """Availability is retained, so it is only re-sent when it changes or the broker connection was re-established."""
+        published = (state, self.mqtt.connection.connects)
+        if published == self._published_availability:
+            return
+        self.mqtt.publish(self.mqtt.availability_topic, state, retain=True)
+        if self.mqtt.is_connected:
+            self._published_availability = published
+
+    def _next_attempt_delay(self):
+        if self.breaker.seconds_until_retry() > 0:
+            return self.breaker.seconds_until_retry()
+        return self.phase_clock.delay(self.scheduler.base_interval)
+
+    def _handle_failure(self, message):
+        self.breaker.record_failure()
+        self.mark_offline()
+        wait = self._next_attempt_delay()
+        self._log("warning", f"{message} Circuit {self.breaker.state}, next attempt in {wait:.0f}s.")
+        STATUS.update(self.alias, {"breaker": self.breaker.stats()}, default={
+            "alias": self.alias, "ip": self.config['idrac_ip'], "last_updated": "never",
+            "hottest_cpu_temp_c": None, "inlet_temp_c": None, "exhaust_temp_c": None,
+            "power_consumption_watts": None, "target_fan_speed_percent": "N/A",
+            "cpu_temps_c": [], "actual_fan_rpms": [], "psu_status": []
+        })
+        self._publish_breaker_state()
+        return wait
+
+    def _publish_breaker_state(self):
+        stats = self.breaker.stats()
+        del stats["retry_in_seconds"]  # changes every second, not worth a publish on its own
+        if stats == self._published_breaker:
+            return
+        self._announce("breaker_state", "sensor", "Connection Circuit", icon="mdi:electric-switch", use_availability=False)
+        self.discovery.save()
+        attributes = {key: value for key, value in stats.items() if key != "state"}
+        self.mqtt.publish_state("breaker_state", stats["state"], attributes=attributes)
+        self._published_breaker = stats
+
+    def mark_offline(self):
+        self._publish_availability("offline")
+        if self.fru_cache:
+            self._model_check_pending = True  # it may come back as a different box
+        self.fans.invalidate()
+        self.scheduler.reset()
 
     def cleanup(self):
         self._log("info", "Worker shutting down. Reverting to Dell auto fans.")
         self.ipmi.apply_dell_fan_control_profile()
-        if self.mqtt.is_connected:
-            self.mqtt.disconnect()
+        self.ipmi.close()
+        self.mqtt.disconnect()
+        if self._owns_mqtt_connection:
+            self.mqtt.connection.disconnect()
         self._log("info", "Worker cleanup complete.")
 
     def stop(self):
         self.running = False
 
+def _persist_status(min_interval=0, force=False):
+    try:
+        STATUS.persist(STATUS_FILE, min_interval, force=force)
+    except (IOError, OSError) as e:
+        print(f"[MAIN] WARNING: Could not write {STATUS_FILE}: {e}", flush=True)
+
 # --- Main Execution ---
 if __name__ == "__main__":
     print("[MAIN] ===== HA iDRAC Multi-Server Controller Starting =====", flush=True)
@@ -208,17 +500,42 @@ if __name__ == "__main__":
     global_options = {
         "log_level": os.getenv("LOG_LEVEL", "info"),
         "check_interval_seconds": int(os.getenv("CHECK_INTERVAL_SECONDS", 60)),
+        "ipmi_transport": os.getenv("IPMI_TRANSPORT", "ipmitool"),
+        "polling_engine": os.getenv("POLLING_ENGINE", "threads"),
+        "max_concurrency": int(os.getenv("MAX_CONCURRENCY", 32)),
+        "cycle_timeout_seconds": int(os.getenv("CYCLE_TIMEOUT_SECONDS", 120)),
+        "poll_jitter_seconds": float(os.getenv("POLL_JITTER_SECONDS", 0)),
         "mqtt_host": os.getenv("MQTT_HOST", "core-mosquitto"),
         "mqtt_port": int(os.getenv("MQTT_PORT", 1883)),
         "mqtt_username": os.getenv("MQTT_USERNAME", ""),
         "mqtt_password": os.getenv("MQTT_PASSWORD", ""),
+        "mqtt_state_mode": os.getenv("MQTT_STATE_MODE", "combined"),
+        "mqtt_deadbands": {
+            "temperature": os.getenv("MQTT_DEADBAND_TEMPERATURE", "1"),
+            "fan_rpm": os.getenv("MQTT_DEADBAND_FAN_RPM", "100"),
+            "power": os.getenv("MQTT_DEADBAND_POWER", "5"),
+            "interval": os.getenv("MQTT_DEADBAND_INTERVAL", "25%"),
+        },
+        "mqtt_heartbeat_seconds": int(os.getenv("MQTT_HEARTBEAT_SECONDS", 300)),
+        "mqtt_offline_buffer_kb": int(os.getenv("MQTT_OFFLINE_BUFFER_KB", 1024)),
+        "mqtt_offline_spill": os.getenv("MQTT_OFFLINE_SPILL", "false").lower() == "true",
         "base_fan_speed_percent": int(os.getenv("BASE_FAN_SPEED_PERCENT", 20)),
         "low_temp_threshold": int(os.getenv("LOW_TEMP_THRESHOLD", 45)),
         "high_temp_fan_speed_percent": int(os.getenv("HIGH_TEMP_FAN_SPEED_PERCENT", 50)),
         "critical_temp_threshold": int(os.getenv("CRITICAL_TEMP_THRESHOLD", 65)),
+        "status_persist_seconds": int(os.getenv("STATUS_PERSIST_SECONDS", 10)),
+        "web_server_mode": os.getenv("WEB_SERVER_MODE", "waitress"),
+        "web_threads": int(os.getenv("WEB_THREADS", 16)),
+        "history_days": int(os.getenv("HISTORY_DAYS", 2)),
+        "history_db": os.getenv("HISTORY_DB", "false").lower() == "true",
+        "history_db_retention": {
+            "raw": int(os.getenv("HISTORY_DB_RAW_HOURS", 24)) * 3600,
+            "5m": int(os.getenv("HISTORY_DB_5M_DAYS", 30)) * 86400,
+            "1h": int(os.getenv("HISTORY_DB_1H_DAYS", 365)) * 86400,
+        },
     }
 
-    SERVERS_CONFIG_FILE = "/data/servers_config.json"
+    SERVERS_CONFIG_FILE = os.path.join(DATA_DIR, "servers_config.json")
     servers_configs_list = []
     if not os.path.exists(SERVERS_CONFIG_FILE):
         with open(SERVERS_CONFIG_FILE, 'w') as f: json.dump([], f)
@@ -227,29 +544,70 @@ if __name__ == "__main__":
             try: servers_configs_list = json.load(f)
             except json.JSONDecodeError: pass
 
+    HISTORY.configure(global_options["history_days"])
+    if global_options["history_db"]:
+        # One flush per polling interval, so each one carries a cycle of every server
+        HISTORY_DB = HistoryDatabase(HISTORY_DB_FILE, global_options["history_db_retention"],
+                                     flush_seconds=global_options["check_interval_seconds"],
+                                     log=lambda level, message: print(f"[{level.upper()}] [HISTORY] {message}", flush=True))
+        try:
+            HISTORY_DB.start()
+        except sqlite3.Error as e:
+            print(f"[MAIN] WARNING: Could not open {HISTORY_DB_FILE}: {e}. Sensor history will not be stored on disk.", flush=True)
+            HISTORY_DB = None
     web_server.global_config = global_options
     web_server_port = int(os.getenv("INGRESS_PORT", 8099))
-    web_thread = threading.Thread(target=web_server.run_web_server, args=(web_server_port, STATUS_FILE, status_lock), daemon=True)
+    web_thread = threading.Thread(target=web_server.run_web_server, args=(web_server_port, STATUS, global_options["web_server_mode"], global_options["web_threads"], HISTORY, HISTORY_DB), daemon=True)
     web_thread.start()
 
-    worker_instances = []
-    for server_conf in servers_configs_list:
-        if server_conf.get("enabled", False):
-            worker = ServerWorker(server_conf, global_options)
-            worker_instances.append(worker)
+    mqtt_connection = MqttConnection()
+    mqtt_connection.configure_broker(
+        global_options["mqtt_host"], global_options["mqtt_port"],
+        global_options["mqtt_username"], global_options["mqtt_password"],
+        global_options["log_level"]
+    )
+    mqtt_connection.configure_offline_buffer(
+        global_options["mqtt_offline_buffer_kb"],
+        MQTT_SPILL_FILE if global_options["mqtt_offline_spill"] else None
+    )
+    mqtt_connection.connect()
+    if mqtt_connection.wait_connected(timeout=10):
+        remove_orphaned(DISCOVERY_DIR, [conf['alias'] for conf in servers_configs_list if conf.get('alias')],
+                        mqtt_connection.publish, log=lambda level, message: print(f"[MAIN] {message}", flush=True))
+
+    enabled_configs = [conf for conf in servers_configs_list if conf.get("enabled", False)]
+    phases = assign_phases([conf['alias'] for conf in enabled_configs])
+    worker_instances = [ServerWorker(conf, global_options, phases[conf['alias']], mqtt_connection) for conf in enabled_configs]
+    print(f"[MAIN] Poll phases assigned for {len(phases)} server(s). Phase evenness: {phase_evenness(list(phases.values())):.2f}", flush=True)
+    engine = None
+    if global_options["polling_engine"] == "asyncio":
+        engine = PollingEngine(worker_instances, global_options["max_concurrency"], global_options["cycle_timeout_seconds"])
+        engine.start()
+    else:
+        for worker in worker_instances:
             thread = threading.Thread(target=worker.run, daemon=True)
             threads.append(thread)
             thread.start()
 
+    last_phase_report = time.time()
     try:
         while running:
-            with status_lock:
-                with open(STATUS_FILE, 'w') as f: json.dump(list(ALL_SERVERS_STATUS.values()), f, indent=4)
+            _persist_status(global_options["status_persist_seconds"])
+            if time.time() - last_phase_report >= PHASE_REPORT_SECONDS:
+                last_phase_report = time.time()
+                observed = [w.phase_clock.observed_phase(global_options["check_interval_seconds"]) for w in worker_instances]
+                observed = [p for p in observed if p is not None]
+                if observed:
+                    print(f"[MAIN] Observed poll phase evenness across {len(observed)} server(s): {phase_evenness(observed):.2f}", flush=True)
             time.sleep(2)
     except KeyboardInterrupt:
         graceful_shutdown(None, None)
 
     print("[MAIN] Waiting for all server threads to terminate...", flush=True)
+    if engine: engine.stop()
     for worker in worker_instances: worker.stop()
     for thread in threads: thread.join(timeout=10)
+    mqtt_connection.disconnect()
+    if HISTORY_DB: HISTORY_DB.stop()
+    _persist_status(force=True)
     print("[MAIN] ===== HA iDRAC Controller Stopped =====", flush=True)
\ No newline at end of file
@@ -2,8 +2,17 @@
 import paho.mqtt.client as mqtt
 import json
 import re
+import threading
+
+from .offline_buffer import OfflineBuffer
+
+CONTROLLER_TOPIC = "ha_idrac_controller"
+HA_STATUS_TOPIC = "homeassistant/status"
+
+class MqttConnection:
+    """The one broker connection shared by every server worker. Its last will marks the whole
+    controller offline; each server's own availability is published by its worker."""
 
-class MqttClient:
     def __init__(self, client_id="ha_idrac_controller"):
         self.client_id = client_id
         self.client = mqtt.Client(client_id=self.client_id, protocol=mqtt.MQTTv311)
@@ -11,15 +20,28 @@ class MqttClient:
         self.port = 1883
         self.username = ""
         self.password = ""
-        self.is_connected = False
+        self.connected = threading.Event()
         self.log_level = "info"
-        
-        self.base_topic = "ha_idrac_controller"
-        self.availability_topic = f"{self.base_topic}/status"
-        self.device_info_dict = None
+        self.availability_topic = f"{CONTROLLER_TOPIC}/status"
+        self.connects = 0
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._subscriptions = {}  # topic -> callbacks taking the decoded payload
+        self.buffer = None
+        self._buffer_lock = threading.Lock()
 
         self.client.on_connect = self.on_connect
         self.client.on_disconnect = self.on_disconnect
+        self.client.on_message = self.on_message
+
+    @property
+    def is_connected(self):
+        return self.connected.is_set()
+
+    @property
+    def can_publish(self):
+        """False only when a message would be dropped: disconnected and no offline buffer."""
+        return self.is_connected or self.buffer is not None
 
     def _log(self, level, message):
         levels = {"trace": -1, "debug": 0, "info": 1, "warning": 2, "error": 3, "fatal": 4}
@@ -35,73 +57,183 @@ class MqttClient:
         if self.username:
             self.client.username_pw_set(self.username, self.password)
 
-    def set_device_info(self, server_alias, manufacturer, model, ip_address):
-        safe_alias = re.sub(r'[^a-zA-Z0-9_-]+', '_', server_alias)
-        self.base_topic = f"ha_idrac_controller/{safe_alias}"
-        self.availability_topic = f"{self.base_topic}/status"
-        self.device_info_dict = {
-            "identifiers": [f"idrac_controller_{safe_alias}"],
-            "name": f"iDRAC ({server_alias})",
-            "model": model or "PowerEdge Server",
-            "manufacturer": manufacturer or "DELL",
-            "configuration_url": f"http://{ip_address}" if ip_address else None
-        }
-        self._log("info", f"Device info for MQTT discovery set for '{server_alias}'")
+    def configure_offline_buffer(self, max_kb, spill_path=None):
+        """Keep the newest message per topic while disconnected (up to max_kb) and replay them on reconnect."""
+        if max_kb <= 0:
+            self.buffer = None
+            return
+        self.buffer = OfflineBuffer(max_kb * 1024, spill_path, log=self._log)
+        self.buffer.load_spilled()
 
     def on_connect(self, client, userdata, flags, rc):
         if rc == 0:
             self._log("info", f"Connected successfully to broker {self.broker_address}:{self.port}")
-            self.is_connected = True
+            self.client.publish(self.availability_topic, "online", qos=1, retain=True)
+            for topic in list(self._subscriptions):
+                self.client.subscribe(topic, qos=1)
+            self.connects += 1
+            with self._buffer_lock:
+                # Replayed before anything newer can be published, so a stale value never lands last
+                pending = self.buffer.drain() if self.buffer else []
+                for topic, payload, retain, qos in pending:
+                    self.client.publish(topic, payload, qos=qos, retain=retain)
+                self.connected.set()
+            if pending:
+                self._log("info", f"Replayed {len(pending)} message(s) held while disconnected "
+                                  f"({self.buffer.dropped} dropped so far because the buffer was full).")
         else:
             self._log("error", f"Connection failed with code {rc}")
-            self.is_connected = False
+            self.connected.clear()
 
     def on_disconnect(self, client, userdata, rc):
         self._log("info", f"Disconnected from broker with result code {rc}.")
-        self.is_connected = False
+        self.connected.clear()
+
+    def on_message(self, client, userdata, msg):
+        if msg.retain:
+            return  # only live messages count, e.g. a birth message somebody left retained is not a restart
+        payload = msg.payload.decode(errors="replace")
+        for callback in list(self._subscriptions.get(msg.topic, ())):
+            try:
+                callback(payload)
+            except Exception as e:
+                self._log("error", f"Handler for {msg.topic} failed: {e}")
+
+    def subscribe(self, topic, callback):
+        """Calls `callback(payload)` for every message on `topic` (no wildcards), across reconnects."""
+        callbacks = self._subscriptions.setdefault(topic, [])
+        callbacks.append(callback)
+        if len(callbacks) == 1 and self.is_connected:
+            self.client.subscribe(topic, qos=1)
 
     def connect(self):
-        if self.is_connected: return
-        self._log("info", f"Attempting to connect to broker {self.broker_address}...")
-        try:
-            self.client.will_set(self.availability_topic, payload="offline", qos=1, retain=True)
-            self.client.connect(self.broker_address, self.port, 60)
-            self.client.loop_start()
-        except Exception as e:
-            self._log("error", f"Could not connect to broker: {e}")
+        """Starts the network loop once; paho keeps reconnecting in the background after that."""
+        with self._start_lock:
+            if self._started: return
+            self._log("info", f"Attempting to connect to broker {self.broker_address}...")
+            try:
+                self.client.will_set(self.availability_topic, payload="offline", qos=1, retain=True)
+                self.client.connect_async(self.broker_address, self.port, 60)
+                self.client.loop_start()
+                self._started = True
+            except Exception as e:
+                self._log("error", f"Could not connect to broker: {e}")
+
+    def wait_connected(self, timeout=None):
+        return self.connected.wait(timeout)
 
     def disconnect(self):
-        if not self.is_connected: return
-        self.publish(self.availability_topic, "offline", retain=True)
-        self.client.loop_stop()
+        if self.buffer:
+            self.buffer.spill()
+        if not self._started: return
+        if self.is_connected:
+            self.client.publish(self.availability_topic, "offline", qos=1, retain=True)
         self.client.disconnect()
+        self.client.loop_stop()
+        self._started = False
+        self.connected.clear()
         self._log("info", "Gracefully disconnected.")
-        self.is_connected = False
 
     def publish(self, topic, payload, retain=False, qos=0):
-        if not self.is_connected:
-            self._log("warning", f"Not connected. Cannot publish to {topic}.")
+        if self.is_connected and self._send(topic, payload, retain, qos):
             return
+        with self._buffer_lock:
+            if self.is_connected and self._send(topic, payload, retain, qos):
+                return  # reconnected in the meantime
+            if self.buffer is not None:
+                self.buffer.put(topic, payload, retain, qos)
+                return
+        self._log("warning", f"Not connected. Cannot publish to {topic}.")
+
+    def _send(self, topic, payload, retain, qos):
         try:
-            self.client.publish(topic, payload, qos=qos, retain=retain)
+            return self.client.publish(topic, payload, qos=qos, retain=retain).rc == mqtt.MQTT_ERR_SUCCESS
         except Exception as e:
             self._log("error", f"Failed to publish to {topic}: {e}")
+            return True  # not a connection problem, so buffering it would not help
+
+class MqttClient:
+    """One server's topics and discovery on top of the shared MqttConnection."""
+
+    def __init__(self, connection, client_id="ha_idrac_controller"):
+        self.connection = connection
+        self.client_id = client_id
+        self.log_level = "info"
+
+        self.base_topic = CONTROLLER_TOPIC
+        self.availability_topic = f"{self.base_topic}/status"
+        self.state_topic = f"{self.base_topic}/state"
+        self.device_info_dict = None
+
+    @property
+    def is_connected(self):
+        return self.connection.is_connected
 
-    def publish_discovery(self, component, sensor_type_slug, sensor_name, device_class=None, unit_of_measurement=None, icon=None, value_template=None, state_class=None):
+    def _log(self, level, message):
+        levels = {"trace": -1, "debug": 0, "info": 1, "warning": 2, "error": 3, "fatal": 4}
+        if levels.get(self.log_level, levels["info"]) <= levels.get(level.lower(), levels["info"]):
+            print(f"[{level.upper()}] MQTT ({self.client_id}): {message}", flush=True)
+
+    def set_device_info(self, server_alias, manufacturer, model, ip_address, log_level=None):
+        if log_level:
+            self.log_level = log_level.lower()
+        safe_alias = re.sub(r'[^a-zA-Z0-9_-]+', '_', server_alias)
+        self.base_topic = f"{CONTROLLER_TOPIC}/{safe_alias}"
+        self.availability_topic = f"{self.base_topic}/status"
+        self.state_topic = f"{self.base_topic}/state"
+        self.device_info_dict = {
+            "identifiers": [f"idrac_controller_{safe_alias}"],
+            "name": f"iDRAC ({server_alias})",
+            "model": model or "PowerEdge Server",
+            "manufacturer": manufacturer or "DELL",
+            "configuration_url": f"http://{ip_address}" if ip_address else None
+        }
+        self._log("info", f"Device info for MQTT discovery set for '{server_alias}'")
+
+    def wait_connected(self, timeout=None):
+        self.connection.connect()
+        return self.connection.wait_connected(timeout)
+
+    def disconnect(self):
+        """Marks this server offline; the shared connection itself stays up for the other servers."""
+        if not self.is_connected: return
+        self.publish(self.availability_topic, "offline", retain=True)
+
+    def publish(self, topic, payload, retain=False, qos=0):
+        self.connection.publish(topic, payload, retain=retain, qos=qos)
+
+    def publish_discovery(self, component, sensor_type_slug, sensor_name, device_class=None, unit_of_measurement=None, icon=None, value_template=None, state_class=None, use_availability=True, json_key=None):
+        config = self.discovery_config(component, sensor_type_slug, sensor_name, device_class, unit_of_measurement, icon, value_template, state_class, use_availability, json_key)
+        if config:
+            self.publish(*config, retain=True)
+
+    def discovery_config(self, component, sensor_type_slug, sensor_name, device_class=None, unit_of_measurement=None, icon=None, value_template=None, state_class=None, use_availability=True, json_key=None):
+        """Returns (config topic, JSON payload) for an entity, or None before the device info is set."""
         if not self.device_info_dict:
-            return
+            return None
 
         unique_id = f"{self.device_info_dict['identifiers'][0]}_{sensor_type_slug}"
         config_topic = f"homeassistant/{component}/{unique_id}/config"
-        
+
         payload = {
             "name": sensor_name,
             "unique_id": unique_id,
             "device": self.device_info_dict,
-            "availability_topic": self.availability_topic,
         }
-        
-        if component == 'sensor':
+        # Every entity goes unavailable with the controller (its last will). Sensors describing the
+        # connection itself must stay readable while the server is offline, so they skip the server's topic.
+        availability = [{"topic": self.connection.availability_topic}]
+        if use_availability:
+            availability.append({"topic": self.availability_topic})
+        payload["availability"] = availability
+        payload["availability_mode"] = "all"
+
+        if component == 'sensor' and json_key:
+            # Read from the server's combined state document; the unique_id is unchanged, so Home Assistant
+            # updates the existing entity (and keeps its history) when switching between modes.
+            payload["state_topic"] = self.state_topic
+            payload["value_template"] = f"{{{{ value_json.{json_key} }}}}"
+        elif component == 'sensor':
             payload["state_topic"] = f"{self.base_topic}/sensor/{sensor_type_slug}"
             payload["json_attributes_topic"] = f"{self.base_topic}/sensor/{sensor_type_slug}"
             payload["value_template"] = "{{ value_json.state }}"
@@ -109,21 +241,27 @@ class MqttClient:
             payload["state_topic"] = self.availability_topic
             payload["payload_on"] = "online"
             payload["payload_off"] = "offline"
-        
+
         if device_class: payload["device_class"] = device_class
         if unit_of_measurement: payload["unit_of_measurement"] = unit_of_measurement
         if icon: payload["icon"] = icon
         if state_class: payload["state_class"] = state_class
 
-        self.publish(config_topic, json.dumps(payload), retain=True)
+        return config_topic, json.dumps(payload)
 
     def publish_state(self, sensor_type_slug, state, attributes=None):
-        if not self.is_connected:
+        if not self.connection.can_publish:
             return
-            
+
         topic = f"{self.base_topic}/sensor/{sensor_type_slug}"
         payload = {"state": state}
         if attributes:
             payload.update(attributes)
-            
-        self.publish(topic, json.dumps(payload))
\ No newline at end of file
+
+        self.publish(topic, json.dumps(payload))
+
+    def publish_state_document(self, values):
+        """All of a server's sensor values for one cycle as a single message on its state topic."""
+        if not self.connection.can_publish:
+            return
+        self.publish(self.state_topic, json.dumps(values))
@@ -0,0 +1,85 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/offline_buffer.py
+# Holds what was published while the broker was unreachable, so it can be
+# replayed in one batch on reconnect. Only the newest payload per topic is kept:
+# a state that was overwritten during the outage is of no use to Home Assistant.
+# The total size is capped; the topics that went longest without an update are
+# dropped (and counted) first. Optionally the buffer is written to disk when
+# the controller stops while still disconnected, and picked up on the next start.
+import json
+import os
+from collections import OrderedDict
+
+from .sdr_cache import write_json_atomic
+
+
+def _size(topic, payload):
+    return len(topic) + len(payload)
+
+
+class OfflineBuffer:
+    def __init__(self, max_bytes=1024 * 1024, spill_path=None, log=None):
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self._log = log or (lambda level, message: None)
+        self._messages = OrderedDict()  # topic -> (payload, retain, qos)
+        self.bytes = 0
+        self.buffered = 0
+        self.replaced = 0
+        self.dropped = 0
+        self.replayed = 0
+        self._warned = False
+
+    def __len__(self):
+        return len(self._messages)
+
+    def put(self, topic, payload, retain=False, qos=0):
+        payload = payload if isinstance(payload, str) else str(payload if payload is not None else "")
+        old = self._messages.pop(topic, None)
+        if old is not None:
+            self.bytes -= _size(topic, old[0])
+            self.replaced += 1
+        self._messages[topic] = (payload, retain, qos)
+        self.bytes += _size(topic, payload)
+        self.buffered += 1
+        while self.bytes > self.max_bytes and self._messages:
+            if not self._warned:
+                self._log("warning", f"Offline buffer full ({self.max_bytes // 1024} KB). Dropping the oldest messages.")
+                self._warned = True
+            dropped_topic, (dropped_payload, _, _) = self._messages.popitem(last=False)
+            self.bytes -= _size(dropped_topic, dropped_payload)
+            self.dropped += 1
+
+    def drain(self):
+        """Returns the buffered messages as (topic, payload, retain, qos), oldest first, and empties the buffer."""
+        messages = [(topic, *message) for topic, message in self._messages.items()]
+        self._messages.clear()
+        self.bytes = 0
+        self._warned = False
+        self.replayed += len(messages)
+        return messages
+
+    def spill(self):
+        if not self.spill_path or not self._messages:
+            return
+        try:
+            write_json_atomic(self.spill_path, [[topic, *message] for topic, message in self._messages.items()])
+            self._log("info", f"Saved {len(self._messages)} unsent message(s) to {self.spill_path}.")
+        except (IOError, OSError) as e:
+            self._log("warning", f"Could not save unsent messages: {e}")
+
+    def load_spilled(self):
+        if not self.spill_path:
+            return
+        try:
+            with open(self.spill_path, 'r') as f:
+                messages = json.load(f)
+            os.remove(self.spill_path)
+        except (IOError, OSError, json.JSONDecodeError):
+            return
+        for topic, payload, retain, qos in messages:
+            self.put(topic, payload, retain, qos)
+        self._log("info", f"Loaded {len(messages)} unsent message(s) from the last run.")
+
+    def stats(self):
+        return {"pending": len(self._messages), "bytes": self.bytes, "buffered": self.buffered,
+                "replaced": self.replaced, "dropped": self.dropped, "replayed": self.replayed}
@@ -0,0 +1,101 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/publish_filter.py
+# Decides which sensor values are worth an MQTT message. A value is sent when it
+# moved further than its class's deadband from the value last sent, or when it
+# has not been sent for heartbeat_seconds. Deadbands are absolute ("1" = ±1 unit)
+# or relative to the last sent value ("5%"). Anything without a rule, and any
+# non-numeric value, is sent on every change.
+import time
+
+DEFAULT_DEADBANDS = {"temperature": "1", "fan_rpm": "100", "power": "5", "interval": "25%"}
+
+
+def parse_deadband(spec):
+    """Returns (absolute, relative) for "1.5" or "5%"; an empty or invalid spec is (0, 0)."""
+    text = str(spec if spec is not None else "").strip()
+    try:
+        if text.endswith("%"):
+            return 0.0, max(0.0, float(text[:-1])) / 100
+        return max(0.0, float(text or 0)), 0.0
+    except ValueError:
+        return 0.0, 0.0
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class PublishFilter:
+    def __init__(self, deadbands=None, heartbeat_seconds=300, clock=time.monotonic):
+        self.rules = {name: parse_deadband(spec) for name, spec in (deadbands or {}).items()}
+        self.heartbeat_seconds = heartbeat_seconds
+        self._clock = clock
+        self._sent = {}  # key -> (value, monotonic time it was sent)
+        self.values_sent = 0
+        self.values_suppressed = 0
+        self.heartbeats = 0
+        self.messages_suppressed = 0
+
+    def reset(self):
+        """Forget everything sent, e.g. after a reconnect, so the next values all go out."""
+        self._sent.clear()
+
+    def forget(self, key):
+        self._sent.pop(key, None)
+
+    def _changed(self, key, value, sensor_class):
+        last = self._sent[key][0]
+        if not (_is_number(value) and _is_number(last)):
+            return value != last
+        absolute, relative = self.rules.get(sensor_class, (0.0, 0.0))
+        band = max(absolute, abs(last) * relative)
+        return abs(value - last) > band if band else value != last
+
+    def _select(self, key, value, sensor_class, now):
+        if self.heartbeat_seconds <= 0 or key not in self._sent:
+            return True
+        if self._changed(key, value, sensor_class):
+            return True
+        if now - self._sent[key][1] >= self.heartbeat_seconds:
+            self.heartbeats += 1
+            return True
+        return False
+
+    def select(self, values, classes=None):
+        """The subset of values to publish now, each as its own message. Selected values count as sent."""
+        classes = classes or {}
+        now = self._clock()
+        selected = {}
+        for key, value in values.items():
+            if self._select(key, value, classes.get(key), now):
+                selected[key] = value
+                self._sent[key] = (value, now)
+            else:
+                self.values_suppressed += 1
+                self.messages_suppressed += 1
+        self.values_sent += len(selected)
+        return selected
+
+    def document(self, values, classes=None):
+        """The values to publish as one combined message, or None when nothing moved past its deadband.
+        Values still inside their deadband keep the number last sent, so their entities don't change."""
+        classes = classes or {}
+        now = self._clock()
+        changed = [key for key, value in values.items() if self._select(key, value, classes.get(key), now)]
+        if not changed:
+            self.values_suppressed += len(values)
+            self.messages_suppressed += 1
+            return None
+        document = {}
+        for key, value in values.items():
+            if key in changed:
+                self._sent[key] = (value, now)
+            else:
+                self._sent[key] = (self._sent[key][0], now)  # re-sent unchanged, so its heartbeat restarts
+                self.values_suppressed += 1
+            document[key] = self._sent[key][0]
+        self.values_sent += len(changed)
+        return document
+
+    def stats(self):
+        return {"values_sent": self.values_sent, "values_suppressed": self.values_suppressed,
+                "heartbeats": self.heartbeats, "messages_suppressed": self.messages_suppressed}
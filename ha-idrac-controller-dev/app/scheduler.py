@@ -0,0 +1,127 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/scheduler.py
+# Picks the delay before a server's next poll from its thermal headroom: the
+# closer the hottest CPU is (or is heading) to the critical threshold, the
+# shorter the interval. While readings stay flat below the low threshold the
+# interval is stretched step by step up to the maximum, if a server sets one:
+# the fans sit in manual mode between polls, so by default a server is never
+# polled less often than the base interval.
+# Polls are also pinned to a per-server phase within the interval so a fleet's
+# polls are spread out instead of all landing together. Servers are ordered by
+# a hash of their alias and placed at equal spacing in that order: the spread
+# is even, and adding or removing one server only nudges the others by at most
+# one slot, never reshuffling them.
+import hashlib
+import math
+import random
+import time
+
+# A change smaller than this between two polls counts as "flat".
+FLAT_DELTA_C = 1.0
+STRETCH_FACTOR = 1.5
+# Weight of the newest sample in the smoothed rate of rise.
+RATE_SMOOTHING = 0.5
+
+
+def default_interval_bounds(base_interval):
+    """(min, max): polls may speed up to a third of the base interval, and only slow down when a server opts in."""
+    return max(5, base_interval // 3), base_interval
+
+
+class AdaptiveInterval:
+    def __init__(self, base_interval, min_interval=None, max_interval=None, low_threshold=45, critical_threshold=65):
+        default_min, default_max = default_interval_bounds(base_interval)
+        self.min_interval = max(1, min_interval or default_min)
+        self.max_interval = max(self.min_interval, max_interval or default_max)
+        self.base_interval = min(max(base_interval, self.min_interval), self.max_interval)
+        self.low_threshold = low_threshold
+        self.critical_threshold = critical_threshold
+        self.interval = self.base_interval
+        self.rate = 0.0  # smoothed °C per second, rising is positive
+        self._last_temp = None
+        self._last_time = None
+
+    def reset(self):
+        """Forget the history (e.g. after the server was offline) and go back to the base interval."""
+        self.interval = self.base_interval
+        self.rate = 0.0
+        self._last_temp = None
+        self._last_time = None
+
+    def update(self, hottest_cpu, now):
+        """Feeds the latest hottest-CPU reading (or None) and returns the seconds until the next poll."""
+        if hottest_cpu is None:
+            self.reset()
+            return self.interval
+
+        delta = None
+        if self._last_temp is not None and now > self._last_time:
+            delta = hottest_cpu - self._last_temp
+            sample = delta / (now - self._last_time)
+            self.rate = RATE_SMOOTHING * sample + (1 - RATE_SMOOTHING) * self.rate
+        self._last_temp = hottest_cpu
+        self._last_time = now
+
+        # Where the temperature would be by the next poll at the base interval, if it keeps rising.
+        projected = hottest_cpu + max(self.rate, 0.0) * self.base_interval
+        span = max(1, self.critical_threshold - self.low_threshold)
+
+        if projected >= self.low_threshold:
+            pressure = min(1.0, (projected - self.low_threshold) / span)
+            self.interval = self.base_interval - pressure * (self.base_interval - self.min_interval)
+        elif delta is not None and abs(delta) < FLAT_DELTA_C:
+            self.interval = min(self.max_interval, max(self.interval, self.base_interval) * STRETCH_FACTOR)
+        else:
+            self.interval = self.base_interval
+        return self.interval
+
+
+def _hash_key(key):
+    return hashlib.sha1(key.encode("utf-8")).digest()
+
+
+def assign_phases(keys):
+    """Returns {key: phase in [0, 1)}, evenly spaced in hash order."""
+    ordered = sorted(set(keys), key=_hash_key)
+    return {key: (rank + 0.5) / len(ordered) for rank, key in enumerate(ordered)}
+
+
+def phase_evenness(phases):
+    """How evenly phases cover the interval: 1.0 when equally spaced, approaching 0 as they bunch up.
+    It is the ideal gap (1/N) divided by the largest gap between neighbouring phases."""
+    if len(phases) < 2:
+        return 1.0
+    ordered = sorted(p % 1.0 for p in phases)
+    gaps = [b - a for a, b in zip(ordered, ordered[1:])] + [ordered[0] + 1.0 - ordered[-1]]
+    return (1.0 / len(ordered)) / max(gaps)
+
+
+class PhaseClock:
+    def __init__(self, phase, jitter_seconds=0.0, clock=time.time):
+        self.phase = phase
+        self.last_start = None
+        self.jitter_seconds = max(0.0, jitter_seconds)
+        self._clock = clock
+
+    def _jitter(self):
+        return random.uniform(0, self.jitter_seconds) if self.jitter_seconds else 0.0
+
+    def first_delay(self, interval):
+        """Seconds to wait before the very first poll, so start-up is staggered too."""
+        now = self._clock()
+        return self._next_slot(now, interval) - now + self._jitter()
+
+    def delay(self, interval, minimum=0.1):
+        """Seconds until this server's phase slot roughly one `interval` from now."""
+        now = self._clock()
+        return max(minimum, self._next_slot(now + interval / 2, interval) - now + self._jitter())
+
+    def mark_start(self):
+        self.last_start = self._clock()
+
+    def observed_phase(self, interval):
+        """Where in the interval the last poll actually started, for measuring the spread."""
+        return None if self.last_start is None else (self.last_start % interval) / interval
+
+    def _next_slot(self, after, interval):
+        offset = self.phase * interval
+        return math.ceil((after - offset) / interval) * interval + offset
@@ -0,0 +1,67 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/sdr_cache.py
+# Decoded SDR records (sensor numbers, names, types, conversion factors)
+# persisted per iDRAC IP and firmware, so the full repository is only walked
+# once and each cycle can read just the sensors it needs by number.
+import json
+import os
+import re
+import threading
+
+CACHE_VERSION = 1
+
+
+def write_json_atomic(path, data):
+    """Writes JSON to a temp file and renames it over `path`, so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class SdrCache:
+    def __init__(self, cache_dir, ip, log=None):
+        self.cache_dir = cache_dir
+        self.ip = ip
+        self._log = log or (lambda level, message: None)
+        self.firmware = None
+        self.repository = None
+        self.sensors = []
+
+    def _path(self, firmware):
+        safe = re.sub(r'[^a-zA-Z0-9_.-]+', '_', f"{self.ip}_{firmware}")
+        return os.path.join(self.cache_dir, f"{safe}.json")
+
+    def load(self, firmware):
+        """Loads the cache for this IP and firmware. Returns True if a usable cache was found."""
+        self.firmware = firmware
+        path = self._path(firmware)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError):
+            return False
+        if data.get("version") != CACHE_VERSION or data.get("ip") != self.ip or data.get("firmware") != firmware:
+            return False
+        self.repository = data.get("repository")
+        self.sensors = data.get("sensors", [])
+        self._log("info", f"Loaded {len(self.sensors)} cached SDR sensor records from {path}")
+        return True
+
+    def is_current(self, repository_info):
+        """The BMC bumps these timestamps whenever records are added or the repository is erased."""
+        if not self.repository or not self.sensors:
+            return False
+        return (self.repository.get("addition_timestamp") == repository_info.get("addition_timestamp") and
+                self.repository.get("erase_timestamp") == repository_info.get("erase_timestamp"))
+
+    def store(self, repository_info, sensors):
+        self.repository = repository_info
+        self.sensors = sensors
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_json_atomic(self._path(self.firmware), {
+                "version": CACHE_VERSION, "ip": self.ip, "firmware": self.firmware,
+                "repository": repository_info, "sensors": sensors,
+            })
+        except (IOError, OSError) as e:
+            self._log("warning", f"Could not persist SDR cache: {e}")
@@ -0,0 +1,128 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/sdr_parser.py
+# Single-pass parser for ipmitool `sdr elist` / `sdr type` output. A parser is
+# built once per server profile (its CPU/inlet/exhaust name patterns), so the
+# patterns are compiled once and each temperature sensor name is classified
+# once and then looked up in a cache on later cycles.
+import re
+from dataclasses import dataclass, field, asdict
+
+# --- SDR line patterns (ipmitool `sdr elist` / `sdr type` layout) ---
+TEMP_LINE_REGEX = re.compile(r"^(.*?)\s*\|\s*[\da-fA-F]+h\s*\|\s*ok\s*.*?\|\s*([-+]?\d*\.?\d+)\s*degrees C", re.IGNORECASE)
+FAN_LINE_REGEX = re.compile(r"^(.*?)\s*\|\s*[\da-fA-F]+h\s*\|\s*ok\s*.*?\|\s*([\d\.]+)\s*RPM", re.IGNORECASE)
+POWER_LINE_REGEX = re.compile(r"^(Pwr Consumption.*?)\s*\|.*?\s*([\d\.]+)\s*Watts", re.IGNORECASE)
+VOLTAGE_LINE_REGEX = re.compile(r"^(.*?)\s*\|\s*[\da-fA-F]+h\s*\|\s*ok\s*.*?\|\s*([-+]?\d*\.?\d+)\s*Volts", re.IGNORECASE)
+PSU_LINE_REGEX = re.compile(r"^(PS\s*\d+\s*Status)\s*\|\s*[\da-fA-F]+h\s*\|\s*(\w+)\s*\|[^|]*\|\s*(.*)$", re.IGNORECASE)
+
+ROLE_INLET = "inlet"
+ROLE_EXHAUST = "exhaust"
+ROLE_CPU = "cpu"
+
+
+@dataclass
+class SensorSnapshot:
+    cpu_temps: list[int] = field(default_factory=list)
+    inlet_temp: int | None = None
+    exhaust_temp: int | None = None
+    fans: list[dict] = field(default_factory=list)
+    power: int | None = None
+    voltages: list[dict] = field(default_factory=list)
+    psus: list[dict] = field(default_factory=list)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _compile(pattern_str):
+    return re.compile(pattern_str, re.IGNORECASE) if pattern_str else None
+
+
+class SdrParser:
+    def __init__(self, cpu_pattern_str=None, inlet_pattern_str=None, exhaust_pattern_str=None, log=None):
+        self.patterns = (cpu_pattern_str, inlet_pattern_str, exhaust_pattern_str)
+        self._cpu = _compile(cpu_pattern_str)
+        self._inlet = _compile(inlet_pattern_str)
+        self._exhaust = _compile(exhaust_pattern_str)
+        self._log = log or (lambda level, message: None)
+        self._roles = {}
+
+    def role_for(self, sensor_name):
+        """Inlet wins over exhaust, which wins over CPU, as in the original per-line checks."""
+        try:
+            return self._roles[sensor_name]
+        except KeyError:
+            pass
+        role = None
+        if self._inlet and self._inlet.search(sensor_name):
+            role = ROLE_INLET
+        elif self._exhaust and self._exhaust.search(sensor_name):
+            role = ROLE_EXHAUST
+        elif self._cpu and self._cpu.search(sensor_name):
+            role = ROLE_CPU
+        self._roles[sensor_name] = role
+        return role
+
+    def parse(self, sdr_data):
+        snapshot = SensorSnapshot()
+        if not sdr_data:
+            self._log("warning", "SDR data empty for parsing.")
+            return snapshot
+
+        for line in sdr_data.splitlines():
+            stripped = line.strip()
+            lowered = stripped.lower()
+
+            if "degrees c" in lowered:
+                match = TEMP_LINE_REGEX.match(stripped)
+                if not match:
+                    continue
+                sensor_name, temp_val_str = match.groups()
+                try:
+                    temp_value = int(float(temp_val_str))
+                except ValueError:
+                    continue
+                role = self.role_for(sensor_name.strip())
+                if role == ROLE_INLET:
+                    snapshot.inlet_temp = temp_value
+                elif role == ROLE_EXHAUST:
+                    snapshot.exhaust_temp = temp_value
+                elif role == ROLE_CPU:
+                    snapshot.cpu_temps.append(temp_value)
+
+            elif "rpm" in lowered:
+                match = FAN_LINE_REGEX.match(stripped)
+                if not match:
+                    continue
+                fan_name, rpm_str = match.groups()
+                try:
+                    snapshot.fans.append({"name": fan_name.strip(), "rpm": int(float(rpm_str))})
+                except ValueError:
+                    continue
+
+            elif "watts" in lowered:
+                if snapshot.power is not None:
+                    continue
+                match = POWER_LINE_REGEX.search(line)
+                if not match:
+                    continue
+                try:
+                    snapshot.power = int(float(match.group(2)))
+                    self._log("debug", f"MATCHED POWER: '{match.group(1).strip()}' as {snapshot.power} Watts")
+                except (ValueError, IndexError):
+                    continue
+
+            elif "volts" in lowered:
+                match = VOLTAGE_LINE_REGEX.match(stripped)
+                if not match:
+                    continue
+                try:
+                    snapshot.voltages.append({"name": match.group(1).strip(), "volts": float(match.group(2))})
+                except ValueError:
+                    continue
+
+            elif "status" in lowered:
+                match = PSU_LINE_REGEX.match(stripped)
+                if match:
+                    snapshot.psus.append({"name": match.group(1).strip(), "status": match.group(2).lower(),
+                                          "state": match.group(3).strip()})
+
+        return snapshot
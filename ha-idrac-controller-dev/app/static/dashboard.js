@@ -0,0 +1,43 @@
+// HA-iDRAC/ha-idrac-controller-dev/app/static/dashboard.js
+// Keeps the dashboard live: each server-sent event carries one server's freshly
+// rendered card, which replaces (or is inserted as) that server's card only.
+(function () {
+    var list = document.getElementById('server-list');
+    if (!list || !window.EventSource) return;
+
+    function findCard(alias) {
+        var cards = list.querySelectorAll('.server-card');
+        for (var i = 0; i < cards.length; i++) {
+            if (cards[i].dataset.alias === alias) return cards[i];
+        }
+        return null;
+    }
+
+    function insertSorted(card) {
+        var cards = list.querySelectorAll('.server-card');
+        for (var i = 0; i < cards.length; i++) {
+            if (cards[i].dataset.alias > card.dataset.alias) {
+                list.insertBefore(card, cards[i]);
+                return;
+            }
+        }
+        list.appendChild(card);
+    }
+
+    // The browser resends the last event id when it reconnects, so only missed changes are sent again
+    var source = new EventSource('api/events?since=' + encodeURIComponent(list.dataset.version));
+    source.addEventListener('server', function (event) {
+        var data = JSON.parse(event.data);
+        var template = document.createElement('template');
+        template.innerHTML = data.html.trim();
+        var card = template.content.firstElementChild;
+        var existing = findCard(data.alias);
+        if (existing) {
+            existing.replaceWith(card);
+            return;
+        }
+        var placeholder = document.getElementById('no-servers');
+        if (placeholder) placeholder.remove();
+        insertSorted(card);
+    });
+})();
@@ -0,0 +1,81 @@
+# HA-iDRAC/ha-idrac-controller-dev/app/status_store.py
+# The latest status of every server, shared in memory between the workers and
+# the web UI. Each change bumps a version number. Entries are replaced rather
+# than modified, so a reader can hold on to a snapshot without copying it and
+# without blocking the workers. The file on disk (current_status.json) is only
+# a persisted copy for other tools: it is rewritten atomically, only when the
+# version moved, and at most every min_interval seconds.
+# Versions start again from 0 when the add-on restarts; `epoch` tells the runs
+# apart, so a client can't mistake a new run's version 5 for the old one's.
+import threading
+import time
+
+from .sdr_cache import write_json_atomic
+
+
+class StatusStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._servers = {}
+        self._versions = {}  # alias -> store version of its last change
+        self.version = 0
+        self.epoch = format(int(time.time()), "x")
+        self._persisted_version = 0
+        self._persisted_at = 0.0
+
+    def set(self, alias, entry):
+        with self._lock:
+            self._servers[alias] = dict(entry)
+            self.version += 1
+            self._versions[alias] = self.version
+            self._changed.notify_all()
+
+    def update(self, alias, fields, default=None):
+        """Merges fields into a server's entry; `default` is the entry to start from if there is none yet."""
+        with self._lock:
+            base = self._servers.get(alias, default or {})
+            self._servers[alias] = {**base, **fields}
+            self.version += 1
+            self._versions[alias] = self.version
+            self._changed.notify_all()
+
+    def get(self, alias):
+        """(version of the server's last change, entry), or (None, None) for an unknown alias."""
+        with self._lock:
+            return self._versions.get(alias), self._servers.get(alias)
+
+    def snapshot(self):
+        """(version, entries). The entries are never modified afterwards, so they are safe to read without the lock."""
+        with self._lock:
+            return self.version, list(self._servers.values())
+
+    def changed_since(self, version):
+        """(current version, entries changed after `version`)."""
+        with self._lock:
+            return self.version, [entry for alias, entry in self._servers.items() if self._versions[alias] > version]
+
+    def changes_since(self, version):
+        """(current version, [(version of the server's last change, entry), ...] changed after `version`, oldest first)."""
+        with self._lock:
+            changes = [(self._versions[alias], entry) for alias, entry in self._servers.items() if self._versions[alias] > version]
+            return self.version, sorted(changes, key=lambda change: change[0])
+
+    def wait_for_change(self, version, timeout=None):
+        """Blocks until the store has moved past `version` (or the timeout expires). Returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def persist(self, path, min_interval=0, force=False):
+        """Writes the snapshot to `path` if it changed since the last write. Returns True if it was written."""
+        now = time.monotonic()
+        if not force and now - self._persisted_at < min_interval:
+            return False
+        version, entries = self.snapshot()
+        if version == self._persisted_version:
+            return False
+        write_json_atomic(path, entries)
+        self._persisted_version = version
+        self._persisted_at = now
+        return True
@@ -1,21 +1,77 @@
 # HA-iDRAC/ha-idrac-controller-dev/app/web_server.py
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, Response
 from markupsafe import Markup 
 import os
 import json
+import gzip
+import hashlib
 import logging
+import sqlite3
 import threading
+from .ipmi_manager import TRANSPORTS
+from .event_hub import EventHub
+from .history import RESOLUTIONS
+from .history_db import RESOLUTIONS as STORED_RESOLUTIONS
 
 log = logging.getLogger('werkzeug')
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
 
 # --- Global paths and locks ---
-STATUS_FILE = None
-SERVERS_CONFIG_FILE = "/data/servers_config.json"
-status_lock = None
+SERVERS_CONFIG_FILE = os.path.join(os.getenv("DATA_DIR", "/data"), "servers_config.json")
+status_store = None  # the controller's StatusStore, read directly instead of via current_status.json
+event_hub = None
+history_store = None  # the controller's HistoryStore, for sparklines and /api/servers/<alias>/history
+history_db = None  # the HistoryDatabase when on-disk history is enabled
 config_lock = threading.Lock()
 global_config = {} 
+GZIP_MIN_BYTES = 512
+COMPRESSIBLE_TYPES = ('text/html', 'application/json', 'text/css', 'application/javascript', 'text/javascript')
+STATIC_MAX_AGE_SECONDS = 365 * 24 * 3600
+
+def _asset_version():
+    """Changes whenever a file in static/ does, so templates can link them with a long cache lifetime."""
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(app.static_folder)):
+        stat = os.stat(os.path.join(app.static_folder, name))
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:10]
+
+ASSET_VERSION = _asset_version()
+
+@app.context_processor
+def inject_asset_version():
+    return {"asset_version": ASSET_VERSION}
+
+_static_gzip = {}  # static path -> its gzipped content; static/ doesn't change while the add-on runs
+
+@app.after_request
+def add_caching_and_compression(response):
+    is_static = request.path.startswith('/static/')
+    if is_static and request.args.get('v') == ASSET_VERSION:
+        response.headers['Cache-Control'] = f"public, max-age={STATIC_MAX_AGE_SECONDS}, immutable"
+    # Static files come as file wrappers (direct_passthrough); other passthrough or streamed bodies are left alone
+    if (response.status_code != 200 or ((response.direct_passthrough or response.is_streamed) and not is_static)
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    if 'gzip' not in request.accept_encodings or (response.content_length or 0) < GZIP_MIN_BYTES:
+        return response
+    if is_static:
+        compressed = _static_gzip.get(request.path)
+        response.direct_passthrough = False
+        if compressed is None:
+            compressed = _static_gzip[request.path] = gzip.compress(response.get_data(), compresslevel=9)
+        elif hasattr(response.response, 'close'):
+            response.response.close()  # the file wrapper that is no longer needed
+        response.set_data(compressed)
+        etag, _ = response.get_etag()
+        if etag:
+            response.set_etag(etag, weak=True)  # the file's ETag, but the bytes sent are the compressed ones
+    else:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=5))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 # --- Helper functions for config management ---
 def load_servers_config():
@@ -39,24 +95,174 @@ def save_servers_config(servers):
             flash("Error: Could not write to config file.", "error")
             return False
 
-def load_all_servers_status():
-    if STATUS_FILE and os.path.exists(STATUS_FILE):
-        try:
-            with open(STATUS_FILE, 'r') as f: return json.load(f)
-        except (json.JSONDecodeError, IOError): pass
-    return []
+# --- JSON API helpers ---
+def _etag(version):
+    return f"{status_store.epoch}-{version}"
+
+def _since_version(since=None):
+    """The version from ?since=, accepted only if it belongs to this run of the add-on (else everything is sent)."""
+    since = since if since is not None else request.args.get('since', '')
+    epoch, _, version = since.rpartition('-')
+    if epoch == status_store.epoch and version.isdigit():
+        return int(version)
+    return 0
+
+def _select_fields(entry):
+    fields = [f for f in request.args.get('fields', '').split(',') if f]
+    if not fields:
+        return entry
+    return {key: entry[key] for key in ['alias'] + fields if key in entry}
+
+def _json_response(data, etag):
+    """JSON with the status version as a strong ETag, or a 304 if the client already has it (gzip is added on the way out)."""
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(json.dumps(data, separators=(',', ':')), mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# --- JSON API ---
+@app.route('/api/servers')
+def api_servers():
+    """All servers, or with ?since=<ETag> only those that changed after it. ?fields=a,b limits the keys returned."""
+    if status_store is None:
+        return Response(status=503)
+    since = _since_version()
+    version, entries = status_store.changed_since(since) if since else status_store.snapshot()
+    entries = sorted((_select_fields(e) for e in entries), key=lambda e: e.get('alias', ''))
+    return _json_response({"version": _etag(version), "servers": entries}, _etag(version))
+
+@app.route('/api/servers/<alias>')
+def api_server(alias):
+    if status_store is None:
+        return Response(status=503)
+    version, entry = status_store.get(alias)
+    if entry is None:
+        return Response(json.dumps({"error": f"Server '{alias}' not found."}), status=404, mimetype='application/json')
+    return _json_response({"version": _etag(version), "server": _select_fields(entry)}, _etag(version))
+
+@app.route('/api/servers/<alias>/history')
+def api_server_history(alias):
+    """Recent history of a server's sensors: ?resolution=raw|1m|15m, ?sensors=a,b (default all), ?points=N (newest N)."""
+    if status_store is None or history_store is None:
+        return Response(status=503)
+    resolution = request.args.get('resolution', 'raw')
+    if resolution not in RESOLUTIONS:
+        return Response(json.dumps({"error": f"Unknown resolution '{resolution}'."}), status=400, mimetype='application/json')
+    history = history_store.get(alias)
+    if history is None:
+        return Response(json.dumps({"error": f"No history for server '{alias}'."}), status=404, mimetype='application/json')
+    # History is recorded just before the status update of the same cycle, so the status version covers it too
+    version, _ = status_store.get(alias)
+    sensors = [s for s in request.args.get('sensors', '').split(',') if s]
+    points = request.args.get('points', '')
+    times, series = history.query(sensors, resolution, int(points) if points.isdigit() else None)
+    return _json_response({"version": _etag(version), "alias": alias, "resolution": resolution,
+                           "times": times, "series": series}, _etag(version))
+
+@app.route('/api/servers/<alias>/history/stored')
+def api_server_stored_history(alias):
+    """History from the on-disk database: ?resolution=raw|5m|1h, ?from= and ?to= (Unix seconds), ?sensors=a,b."""
+    if history_db is None:
+        return Response(json.dumps({"error": "On-disk history is disabled (history_db)."}), status=404, mimetype='application/json')
+    resolution = request.args.get('resolution', 'raw')
+    if resolution not in STORED_RESOLUTIONS:
+        return Response(json.dumps({"error": f"Unknown resolution '{resolution}'."}), status=400, mimetype='application/json')
+    bounds = [request.args.get(key, '') for key in ('from', 'to')]
+    if not all(b.isdigit() for b in bounds if b):
+        return Response(json.dumps({"error": "from and to must be Unix timestamps."}), status=400, mimetype='application/json')
+    sensors = [s for s in request.args.get('sensors', '').split(',') if s]
+    try:
+        result = history_db.query(alias, sensors, resolution, *(int(b) if b else None for b in bounds))
+    except sqlite3.Error as e:
+        return Response(json.dumps({"error": f"Could not read the history database: {e}"}), status=503, mimetype='application/json')
+    if result is None:
+        return Response(json.dumps({"error": f"No stored history for server '{alias}'."}), status=404, mimetype='application/json')
+    times, series = result
+    response = Response(json.dumps({"alias": alias, "resolution": resolution, "times": times, "series": series}, separators=(',', ':')),
+                        mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# --- Dashboard cards ---
+SPARKLINES = [("hottest_cpu_temp", "Hottest CPU", "°C"), ("power", "Power", "W")]
+SPARKLINE_POINTS = 60  # minutes
+SPARKLINE_WIDTH, SPARKLINE_HEIGHT = 120, 24
+
+def _sparkline(values):
+    """SVG polyline points for the values, scaled to fill the sparkline box; None if there are fewer than two."""
+    points = [(i, v) for i, v in enumerate(values) if v is not None]
+    if len(points) < 2:
+        return None
+    low, high = min(v for _, v in points), max(v for _, v in points)
+    x_step = SPARKLINE_WIDTH / max(1, len(values) - 1)
+    y_scale = (SPARKLINE_HEIGHT - 2) / (high - low) if high > low else 0
+    return " ".join(f"{i * x_step:.1f},{SPARKLINE_HEIGHT - 1 - (v - low) * y_scale:.1f}" for i, v in points)
+
+def _sparklines(alias):
+    history = history_store.get(alias) if history_store else None
+    if history is None:
+        return []
+    _, series = history.query([sensor for sensor, _, _ in SPARKLINES], "1m", SPARKLINE_POINTS)
+    sparklines = []
+    for sensor, label, unit in SPARKLINES:
+        means = series.get(sensor, {}).get("mean", [])
+        points = _sparkline(means)
+        if points:
+            known = [v for v in means if v is not None]
+            sparklines.append({"label": label, "unit": unit, "points": points, "low": min(known), "high": max(known)})
+    return sparklines
+
+_card_cache = {}  # alias -> (entry, its rendered card)
+
+def render_card(entry):
+    """A server's dashboard card. Store entries are replaced, never modified, so an unchanged entry reuses its HTML."""
+    alias = entry.get('alias')
+    cached = _card_cache.get(alias)
+    if cached and cached[0] is entry:
+        return cached[1]
+    with app.app_context():
+        html = render_template('_server_card.html', server=entry, sparklines=_sparklines(alias),
+                               sparkline_size=(SPARKLINE_WIDTH, SPARKLINE_HEIGHT))
+    _card_cache[alias] = (entry, html)
+    return html
+
+@app.route('/api/events')
+def api_events():
+    """Server-Sent Events: one `server` event with the re-rendered card each time a server's status changes."""
+    subscriber = event_hub.subscribe() if event_hub else None
+    if subscriber is None:
+        return Response(status=503)
+    # Subscribed before reading the store, so no change can fall between the backlog and the live events
+    since = _since_version(request.headers.get('Last-Event-ID') or request.args.get('since', ''))
+    _, changes = status_store.changes_since(since)
+    backlog = [event_hub.format(entry_version, entry) for entry_version, entry in changes]
+    return Response(event_hub.stream(subscriber, backlog), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # --- Routes ---
 @app.route('/')
 def index():
-    all_statuses = load_all_servers_status()
+    version, all_statuses = status_store.snapshot() if status_store else (0, [])
     all_statuses.sort(key=lambda x: x.get('alias', ''))
-    return render_template('index.html', servers=all_statuses)
+    cards = [Markup(render_card(server)) for server in all_statuses]
+    return render_template('index.html', cards=cards, version=_etag(version) if status_store else "")
 
 @app.route('/servers')
 def manage_servers():
     servers = load_servers_config()
-    return render_template('servers.html', servers=servers, defaults=global_config)
+    return render_template('servers.html', servers=servers, defaults=global_config, transports=TRANSPORTS)
+
+def _apply_interval_bounds(server):
+    """Blank fields mean "use the default bounds derived from check_interval_seconds"."""
+    for key in ('min_interval_seconds', 'max_interval_seconds'):
+        value = request.form.get(key, '').strip()
+        if value:
+            server[key] = int(value)
+        else:
+            server.pop(key, None)
 
 @app.route('/servers/add', methods=['POST'])
 def add_server():
@@ -71,12 +277,14 @@ def add_server():
         "idrac_ip": request.form.get('idrac_ip'),
         "idrac_username": request.form.get('idrac_username'),
         "idrac_password": request.form.get('idrac_password'),
+        "ipmi_transport": request.form.get('ipmi_transport', global_config.get('ipmi_transport', 'ipmitool')),
         "enabled": True,
         "base_fan_speed_percent": int(request.form.get('base_fan_speed_percent')),
         "low_temp_threshold": int(request.form.get('low_temp_threshold')),
         "high_temp_fan_speed_percent": int(request.form.get('high_temp_fan_speed_percent')),
         "critical_temp_threshold": int(request.form.get('critical_temp_threshold'))
     }
+    _apply_interval_bounds(new_server)
     servers.append(new_server)
     save_servers_config(servers)
     return redirect('../servers') # Use relative redirect
@@ -86,7 +294,7 @@ def edit_server_form(alias):
     servers = load_servers_config()
     server_to_edit = next((s for s in servers if s['alias'] == alias), None)
     if server_to_edit:
-        return render_template('edit_server.html', server=server_to_edit)
+        return render_template('edit_server.html', server=server_to_edit, transports=TRANSPORTS)
     flash(f"Server '{alias}' not found.", "error")
     return redirect('../servers') # Use relative redirect
 
@@ -103,11 +311,13 @@ def update_server(alias):
     new_password = request.form.get('idrac_password')
     if new_password:
         server_to_update['idrac_password'] = new_password
+    server_to_update['ipmi_transport'] = request.form.get('ipmi_transport', server_to_update.get('ipmi_transport', 'ipmitool'))
     server_to_update['enabled'] = request.form.get('enabled') == 'true'
     server_to_update['base_fan_speed_percent'] = int(request.form.get('base_fan_speed_percent'))
     server_to_update['low_temp_threshold'] = int(request.form.get('low_temp_threshold'))
     server_to_update['high_temp_fan_speed_percent'] = int(request.form.get('high_temp_fan_speed_percent'))
     server_to_update['critical_temp_threshold'] = int(request.form.get('critical_temp_threshold'))
+    _apply_interval_bounds(server_to_update)
     
     save_servers_config(servers)
     return redirect('../../servers') # Relative redirect from a deeper path
@@ -122,10 +332,24 @@ def delete_server(alias):
         flash(f"Server '{alias}' not found.", "error")
     return redirect('../servers') # Use relative redirect
 
-def run_web_server(port, status_file_path, lock):
-    global STATUS_FILE, status_lock
-    STATUS_FILE = status_file_path
-    status_lock = lock
+def run_web_server(port, store, mode="waitress", threads=16, history=None, database=None):
+    """Serves the UI in this process: with waitress (a pool of `threads`, HTTP/1.1 keep-alive) or Flask's dev server."""
+    global status_store, event_hub, history_store, history_db
+    status_store = store
+    history_store = history
+    history_db = database
+    # Every open event stream holds a serving thread; keep at least half the pool for ordinary requests.
+    event_hub = EventHub(store, render_card, max_clients=max(1, threads // 2) if mode == "waitress" else 32)
+    event_hub.start()
     
     host = '0.0.0.0'
+    if mode == "waitress":
+        try:
+            from waitress import serve
+        except ImportError:
+            print("[WARNING] [WEB] waitress is not installed. Falling back to Flask's development server.", flush=True)
+        else:
+            print(f"[INFO] [WEB] Serving on port {port} with waitress ({threads} threads).", flush=True)
+            serve(app, host=host, port=port, threads=threads, ident=None, channel_timeout=60)
+            return
     app.run(host=host, port=port, debug=False, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,153 @@
+# HA-iDRAC/ha-idrac-controller-dev/benchmarks/history_bench.py
+# Measures the sensor history store at fleet scale: memory per server (as
+# allocated by Python, with tracemalloc, and as held in the ring buffers), the
+# cost of recording one cycle, and the cost of the queries behind the dashboard
+# sparklines and the history API. The fleet is measured once its raw and
+# 1-minute rings have filled; a few servers then run on for several times the
+# 15-minute ring's span and are measured again, to show memory does not grow
+# with uptime. For comparison it also measures a plain list of per-cycle dicts
+# covering the same time span for a few servers.
+#
+# Run from the add-on folder:
+#   python3 -m benchmarks.history_bench [--servers 500] [--interval 60] [--days 2] [--json results.json]
+import argparse
+import gc
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from array import array
+
+from app.history import HistoryStore, MINUTE_POINTS, RAW_POINTS
+
+CPUS = 2
+FANS = ["Fan1A", "Fan1B", "Fan2A", "Fan2B", "Fan3A", "Fan3B"]
+
+
+def cycle_values(rng):
+    cpus = [rng.uniform(35, 70) for _ in range(CPUS)]
+    values = {
+        "hottest_cpu_temp": max(cpus), "inlet_temp": rng.uniform(18, 28), "exhaust_temp": rng.uniform(30, 45),
+        "power": rng.randint(120, 400), "target_fan_speed": rng.choice([20, 50]),
+    }
+    for i, temp in enumerate(cpus):
+        values[f"cpu_{i}_temp"] = temp
+    for fan in FANS:
+        values[f"fan_{fan.lower()}_rpm"] = rng.randint(3000, 9000)
+    return values
+
+
+def traced_bytes():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def run_cycles(store, aliases, start, cycles, interval, rng, timings=None):
+    for cycle in range(cycles):
+        now = start + cycle * interval
+        for i, alias in enumerate(aliases):
+            values = cycle_values(rng)
+            if timings is not None:
+                began = time.perf_counter()
+                store.record(alias, now, values)
+                timings[cycle * len(aliases) + i] = (time.perf_counter() - began) * 1e6
+            else:
+                store.record(alias, now, values)
+    return start + cycles * interval
+
+
+def list_of_dicts_bytes(servers, cycles, rng):
+    """What keeping every cycle as {"time": t, sensor: value, ...} in a list costs for the same span."""
+    before = traced_bytes()
+    kept = [[dict(cycle_values(rng), time=time.time()) for _ in range(cycles)] for _ in range(servers)]
+    used = traced_bytes() - before
+    del kept
+    return used // servers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sensor history store")
+    parser.add_argument("--servers", type=int, default=500)
+    parser.add_argument("--interval", type=int, default=60, help="simulated seconds between cycles")
+    parser.add_argument("--days", type=int, default=2, help="days of 15-minute rollups per server")
+    parser.add_argument("--age-servers", type=int, default=10, help="servers run on for the memory-growth check")
+    parser.add_argument("--uptime-factor", type=int, default=3, help="simulate this many times the 15-minute ring's span for them")
+    parser.add_argument("--compare-servers", type=int, default=5, help="servers for the list-of-dicts comparison")
+    parser.add_argument("--json", help="also save the results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    aliases = [f"bench-{i:04d}" for i in range(args.servers)]
+    span_cycles = args.days * 86400 // args.interval
+    sensors = len(cycle_values(rng))
+    print(f"[BENCH] {args.servers} servers, {sensors} sensors each, one cycle every {args.interval}s, {args.days} day(s) of 15m rollups", flush=True)
+
+    tracemalloc.start()
+    baseline = traced_bytes()
+    store = HistoryStore(args.days)
+    now = 1_700_000_000
+    # Enough cycles to fill the raw and 1-minute rings, then measure
+    fill_cycles = max(RAW_POINTS, MINUTE_POINTS * 60 // args.interval) + 1
+    # Allocated up front so the measurement below can leave it out exactly
+    timings = array('d', bytes(8 * fill_cycles * len(aliases)))
+    timings_bytes = len(timings) * timings.itemsize
+    now = run_cycles(store, aliases, now, fill_cycles, args.interval, rng, timings)
+    filled = traced_bytes() - baseline - timings_bytes
+
+    buffers = store.memory_bytes()
+
+    # A few servers keep going for several times the 15-minute ring's span; their memory must not move
+    aging = aliases[:args.age_servers]
+    aging_before = traced_bytes()
+    long_cycles = span_cycles * args.uptime_factor
+    began = time.perf_counter()
+    now = run_cycles(store, aging, now, long_cycles, args.interval, rng)
+    long_seconds = time.perf_counter() - began
+    growth = traced_bytes() - aging_before
+
+    history = store.get(aliases[0])
+    query_ms = {}
+    for label, query in [("sparklines (2 sensors, 1m, 60 points)", lambda: history.query(["hottest_cpu_temp", "power"], "1m", 60)),
+                         ("all sensors, raw", lambda: history.query(None, "raw")),
+                         ("all sensors, 15m", lambda: history.query(None, "15m"))]:
+        samples = []
+        for _ in range(200):
+            began = time.perf_counter()
+            query()
+            samples.append((time.perf_counter() - began) * 1000)
+        query_ms[label] = round(statistics.median(samples), 3)
+    del store, history
+
+    baseline_per_server = list_of_dicts_bytes(args.compare_servers, span_cycles, rng)
+    tracemalloc.stop()
+
+    result = {
+        "servers": args.servers, "sensors_per_server": sensors,
+        "bytes_per_server": filled // args.servers,
+        "ring_buffer_bytes_per_server": buffers // args.servers,
+        "fleet_mib": round(filled / 2**20, 2),
+        "simulated_uptime_days": round((fill_cycles + long_cycles) * args.interval / 86400, 1),
+        "growth_bytes_per_server": growth // max(1, len(aging)),
+        "record_us_p50": round(statistics.median(timings), 1),
+        "record_us_p99": round(sorted(timings)[int(len(timings) * 0.99)], 1),
+        "records_per_s": round(len(aging) * long_cycles / long_seconds),
+        "query_ms": query_ms,
+        "list_of_dicts_bytes_per_server": baseline_per_server,
+    }
+    print(f"[BENCH] memory per server: {result['bytes_per_server'] / 1024:.1f} KiB "
+          f"({result['ring_buffer_bytes_per_server'] / 1024:.1f} KiB of it in ring buffers); fleet {result['fleet_mib']} MiB", flush=True)
+    print(f"[BENCH] growth after {result['simulated_uptime_days']} simulated days: {result['growth_bytes_per_server']} bytes per server "
+          f"({len(aging)} servers)", flush=True)
+    print(f"[BENCH] record one cycle: p50 {result['record_us_p50']} us  p99 {result['record_us_p99']} us  "
+          f"({result['records_per_s']} server-cycles/s while traced)", flush=True)
+    for label, ms in query_ms.items():
+        print(f"[BENCH] query {label}: {ms} ms", flush=True)
+    print(f"[BENCH] list of per-cycle dicts for {args.days} day(s): {baseline_per_server / 1024:.1f} KiB per server", flush=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "result": result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# HA-iDRAC/ha-idrac-controller-dev/benchmarks/history_db_bench.py
+# Benchmarks the on-disk sensor history (app/history_db.py) at fleet scale. It
+# simulates hours of polling for a fleet of synthetic servers, with one flush
+# (one transaction) per cycle covering every server, and rolls up as the
+# simulated clock advances. It reports the cost of a flush and of the rollups,
+# the database size per stored row (extrapolated to the retention periods), the
+# time to trim a table to its retention, and query times. For comparison it also
+# times the same cycles stored the obvious way, one row per sensor reading.
+#
+# Run from the add-on folder:
+#   python3 -m benchmarks.history_db_bench [--servers 500] [--sensors 30] [--hours 6] [--json results.json]
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from app.history_db import DEFAULT_RETENTION, HistoryDatabase
+
+
+def sensor_names(count):
+    names = ["hottest_cpu_temp", "inlet_temp", "exhaust_temp", "power", "target_fan_speed"]
+    names += [f"cpu_{i}_temp" for i in range(4)]
+    names += [f"fan_fan{i // 2 + 1}{'ab'[i % 2]}_rpm" for i in range(max(0, count - len(names)))]
+    return names[:count]
+
+
+def cycle_values(names, rng):
+    values = {}
+    for name in names:
+        if name.endswith("_temp"):
+            values[name] = rng.uniform(20, 70)
+        elif name.endswith("_rpm"):
+            values[name] = rng.randint(3000, 9000)
+        elif name == "power":
+            values[name] = rng.randint(120, 400)
+        else:
+            values[name] = rng.choice([20, 50])
+    return values
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p / 100))], 2)
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def per_sensor_rows(path, aliases, names, cycles, interval, rng):
+    """Flush times when every reading is its own (server, sensor, ts, value) row."""
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("CREATE TABLE readings (server TEXT, sensor TEXT, ts INTEGER, value REAL, PRIMARY KEY (server, sensor, ts)) WITHOUT ROWID")
+    flush_ms = []
+    for cycle in range(cycles):
+        ts = 1_700_000_000 + cycle * interval
+        rows = [(alias, name, ts, value) for alias in aliases for name, value in cycle_values(names, rng).items()]
+        start = time.perf_counter()
+        with db:
+            db.executemany("INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?)", rows)
+        flush_ms.append((time.perf_counter() - start) * 1000)
+    db.close()
+    return flush_ms, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the on-disk sensor history")
+    parser.add_argument("--servers", type=int, default=500)
+    parser.add_argument("--sensors", type=int, default=30, help="sensors per server")
+    parser.add_argument("--hours", type=float, default=6, help="simulated hours of polling")
+    parser.add_argument("--interval", type=int, default=15, help="simulated seconds between cycles")
+    parser.add_argument("--compare-cycles", type=int, default=40, help="cycles for the one-row-per-reading comparison (0 to skip)")
+    parser.add_argument("--json", help="also save the results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    names = sensor_names(args.sensors)
+    aliases = [f"bench-{i:04d}" for i in range(args.servers)]
+    cycles = int(args.hours * 3600 / args.interval)
+    print(f"[BENCH] {args.servers} servers x {len(names)} sensors, one cycle every {args.interval}s, {args.hours}h simulated", flush=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        db = HistoryDatabase(path)
+        db.open()
+        flush_ms, maintain_ms = [], []
+        start_ts = 1_700_000_000
+        for cycle in range(cycles):
+            ts = start_ts + cycle * args.interval
+            for alias in aliases:
+                db.enqueue(alias, ts, cycle_values(names, rng))
+            flush_ms.append(timed(db.flush)[1])
+            maintain_ms.append(timed(db.maintain, now=ts + args.interval)[1])
+        end_ts = start_ts + cycles * args.interval
+        db._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        counts = {table: db._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("raw", "rollup_5m", "rollup_1h")}
+        size = os.path.getsize(path)
+        table_bytes = dict(db._db.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")) if _has_dbstat(db._db) else {}
+        raw_row_bytes = (table_bytes.get("raw") or size) / max(1, counts["raw"])
+        rollup_row_bytes = (table_bytes.get("rollup_5m") or 0) / max(1, counts["rollup_5m"]) or raw_row_bytes * 3
+        projected = (args.servers * (DEFAULT_RETENTION["raw"] / args.interval) * raw_row_bytes
+                     + args.servers * (DEFAULT_RETENTION["5m"] / 300 + DEFAULT_RETENTION["1h"] / 3600) * rollup_row_bytes)
+
+        alias = aliases[0]
+        _, raw_query_ms = timed(db.query, alias, None, "raw", end_ts - 3600, end_ts)
+        _, rollup_query_ms = timed(db.query, alias, ["hottest_cpu_temp", "power"], "5m", start_ts, end_ts)
+        # Trim the oldest hour of raw rows, as the hourly retention pass would
+        db.retention["raw"] = int(args.hours * 3600) - 3600
+        db._retention_checked = 0
+        _, retention_ms = timed(db._apply_retention, end_ts)
+        db.stop()
+
+        result = {
+            "servers": args.servers, "sensors": len(names), "cycles": cycles,
+            "flush_ms_p50": percentile(flush_ms, 50), "flush_ms_p99": percentile(flush_ms, 99),
+            "flush_us_per_server": round(statistics.median(flush_ms) * 1000 / args.servers, 1),
+            "maintain_ms_p50": percentile(maintain_ms, 50), "maintain_ms_max": round(max(maintain_ms), 1),
+            "rows": counts, "db_mib": round(size / 2**20, 1),
+            "raw_row_bytes": round(raw_row_bytes, 1), "rollup_row_bytes": round(rollup_row_bytes, 1),
+            "projected_mib_at_retention": round(projected / 2**20),
+            "query_ms": {"raw, last hour, all sensors": round(raw_query_ms, 1), "5m, whole run, 2 sensors": round(rollup_query_ms, 1)},
+            "retention_trim_ms": round(retention_ms, 1),
+        }
+        print(f"[BENCH] flush (one transaction, {args.servers} rows): p50 {result['flush_ms_p50']} ms  p99 {result['flush_ms_p99']} ms  "
+              f"({result['flush_us_per_server']} us per server)", flush=True)
+        print(f"[BENCH] rollups per cycle: p50 {result['maintain_ms_p50']} ms  max {result['maintain_ms_max']} ms", flush=True)
+        print(f"[BENCH] rows {counts}, database {result['db_mib']} MiB; {result['raw_row_bytes']} bytes per raw row, "
+              f"{result['rollup_row_bytes']} per rollup row", flush=True)
+        print(f"[BENCH] projected size at the default retention (raw 24h, 5m 30d, 1h 1y): {result['projected_mib_at_retention']} MiB", flush=True)
+        for label, ms in result["query_ms"].items():
+            print(f"[BENCH] query {label}: {ms} ms", flush=True)
+        print(f"[BENCH] retention trim of one hour of raw rows: {result['retention_trim_ms']} ms", flush=True)
+
+        if args.compare_cycles:
+            compare_ms, compare_size = per_sensor_rows(os.path.join(tmp, "per_sensor.db"), aliases, names, args.compare_cycles, args.interval, rng)
+            result["per_sensor_rows"] = {"flush_ms_p50": percentile(compare_ms, 50), "flush_ms_p99": percentile(compare_ms, 99),
+                                         "bytes_per_cycle": compare_size // args.compare_cycles}
+            print(f"[BENCH] one row per reading ({args.servers * len(names)} rows per flush): p50 {result['per_sensor_rows']['flush_ms_p50']} ms  "
+                  f"p99 {result['per_sensor_rows']['flush_ms_p99']} ms, {compare_size // args.compare_cycles // 1024} KiB per cycle "
+                  f"(vs {round(raw_row_bytes * args.servers / 1024)} KiB)", flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "result": result}, f, indent=2)
+
+
+def _has_dbstat(db):
+    try:
+        db.execute("SELECT 1 FROM dbstat LIMIT 1")
+        return True
+    except sqlite3.Error:
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# HA-iDRAC/ha-idrac-controller-dev/benchmarks/parser_bench.py
+# Benchmarks the SDR and FRU parsers against the fixtures in benchmarks/fixtures
+# and checks their output against the expected snapshots stored next to them.
+# Compares the dev SdrParser (cached across cycles, and built fresh per call)
+# with the stable add-on's per-type parse_temperatures / parse_fan_rpms /
+# parse_power_consumption functions.
+#
+# Run from the add-on folder:
+#   python3 -m benchmarks.parser_bench [--iterations 500] [--json results.json] [--update-expected]
+import argparse
+import importlib.util
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from app.ipmi_manager import IPMIManager
+from app.sdr_parser import SdrParser
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(HERE, "fixtures")
+PROD_IPMI_MANAGER = os.path.join(HERE, "..", "..", "ha-idrac-controller", "app", "ipmi_manager.py")
+
+MODELS = ["r620", "r720", "r730", "r740xd", "r750"]
+PATTERNS = ("Temp", "Inlet Temp", "Exhaust Temp")
+SHARED_FIELDS = ["cpu_temps", "inlet_temp", "exhaust_temp", "fans", "power"]
+
+
+def _read(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r") as f:
+        return f.read()
+
+
+def synthetic_dump(sensor_count=500, seed=500):
+    """Builds a large `sdr elist` listing together with the snapshot a correct parser must produce."""
+    rng = random.Random(seed)
+    lines = []
+    expected = {"cpu_temps": [], "inlet_temp": None, "exhaust_temp": None, "fans": [], "power": None,
+                "voltages": [], "psus": []}
+
+    def add(name, number, status, entity, value):
+        lines.append(f"{name:<16} | {number % 256:02X}h | {status:<3} | {entity:>4} | {value}".rstrip())
+
+    add("Inlet Temp", 0x04, "ok", "7.1", "22 degrees C")
+    add("Exhaust Temp", 0x01, "ok", "7.1", "40 degrees C")
+    expected["inlet_temp"], expected["exhaust_temp"] = 22, 40
+    add("Pwr Consumption", 0x77, "ok", "7.1", "512 Watts")
+    expected["power"] = 512
+    for i in range(4, sensor_count):
+        kind = rng.choice(["cpu", "fan", "fan", "volt", "psu", "current", "discrete", "discrete", "absent"])
+        if kind == "cpu":
+            temp = rng.randint(30, 85)
+            add("Temp", i, "ok", f"3.{i}", f"{temp} degrees C")
+            expected["cpu_temps"].append(temp)
+        elif kind == "fan":
+            rpm = rng.randrange(1800, 12000, 120)
+            add(f"Fan{i}A", i, "ok", "7.1", f"{rpm} RPM")
+            expected["fans"].append({"name": f"Fan{i}A", "rpm": rpm})
+        elif kind == "volt":
+            volts = rng.choice([208, 220, 230, 240])
+            add(f"Voltage {i}", i, "ok", f"10.{i}", f"{volts} Volts")
+            expected["voltages"].append({"name": f"Voltage {i}", "volts": float(volts)})
+        elif kind == "psu":
+            add(f"PS{i} Status", i, "ok", f"10.{i}", "Presence detected")
+            expected["psus"].append({"name": f"PS{i} Status", "status": "ok", "state": "Presence detected"})
+        elif kind == "current":
+            add(f"Current {i}", i, "ok", f"10.{i}", f"{rng.uniform(0.2, 2.0):.2f} Amps")
+        elif kind == "discrete":
+            add("Drive", i, "ok", f"26.{i}", "Drive Present")
+        else:
+            add("Temp", i, "ns", f"3.{i}", "No Reading")
+    return "\n".join(lines) + "\n", expected
+
+
+def load_prod_module():
+    if not os.path.exists(PROD_IPMI_MANAGER):
+        return None
+    spec = importlib.util.spec_from_file_location("prod_ipmi_manager", PROD_IPMI_MANAGER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module._LOG_LEVEL = "fatal"
+    return module
+
+
+def load_cases():
+    cases = []
+    for model in MODELS:
+        expected_path = os.path.join(FIXTURES_DIR, f"{model}_expected.json")
+        expected = None
+        if os.path.exists(expected_path):
+            with open(expected_path, "r") as f:
+                expected = json.load(f)
+        cases.append({"name": model, "sdr": _read(f"{model}_sdr_elist.txt"), "fru": _read(f"{model}_fru.txt"),
+                      "expected": expected})
+    sdr, expected = synthetic_dump()
+    cases.append({"name": "synthetic-500", "sdr": sdr, "fru": None, "expected": expected})
+    return cases
+
+
+# --- Parsers under test ---
+def make_parsers(prod):
+    manager = IPMIManager("bench", "bench", "bench", log_level="fatal")
+
+    def dev_warm(sdr):
+        snapshot = manager.parse_sdr(sdr, *PATTERNS)
+        return {**manager.parse_temperatures(snapshot), "fans": manager.parse_fan_rpms(snapshot),
+                "power": manager.parse_power_consumption(snapshot), "voltages": snapshot.voltages, "psus": snapshot.psus}
+
+    def dev_cold(sdr):
+        return SdrParser(*PATTERNS).parse(sdr).to_dict()
+
+    parsers = {"dev SdrParser (cached)": dev_warm, "dev SdrParser (fresh)": dev_cold}
+    if prod is not None:
+        def prod_per_type(sdr):
+            return {**prod.parse_temperatures(sdr, *PATTERNS), "fans": prod.parse_fan_rpms(sdr),
+                    "power": prod.parse_power_consumption(sdr)}
+        parsers["prod per-type functions"] = prod_per_type
+    return manager, parsers
+
+
+def model_info(manager, prod, fru_text):
+    manager._run_ipmi_command = lambda *args, **kwargs: fru_text
+    result = {"dev": manager.get_server_model_info()}
+    if prod is not None:
+        prod._run_ipmi_command = lambda *args, **kwargs: fru_text
+        result["prod"] = prod.get_server_model_info()
+    return result
+
+
+# --- Measurement ---
+def measure(func, arg, iterations):
+    func(arg)  # warm-up, fills caches the way a running worker would
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        func(arg)
+        samples.append(time.perf_counter_ns() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    result = func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    retained_blocks = sum(max(0, stat.count_diff) for stat in diff)
+    del result
+
+    samples.sort()
+    mean_ns = statistics.fmean(samples)
+    return {
+        "mean_us": mean_ns / 1000,
+        "p50_us": samples[len(samples) // 2] / 1000,
+        "p95_us": samples[min(len(samples) - 1, int(len(samples) * 0.95))] / 1000,
+        "lines_per_s": len(arg.splitlines()) / (mean_ns / 1e9),
+        "peak_alloc_kib": peak / 1024,
+        "retained_blocks": retained_blocks,
+    }
+
+
+def compare(result, expected, fields):
+    return [field for field in fields if field in expected and result.get(field) != expected[field]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and check the SDR/FRU parsers.")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--update-expected", action="store_true",
+                        help="rewrite <model>_expected.json from the current dev parser output (review the diff!)")
+    args = parser.parse_args()
+
+    prod = load_prod_module()
+    manager, parsers = make_parsers(prod)
+    dev_name = "dev SdrParser (cached)"
+    results = []
+    failures = 0
+
+    for case in load_cases():
+        dev_result = parsers[dev_name](case["sdr"])
+        info = model_info(manager, prod, case["fru"]) if case["fru"] else {}
+
+        if args.update_expected and case["name"] in MODELS:
+            expected = {**dev_result, "model_info": info.get("dev")}
+            with open(os.path.join(FIXTURES_DIR, f"{case['name']}_expected.json"), "w") as f:
+                json.dump(expected, f, indent=2)
+                f.write("\n")
+            case["expected"] = expected
+
+        print(f"\n== {case['name']} ({len(case['sdr'].splitlines())} lines) ==")
+        expected = case["expected"]
+        if expected is None:
+            print("  no expected snapshot (run with --update-expected)")
+        for name, func in parsers.items():
+            output = func(case["sdr"])
+            fields = SHARED_FIELDS if name.startswith("prod") else SHARED_FIELDS + ["voltages", "psus"]
+            mismatches = compare(output, expected, fields) if expected else []
+            if name.startswith("dev") and mismatches:
+                failures += 1
+            stats = measure(func, case["sdr"], args.iterations)
+            verdict = "ok" if not mismatches else "DIFFERS in " + ", ".join(mismatches)
+            print(f"  {name:<26} {stats['mean_us']:9.1f} us/call  p95 {stats['p95_us']:9.1f} us  "
+                  f"{stats['lines_per_s']:>12,.0f} lines/s  peak {stats['peak_alloc_kib']:7.1f} KiB  "
+                  f"kept {stats['retained_blocks']:5d} blocks  {verdict}")
+            results.append({"case": case["name"], "parser": name, "mismatches": mismatches, **stats})
+
+        for tree, model in info.items():
+            mismatches = []
+            if expected and expected.get("model_info") and model != expected["model_info"]:
+                mismatches = ["model_info"]
+                failures += tree == "dev"
+            print(f"  {tree} get_server_model_info -> {model} {'ok' if not mismatches else 'DIFFERS'}")
+            results.append({"case": case["name"], "parser": f"{tree} get_server_model_info", "mismatches": mismatches})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"iterations": args.iterations, "python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    if failures:
+        print(f"\n{failures} dev parser result(s) did not match the expected snapshots.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# HA-iDRAC/ha-idrac-controller-dev/benchmarks/web_bench.py
+# Benchmarks the ingress web server in each serving mode (waitress and Flask's
+# development server). For every mode a child process runs run_web_server
+# against a StatusStore of synthetic servers, with background threads that
+# update the store and burn CPU the way the polling workers do. Client threads
+# then request a mix of the dashboard, the JSON API (half of them conditional)
+# and the stylesheet over persistent connections, and the requests/s and
+# latency percentiles are reported side by side.
+#
+# Run from the add-on folder:
+#   python3 -m benchmarks.web_bench [--servers 100] [--clients 8] [--duration 20] [--json results.json]
+import argparse
+import http.client
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+MODES = ["flask", "waitress"]
+# (path, conditional): the mix each client cycles through, like a few dashboards plus an API poller
+REQUEST_MIX = [("/", False), ("/api/servers", False), ("/api/servers", True),
+               ("/api/servers?fields=hottest_cpu_temp_c,power_consumption_watts", False), ("/static/style.css", False)]
+
+
+def synthetic_entry(alias, rng):
+    cpus = [rng.randint(35, 70) for _ in range(2)]
+    return {
+        "alias": alias, "ip": f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+        "last_updated": time.strftime("%Y-%m-%d %H:%M:%S %Z"),
+        "hottest_cpu_temp_c": max(cpus), "inlet_temp_c": rng.randint(18, 28), "exhaust_temp_c": rng.randint(30, 45),
+        "power_consumption_watts": rng.randint(120, 400), "target_fan_speed_percent": rng.choice([20, 50]),
+        "cpu_temps_c": cpus, "actual_fan_rpms": [{"name": f"Fan{i}", "rpm": rng.randint(3000, 9000)} for i in range(1, 7)],
+        "psu_status": [{"name": "PS1 Status", "state": "Presence detected"}, {"name": "PS2 Status", "state": "Presence detected"}],
+        "breaker": {"state": "closed", "consecutive_failures": 0, "trips": 0},
+        "cycle_count": 0,
+    }
+
+
+# --- Server side (child process) ---
+def serve(args):
+    from app import web_server
+    from app.status_store import StatusStore
+
+    rng = random.Random(1)
+    store = StatusStore()
+    aliases = [f"bench-{i:04d}" for i in range(args.servers)]
+    for alias in aliases:
+        store.set(alias, synthetic_entry(alias, rng))
+
+    def poller():
+        # Each server changes once per `interval`, spread out, with a little CPU work per change
+        while True:
+            for alias in aliases:
+                store.update(alias, synthetic_entry(alias, rng))
+                sum(i * i for i in range(args.busy_work))
+                time.sleep(args.interval / len(aliases))
+
+    for _ in range(args.busy_threads):
+        threading.Thread(target=poller, daemon=True).start()
+    web_server.log.disabled = True
+    web_server.run_web_server(args.port, store, mode=args.serve, threads=args.threads)
+
+
+# --- Client side ---
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p / 100))], 2)
+
+
+def client(port, deadline, results, seed):
+    rng = random.Random(seed)
+    connection, etags, connects = None, {}, 0
+    latencies, statuses, errors, by_path = [], {}, 0, {}
+    while time.time() < deadline:
+        path, conditional = rng.choice(REQUEST_MIX)
+        headers = {"Accept-Encoding": "gzip"}
+        if conditional and path in etags:
+            headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                connects += 1
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection = None
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        by_path.setdefault(path.split("?")[0] + (" (conditional)" if conditional else ""), []).append(latencies[-1])
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+        if response.will_close:
+            connection.close()
+            connection = None
+    results.append({"latencies": latencies, "statuses": statuses, "errors": errors, "connects": connects, "by_path": by_path})
+
+
+def wait_for_port(port, proc, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def run_mode(mode, args):
+    port = free_port()
+    command = [sys.executable, "-m", "benchmarks.web_bench", "--serve", mode, "--port", str(port),
+               "--servers", str(args.servers), "--threads", str(args.threads), "--busy-threads", str(args.busy_threads),
+               "--busy-work", str(args.busy_work), "--interval", str(args.interval)]
+    proc = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_port(port, proc):
+            raise RuntimeError(f"{mode} server did not start")
+        time.sleep(1)
+        results, threads = [], []
+        deadline = time.time() + args.duration
+        for i in range(args.clients):
+            thread = threading.Thread(target=client, args=(port, deadline, results, i))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    latencies = [ms for r in results for ms in r["latencies"]]
+    statuses, by_path = {}, {}
+    for r in results:
+        for path, values in r["by_path"].items():
+            by_path.setdefault(path, []).extend(values)
+        for status, count in r["statuses"].items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+    return {
+        "mode": mode, "requests": len(latencies), "requests_per_s": round(len(latencies) / args.duration, 1),
+        "p50_ms": percentile(latencies, 50), "p90_ms": percentile(latencies, 90), "p99_ms": percentile(latencies, 99),
+        "errors": sum(r["errors"] for r in results), "connections": sum(r["connects"] for r in results), "statuses": statuses,
+        "paths": {path: {"p50_ms": percentile(values, 50), "p99_ms": percentile(values, 99)} for path, values in sorted(by_path.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the web UI's serving modes")
+    parser.add_argument("--servers", type=int, default=100, help="synthetic servers in the status store")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per mode")
+    parser.add_argument("--threads", type=int, default=16, help="waitress thread pool size")
+    parser.add_argument("--busy-threads", type=int, default=4, help="background threads updating the store like workers")
+    parser.add_argument("--busy-work", type=int, default=20000, help="CPU work per simulated status update")
+    parser.add_argument("--interval", type=float, default=15, help="seconds in which every synthetic server is updated once")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--json", help="also save the results to this file")
+    parser.add_argument("--serve", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    print(f"[BENCH] {args.servers} servers, {args.clients} clients, {args.duration:.0f}s per mode, "
+          f"{args.busy_threads} busy worker threads", flush=True)
+    results = []
+    for mode in args.modes.split(","):
+        result = run_mode(mode, args)
+        results.append(result)
+        print(f"[BENCH] {mode:<9} {result['requests_per_s']:>7} req/s  p50 {result['p50_ms']} ms  p90 {result['p90_ms']} ms  "
+              f"p99 {result['p99_ms']} ms  errors {result['errors']}  connections {result['connections']}  "
+              f"statuses {result['statuses']}", flush=True)
+        for path, stats in result["paths"].items():
+            print(f"[BENCH]             {path:<28} p50 {stats['p50_ms']} ms  p99 {stats['p99_ms']} ms", flush=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k not in ("serve", "port")}, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
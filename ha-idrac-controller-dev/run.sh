@@ -8,6 +8,19 @@ echo "[RUN.SH] >>> Add-on execution started at $(date)"
 MASTER_ENCRYPTION_KEY_DEFAULT="" 
 CHECK_INTERVAL_SECONDS_DEFAULT=60
 LOG_LEVEL_DEFAULT="info"
+IPMI_TRANSPORT_DEFAULT="ipmitool"
+POLLING_ENGINE_DEFAULT="threads"
+MAX_CONCURRENCY_DEFAULT=32
+CYCLE_TIMEOUT_SECONDS_DEFAULT=120
+POLL_JITTER_SECONDS_DEFAULT=0
+STATUS_PERSIST_SECONDS_DEFAULT=10
+WEB_SERVER_MODE_DEFAULT="waitress"
+WEB_THREADS_DEFAULT=16
+HISTORY_DAYS_DEFAULT=2
+HISTORY_DB_DEFAULT=false
+HISTORY_DB_RAW_HOURS_DEFAULT=24
+HISTORY_DB_5M_DAYS_DEFAULT=30
+HISTORY_DB_1H_DAYS_DEFAULT=365
 TEMPERATURE_UNIT_DEFAULT="C"
 BASE_FAN_SPEED_PERCENT_DEFAULT=20
 LOW_TEMP_THRESHOLD_DEFAULT=45
@@ -17,6 +30,14 @@ MQTT_HOST_DEFAULT="core-mosquitto"
 MQTT_PORT_DEFAULT=1883
 MQTT_USERNAME_DEFAULT=""
 MQTT_PASSWORD_DEFAULT=""
+MQTT_STATE_MODE_DEFAULT="combined"
+MQTT_DEADBAND_TEMPERATURE_DEFAULT="1"
+MQTT_DEADBAND_FAN_RPM_DEFAULT="100"
+MQTT_DEADBAND_POWER_DEFAULT="5"
+MQTT_DEADBAND_INTERVAL_DEFAULT="25%"
+MQTT_HEARTBEAT_SECONDS_DEFAULT=300
+MQTT_OFFLINE_BUFFER_KB_DEFAULT=1024
+MQTT_OFFLINE_SPILL_DEFAULT="false"
 
 # Read configuration from /data/options.json if it exists
 if [ -f /data/options.json ]; then
@@ -27,6 +48,19 @@ if [ -f /data/options.json ]; then
     #export IDRAC_PASSWORD=$(jq -r '.idrac_password // empty' /data/options.json)
     export CHECK_INTERVAL_SECONDS=$(jq -r '.check_interval_seconds // "'"$CHECK_INTERVAL_SECONDS_DEFAULT"'"' /data/options.json)
     export LOG_LEVEL=$(jq -r '.log_level // "'"$LOG_LEVEL_DEFAULT"'"' /data/options.json)
+    export IPMI_TRANSPORT=$(jq -r '.ipmi_transport // "'"$IPMI_TRANSPORT_DEFAULT"'"' /data/options.json)
+    export POLLING_ENGINE=$(jq -r '.polling_engine // "'"$POLLING_ENGINE_DEFAULT"'"' /data/options.json)
+    export MAX_CONCURRENCY=$(jq -r '.max_concurrency // '$MAX_CONCURRENCY_DEFAULT /data/options.json)
+    export CYCLE_TIMEOUT_SECONDS=$(jq -r '.cycle_timeout_seconds // '$CYCLE_TIMEOUT_SECONDS_DEFAULT /data/options.json)
+    export POLL_JITTER_SECONDS=$(jq -r '.poll_jitter_seconds // '$POLL_JITTER_SECONDS_DEFAULT /data/options.json)
+    export STATUS_PERSIST_SECONDS=$(jq -r '.status_persist_seconds // '$STATUS_PERSIST_SECONDS_DEFAULT /data/options.json)
+    export WEB_SERVER_MODE=$(jq -r '.web_server_mode // "'"$WEB_SERVER_MODE_DEFAULT"'"' /data/options.json)
+    export WEB_THREADS=$(jq -r '.web_threads // '$WEB_THREADS_DEFAULT /data/options.json)
+    export HISTORY_DAYS=$(jq -r '.history_days // '$HISTORY_DAYS_DEFAULT /data/options.json)
+    export HISTORY_DB=$(jq -r '.history_db // '$HISTORY_DB_DEFAULT /data/options.json)
+    export HISTORY_DB_RAW_HOURS=$(jq -r '.history_db_raw_hours // '$HISTORY_DB_RAW_HOURS_DEFAULT /data/options.json)
+    export HISTORY_DB_5M_DAYS=$(jq -r '.history_db_5m_days // '$HISTORY_DB_5M_DAYS_DEFAULT /data/options.json)
+    export HISTORY_DB_1H_DAYS=$(jq -r '.history_db_1h_days // '$HISTORY_DB_1H_DAYS_DEFAULT /data/options.json)
 
     export TEMPERATURE_UNIT=$(jq -r '.temperature_unit // "'"$TEMPERATURE_UNIT_DEFAULT"'"' /data/options.json)
     export BASE_FAN_SPEED_PERCENT=$(jq -r '.base_fan_speed_percent // "'"$BASE_FAN_SPEED_PERCENT_DEFAULT"'"' /data/options.json)
@@ -38,6 +72,14 @@ if [ -f /data/options.json ]; then
     export MQTT_PORT=$(jq -r '.mqtt_port // '$MQTT_PORT_DEFAULT /data/options.json)
     export MQTT_USERNAME=$(jq -r '.mqtt_username // empty' /data/options.json)
     export MQTT_PASSWORD=$(jq -r '.mqtt_password // empty' /data/options.json)
+    export MQTT_STATE_MODE=$(jq -r '.mqtt_state_mode // "'"$MQTT_STATE_MODE_DEFAULT"'"' /data/options.json)
+    export MQTT_DEADBAND_TEMPERATURE=$(jq -r '.mqtt_deadband_temperature // "'"$MQTT_DEADBAND_TEMPERATURE_DEFAULT"'"' /data/options.json)
+    export MQTT_DEADBAND_FAN_RPM=$(jq -r '.mqtt_deadband_fan_rpm // "'"$MQTT_DEADBAND_FAN_RPM_DEFAULT"'"' /data/options.json)
+    export MQTT_DEADBAND_POWER=$(jq -r '.mqtt_deadband_power // "'"$MQTT_DEADBAND_POWER_DEFAULT"'"' /data/options.json)
+    export MQTT_DEADBAND_INTERVAL=$(jq -r '.mqtt_deadband_interval // "'"$MQTT_DEADBAND_INTERVAL_DEFAULT"'"' /data/options.json)
+    export MQTT_HEARTBEAT_SECONDS=$(jq -r '.mqtt_heartbeat_seconds // '$MQTT_HEARTBEAT_SECONDS_DEFAULT /data/options.json)
+    export MQTT_OFFLINE_BUFFER_KB=$(jq -r '.mqtt_offline_buffer_kb // '$MQTT_OFFLINE_BUFFER_KB_DEFAULT /data/options.json)
+    export MQTT_OFFLINE_SPILL=$(jq -r '.mqtt_offline_spill // '$MQTT_OFFLINE_SPILL_DEFAULT /data/options.json)
 else
     echo "[RUN.SH] WARNING: /data/options.json not found. Using internal defaults."
     export IDRAC_IP="$IDRAC_IP_DEFAULT"
@@ -45,6 +87,19 @@ else
     export IDRAC_PASSWORD="$IDRAC_PASSWORD_DEFAULT"
     export CHECK_INTERVAL_SECONDS="$CHECK_INTERVAL_SECONDS_DEFAULT"
     export LOG_LEVEL="$LOG_LEVEL_DEFAULT"
+    export IPMI_TRANSPORT="$IPMI_TRANSPORT_DEFAULT"
+    export POLLING_ENGINE="$POLLING_ENGINE_DEFAULT"
+    export MAX_CONCURRENCY="$MAX_CONCURRENCY_DEFAULT"
+    export CYCLE_TIMEOUT_SECONDS="$CYCLE_TIMEOUT_SECONDS_DEFAULT"
+    export POLL_JITTER_SECONDS="$POLL_JITTER_SECONDS_DEFAULT"
+    export STATUS_PERSIST_SECONDS="$STATUS_PERSIST_SECONDS_DEFAULT"
+    export WEB_SERVER_MODE="$WEB_SERVER_MODE_DEFAULT"
+    export WEB_THREADS="$WEB_THREADS_DEFAULT"
+    export HISTORY_DAYS="$HISTORY_DAYS_DEFAULT"
+    export HISTORY_DB="$HISTORY_DB_DEFAULT"
+    export HISTORY_DB_RAW_HOURS="$HISTORY_DB_RAW_HOURS_DEFAULT"
+    export HISTORY_DB_5M_DAYS="$HISTORY_DB_5M_DAYS_DEFAULT"
+    export HISTORY_DB_1H_DAYS="$HISTORY_DB_1H_DAYS_DEFAULT"
     export TEMPERATURE_UNIT="$TEMPERATURE_UNIT_DEFAULT"
     export BASE_FAN_SPEED_PERCENT="$BASE_FAN_SPEED_PERCENT_DEFAULT"
     export LOW_TEMP_THRESHOLD="$LOW_TEMP_THRESHOLD_DEFAULT"
@@ -54,17 +109,33 @@ else
     export MQTT_PORT="$MQTT_PORT_DEFAULT"
     export MQTT_USERNAME="$MQTT_USERNAME_DEFAULT"
     export MQTT_PASSWORD="$MQTT_PASSWORD_DEFAULT"
+    export MQTT_STATE_MODE="$MQTT_STATE_MODE_DEFAULT"
+    export MQTT_DEADBAND_TEMPERATURE="$MQTT_DEADBAND_TEMPERATURE_DEFAULT"
+    export MQTT_DEADBAND_FAN_RPM="$MQTT_DEADBAND_FAN_RPM_DEFAULT"
+    export MQTT_DEADBAND_POWER="$MQTT_DEADBAND_POWER_DEFAULT"
+    export MQTT_DEADBAND_INTERVAL="$MQTT_DEADBAND_INTERVAL_DEFAULT"
+    export MQTT_HEARTBEAT_SECONDS="$MQTT_HEARTBEAT_SECONDS_DEFAULT"
+    export MQTT_OFFLINE_BUFFER_KB="$MQTT_OFFLINE_BUFFER_KB_DEFAULT"
+    export MQTT_OFFLINE_SPILL="$MQTT_OFFLINE_SPILL_DEFAULT"
 fi
 
 echo "[RUN.SH] Effective Configuration:"
 echo "[RUN.SH]   IDRAC_IP: ${IDRAC_IP}"
 echo "[RUN.SH]   LOG_LEVEL: ${LOG_LEVEL}"
+echo "[RUN.SH]   IPMI_TRANSPORT: ${IPMI_TRANSPORT}"
+echo "[RUN.SH]   POLLING_ENGINE: ${POLLING_ENGINE} (max concurrency ${MAX_CONCURRENCY}, cycle timeout ${CYCLE_TIMEOUT_SECONDS}s)"
+echo "[RUN.SH]   STATUS_PERSIST_SECONDS: ${STATUS_PERSIST_SECONDS}"
+echo "[RUN.SH]   WEB_SERVER: ${WEB_SERVER_MODE} (${WEB_THREADS} threads)"
+echo "[RUN.SH]   HISTORY_DAYS: ${HISTORY_DAYS}"
+echo "[RUN.SH]   HISTORY_DB: ${HISTORY_DB} (raw ${HISTORY_DB_RAW_HOURS}h, 5m ${HISTORY_DB_5M_DAYS}d, 1h ${HISTORY_DB_1H_DAYS}d)"
 echo "[RUN.SH]   TEMP_UNIT: ${TEMPERATURE_UNIT}"
 echo "[RUN.SH]   BASE_FAN_SPEED: ${BASE_FAN_SPEED_PERCENT}%"
 echo "[RUN.SH]   LOW_TEMP_THRESH: ${LOW_TEMP_THRESHOLD}°${TEMPERATURE_UNIT}"
 echo "[RUN.SH]   HIGH_TEMP_FAN_SPEED: ${HIGH_TEMP_FAN_SPEED_PERCENT}%"
 echo "[RUN.SH]   CRITICAL_TEMP_THRESH: ${CRITICAL_TEMP_THRESHOLD}°${TEMPERATURE_UNIT}"
-echo "[RUN.SH]   MQTT_HOST: ${MQTT_HOST}:${MQTT_PORT}"
+echo "[RUN.SH]   MQTT_HOST: ${MQTT_HOST}:${MQTT_PORT} (state mode: ${MQTT_STATE_MODE})"
+echo "[RUN.SH]   MQTT_DEADBANDS: ${MQTT_DEADBAND_TEMPERATURE}°/${MQTT_DEADBAND_FAN_RPM} RPM/${MQTT_DEADBAND_POWER} W/${MQTT_DEADBAND_INTERVAL} poll interval (heartbeat ${MQTT_HEARTBEAT_SECONDS}s)"
+echo "[RUN.SH]   MQTT_OFFLINE_BUFFER: ${MQTT_OFFLINE_BUFFER_KB} KB (save to disk: ${MQTT_OFFLINE_SPILL})"
 # Avoid logging username/password directly unless debugging and you know it's safe
 # echo "[RUN.SH] MQTT_USERNAME: ${MQTT_USERNAME}"
 
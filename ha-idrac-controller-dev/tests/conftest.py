@@ -0,0 +1,32 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/conftest.py
+# Shared fixtures. Run the suite from the add-on folder with `python3 -m pytest`.
+import os
+import stat
+import threading
+
+import pytest
+
+from tools.fake_bmc import LanplusBMCServer, SimulatedBMC
+
+
+@pytest.fixture
+def fake_bmc():
+    """A fake BMC answering RMCP+ on a free local UDP port, as root/calvin."""
+    server = LanplusBMCServer(SimulatedBMC(), "127.0.0.1", 0, {"root": "calvin"})
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.stop()
+    thread.join(timeout=2)
+
+
+@pytest.fixture
+def install_ipmitool(tmp_path, monkeypatch):
+    """Returns a function that puts a shell script named `ipmitool` first on PATH."""
+    def install(script):
+        path = tmp_path / "bin" / "ipmitool"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(script)
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+        monkeypatch.setenv("PATH", f"{path.parent}{os.pathsep}{os.environ['PATH']}")
+    return install
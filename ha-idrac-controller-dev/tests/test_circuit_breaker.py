@@ -0,0 +1,99 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_circuit_breaker.py
+# CircuitBreaker state transitions, on a manual clock.
+import pytest
+
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def breaker(clock, **kwargs):
+    options = dict(failure_threshold=2, base_backoff=30, max_backoff=120, jitter=0)
+    options.update(kwargs)
+    return CircuitBreaker(clock=clock, **options)
+
+
+def test_opens_after_threshold_failures(clock):
+    b = breaker(clock)
+    assert b.allow_request()
+    b.record_failure()
+    assert b.state == CLOSED
+    b.record_failure()
+    assert b.state == OPEN and b.trips == 1
+    assert b.seconds_until_retry() == 30
+
+
+def test_success_resets_the_failure_count(clock):
+    b = breaker(clock)
+    b.record_failure()
+    b.record_success()
+    b.record_failure()
+    assert b.state == CLOSED and b.consecutive_failures == 1
+
+
+def test_open_skips_until_backoff_expires_then_probes(clock):
+    b = breaker(clock)
+    b.record_failure()
+    b.record_failure()
+    clock.now += 29.9
+    assert not b.allow_request()
+    assert b.skipped_cycles == 1 and b.state == OPEN
+    clock.now += 0.1
+    assert b.allow_request()
+    assert b.state == HALF_OPEN and b.probes == 1
+
+
+def test_successful_probe_closes(clock):
+    b = breaker(clock)
+    b.record_failure()
+    b.record_failure()
+    clock.now += 30
+    b.allow_request()
+    b.record_success()
+    assert b.state == CLOSED and b.consecutive_failures == 0
+    # The backoff starts over after a recovery
+    b.record_failure()
+    b.record_failure()
+    assert b.seconds_until_retry() == 30
+
+
+def test_failed_probe_reopens_with_doubled_backoff_up_to_the_cap(clock):
+    b = breaker(clock)
+    b.record_failure()
+    b.record_failure()
+    backoffs = []
+    for _ in range(4):
+        clock.now += b.seconds_until_retry()
+        assert b.allow_request() and b.state == HALF_OPEN
+        b.record_failure()  # one failed probe is enough, whatever the threshold
+        assert b.state == OPEN
+        backoffs.append(b.seconds_until_retry())
+    assert backoffs == [60, 120, 120, 120]
+    assert b.trips == 5 and b.probes == 4
+
+
+def test_jitter_stays_within_bounds(clock):
+    for _ in range(50):
+        b = breaker(clock, failure_threshold=1, jitter=0.2)
+        b.record_failure()
+        assert 24 <= b.seconds_until_retry() <= 36
+
+
+def test_stats(clock):
+    b = breaker(clock)
+    b.record_failure()
+    b.record_failure()
+    clock.now += 10
+    assert b.stats() == {"state": OPEN, "consecutive_failures": 2, "trips": 1, "probes": 0,
+                         "skipped_cycles": 0, "retry_in_seconds": 20}
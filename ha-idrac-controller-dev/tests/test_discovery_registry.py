@@ -0,0 +1,78 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_discovery_registry.py
+# DiscoveryRegistry stale-config sweeping and removal of orphaned registries.
+import json
+
+import pytest
+
+from app.discovery_registry import STALE_AFTER_POLLS, DiscoveryRegistry, remove_orphaned
+
+CPU1 = "homeassistant/sensor/r720/cpu1_temp/config"
+CPU2 = "homeassistant/sensor/r720/cpu2_temp/config"
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = DiscoveryRegistry(str(tmp_path), "r720")
+    registry.record(CPU1, '{"name": "CPU1"}')
+    registry.record(CPU2, '{"name": "CPU2"}')
+    return registry
+
+
+def test_sensor_is_removed_after_stale_after_polls_misses(registry):
+    for _ in range(STALE_AFTER_POLLS - 1):
+        assert registry.sweep({CPU1}) == []
+    assert registry.configs[CPU2]["missed"] == STALE_AFTER_POLLS - 1
+    assert registry.sweep({CPU1}) == [CPU2]
+    assert list(registry.configs) == [CPU1]
+
+
+def test_reappearing_sensor_resets_its_count(registry):
+    for _ in range(STALE_AFTER_POLLS - 1):
+        registry.sweep({CPU1})
+    registry.sweep({CPU1, CPU2})
+    assert registry.configs[CPU2]["missed"] == 0
+    for _ in range(STALE_AFTER_POLLS - 1):
+        assert registry.sweep({CPU1}) == []
+
+
+def test_published_state_survives_a_restart(registry, tmp_path):
+    registry.sweep({CPU1})
+    registry.save()
+    reloaded = DiscoveryRegistry(str(tmp_path), "r720")
+    reloaded.load()
+    assert reloaded.is_published(CPU1, '{"name": "CPU1"}')
+    assert not reloaded.is_published(CPU1, '{"name": "CPU 1"}')
+    assert reloaded.configs[CPU2]["missed"] == 1
+
+
+def test_invalidate_republishes_but_still_remembers(registry):
+    registry.invalidate()
+    assert not registry.is_published(CPU1, '{"name": "CPU1"}')
+    assert set(registry.configs) == {CPU1, CPU2}  # still swept and removed if they stop appearing
+    registry.record(CPU1, '{"name": "CPU1"}')
+    assert registry.is_published(CPU1, '{"name": "CPU1"}')
+
+
+@pytest.mark.parametrize("content", [b"{\"version\": 1", b"\xff\xfe", b"[]",
+                                     json.dumps({"version": 1, "key": "r730", "configs": {CPU1: {}}}).encode()])
+def test_corrupt_or_foreign_registry_is_ignored(tmp_path, content):
+    (tmp_path / "r720.json").write_bytes(content)
+    registry = DiscoveryRegistry(str(tmp_path), "r720")
+    registry.load()
+    assert registry.configs == {}
+
+
+def test_orphans_from_a_previous_configuration_are_removed(tmp_path):
+    for key in ("r720", "old server"):
+        registry = DiscoveryRegistry(str(tmp_path), key)
+        registry.record(f"homeassistant/sensor/{key}/temp/config", "{}")
+        registry.save()
+    (tmp_path / "broken.json").write_text("[")
+    published = []
+    remove_orphaned(str(tmp_path), ["r720"], lambda topic, payload, retain: published.append((topic, payload, retain)))
+    assert published == [("homeassistant/sensor/old server/temp/config", "", True)]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["r720.json"]
+
+
+def test_missing_registry_dir_is_not_an_error(tmp_path):
+    remove_orphaned(str(tmp_path / "absent"), [], lambda *args, **kwargs: pytest.fail("nothing to remove"))
@@ -0,0 +1,102 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_engine.py
+# PollingEngine task lifecycle, with stand-in workers.
+import threading
+import time
+
+import pytest
+
+from app import engine
+from app.engine import PollingEngine
+
+
+class StubWorker:
+    def __init__(self, alias, init_errors=0, cycles=1):
+        self.alias = alias
+        self.running = True
+        self.init_errors = init_errors
+        self.init_calls = 0
+        self.cycles_left = cycles
+        self.cycles_run = 0
+        self.offline_marks = 0
+        self.cleaned_up = threading.Event()
+
+    def initialize(self):
+        self.init_calls += 1
+        if self.init_calls <= self.init_errors:
+            raise ConnectionError("MQTT broker unreachable")
+        return True
+
+    def first_poll_delay(self):
+        return 0
+
+    def run_cycle(self):
+        self.cycles_run += 1
+        self.cycles_left -= 1
+        if self.cycles_left <= 0:
+            self.running = False
+        return 0
+
+    def mark_offline(self):
+        self.offline_marks += 1
+
+    def cleanup(self):
+        self.cleaned_up.set()
+
+    def stop(self):
+        self.running = False
+
+
+@pytest.fixture(autouse=True)
+def no_retry_wait(monkeypatch):
+    monkeypatch.setattr(engine, "TIMEOUT_RETRY_SECONDS", 0)
+
+
+def run_engine(workers):
+    polling = PollingEngine(workers, max_concurrency=2, cycle_timeout_seconds=5)
+    polling.start()
+    polling._thread.join(timeout=10)
+    assert not polling._thread.is_alive()
+
+
+def test_initialize_exception_is_logged_and_retried(capsys):
+    flaky, healthy = StubWorker("flaky", init_errors=2), StubWorker("healthy")
+    run_engine([flaky, healthy])
+    assert flaky.init_calls == 3 and flaky.offline_marks == 2
+    assert flaky.cycles_run == 1 and flaky.cleaned_up.is_set()
+    assert healthy.cycles_run == 1
+    assert "[ENGINE] [flaky] Initialization failed: MQTT broker unreachable" in capsys.readouterr().out
+
+
+def test_initialize_retry_stops_with_the_worker():
+    worker = StubWorker("gone", init_errors=1)
+    worker.mark_offline = worker.stop  # stopped while waiting to retry
+    run_engine([worker])
+    assert worker.init_calls == 1 and worker.cycles_run == 0
+    assert not worker.cleaned_up.is_set()
+
+
+class SlowWorker(StubWorker):
+    """Its only cycle overruns the engine's timeout; records the order things happen in."""
+
+    def __init__(self, alias):
+        super().__init__(alias)
+        self.events = []
+
+    def run_cycle(self):
+        self.events.append("cycle started")
+        time.sleep(0.5)
+        self.running = False
+        self.events.append("cycle finished")
+        return 0
+
+    def mark_offline(self):
+        self.events.append(f"marked offline on {threading.current_thread().name.split('_')[0]}")
+
+
+def test_timed_out_cycle_is_marked_offline_after_it_returns():
+    worker = SlowWorker("slow")
+    polling = PollingEngine([worker], max_concurrency=1, cycle_timeout_seconds=0.1)
+    polling.start()
+    polling._thread.join(timeout=10)
+    assert worker.events == ["cycle started", "cycle finished", "marked offline on idrac-worker"]
+    assert worker.cleaned_up.is_set()
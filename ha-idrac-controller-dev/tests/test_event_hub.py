@@ -0,0 +1,93 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_event_hub.py
+# EventHub coalescing, event ids, backlog streaming and dropping of slow clients.
+import json
+import queue
+
+import pytest
+
+from app.event_hub import EventHub
+from app.status_store import StatusStore
+
+
+def render(entry):
+    return f"<div>{entry['alias']} {entry.get('cpu_temp')}</div>"
+
+
+@pytest.fixture
+def store():
+    store = StatusStore()
+    store.set("r720", {"alias": "r720", "cpu_temp": 50})
+    store.set("r730", {"alias": "r730", "cpu_temp": 45})
+    return store
+
+
+def parse(message):
+    fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return fields["id"], json.loads(fields["data"])
+
+
+def test_changes_go_out_once_per_server_with_their_own_version_oldest_first(store):
+    hub = EventHub(store, render, coalesce_seconds=0.2)
+    subscriber = hub.subscribe()
+    hub.start()
+    store.update("r730", {"cpu_temp": 46})
+    store.update("r720", {"cpu_temp": 51})
+    store.update("r730", {"cpu_temp": 47})  # same cycle: only the latest state is sent
+    events = [parse(subscriber.queue.get(timeout=5)) for _ in range(2)]
+    assert [event_id for event_id, _ in events] == [f"{store.epoch}-4", f"{store.epoch}-5"]
+    assert [data["html"] for _, data in events] == ["<div>r720 51</div>", "<div>r730 47</div>"]
+    with pytest.raises(queue.Empty):
+        subscriber.queue.get(timeout=0.5)
+    assert hub.stats() == {"clients": 1, "events_sent": 2, "clients_dropped": 0}
+
+
+def test_render_failure_does_not_stop_the_hub(store):
+    calls = []
+
+    def flaky_render(entry):
+        calls.append(entry["alias"])
+        if len(calls) == 1:
+            raise KeyError("status")
+        return render(entry)
+
+    logged = []
+    hub = EventHub(store, flaky_render, coalesce_seconds=0.05, log=lambda level, message: logged.append((level, message)))
+    subscriber = hub.subscribe()
+    hub.start()
+    store.update("r720", {"cpu_temp": 51})
+    with pytest.raises(queue.Empty):
+        subscriber.queue.get(timeout=0.5)
+    assert logged and logged[0][0] == "error"
+    store.update("r720", {"cpu_temp": 52})
+    assert parse(subscriber.queue.get(timeout=5))[1]["html"] == "<div>r720 52</div>"
+
+
+def test_stream_sends_the_backlog_before_live_events(store):
+    hub = EventHub(store, render, keepalive_seconds=0.05)
+    subscriber = hub.subscribe()
+    _, changes = store.changes_since(0)
+    stream = hub.stream(subscriber, [hub.format(version, entry) for version, entry in changes])
+    assert next(stream) == "retry: 5000\n\n"
+    assert [parse(next(stream))[0] for _ in changes] == [f"{store.epoch}-1", f"{store.epoch}-2"]
+    assert next(stream) == ": keepalive\n\n"
+    hub.publish("live\n\n")
+    assert next(stream) == "live\n\n"
+    stream.close()
+    assert hub.stats()["clients"] == 0
+
+
+def test_slow_client_is_dropped_not_buffered(store):
+    hub = EventHub(store, render, queue_size=2)
+    slow, fast = hub.subscribe(), hub.subscribe()
+    for n in range(3):
+        hub.publish(f"event {n}\n\n")
+        fast.queue.get_nowait()
+    assert slow.dropped and not fast.dropped
+    assert hub.stats() == {"clients": 1, "events_sent": 5, "clients_dropped": 1}
+    assert list(hub.stream(slow)) == ["retry: 5000\n\n"]  # ends, so the browser reconnects
+
+
+def test_subscribers_are_limited(store):
+    hub = EventHub(store, render, max_clients=1)
+    assert hub.subscribe() is not None
+    assert hub.subscribe() is None
@@ -0,0 +1,67 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_fan_actuator.py
+# Fan writes over the shell transport, with a scripted `ipmitool shell` and a simulated clock.
+import time
+
+import pytest
+
+from app.fan_actuator import FanActuator
+from app.ipmi_manager import IPMIManager
+
+# Answers `echo` (the reply framing) and logs every other command it is sent
+SHELL_SCRIPT = """#!/bin/sh
+while IFS= read -r line; do
+  case "$line" in
+    "echo "*) echo "${{line#echo }}" ;;
+    exit) exit 0 ;;
+    *) echo "$line" >> "{calls}" ;;
+  esac
+done
+"""
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    return now
+
+
+@pytest.fixture
+def shell_commands(tmp_path, install_ipmitool):
+    calls = tmp_path / "shell.log"
+    calls.touch()
+    install_ipmitool(SHELL_SCRIPT.format(calls=calls))
+    return calls
+
+
+def test_idle_shell_recycle_does_not_reassert_fans(clock, shell_commands):
+    ipmi = IPMIManager("127.0.0.1", "root", "calvin", transport="shell")
+    actuator = FanActuator(ipmi, reassert_seconds=300)
+    try:
+        assert actuator.set_manual(30)
+        assert shell_commands.read_text().splitlines() == ["raw 0x30 0x30 0x01 0x00", "raw 0x30 0x30 0x02 0xff 0x1e"]
+
+        clock[0] += 60  # past the shell's idle restart, well short of the periodic re-assert
+        ipmi._run_ipmi_command(["0x06", "0x01"])  # the next cycle's first command recycles the idle shell
+        assert ipmi.shell.starts == 2 and ipmi.shell.failures == 0
+        assert actuator.set_manual(30)
+        assert shell_commands.read_text().splitlines()[2:] == ["raw 0x06 0x01"]
+        assert actuator.writes_sent == 2
+    finally:
+        ipmi.close()
+
+
+def test_lost_shell_session_reasserts_fans(clock, shell_commands):
+    ipmi = IPMIManager("127.0.0.1", "root", "calvin", transport="shell")
+    actuator = FanActuator(ipmi, reassert_seconds=300)
+    try:
+        assert actuator.set_manual(30)
+        ipmi.shell.proc.kill()
+        ipmi.shell.proc.wait()
+        ipmi._run_ipmi_command(["0x06", "0x01"])
+        assert ipmi.shell.failures == 1
+        assert actuator.set_manual(30)
+        assert shell_commands.read_text().splitlines()[-2:] == ["raw 0x30 0x30 0x01 0x00", "raw 0x30 0x30 0x02 0xff 0x1e"]
+    finally:
+        ipmi.close()
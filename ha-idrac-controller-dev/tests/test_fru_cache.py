@@ -0,0 +1,51 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_fru_cache.py
+# FruCache persistence and identity matching.
+import json
+
+import pytest
+
+from app.fru_cache import FruCache, bmc_identity
+
+DEVICE = {"device_id": 0x20, "device_revision": 1, "firmware": "2.65", "ipmi_version": "2.0",
+          "manufacturer_id": 674, "product_id": 0x100}
+MODEL = {"manufacturer": "DELL", "model": "PowerEdge R720"}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FruCache(str(tmp_path), "10.0.0.5")
+
+
+def test_identity_keeps_only_the_fields_that_identify_the_board():
+    assert bmc_identity(DEVICE) == {"manufacturer_id": 674, "product_id": 0x100, "device_id": 0x20, "firmware": "2.65"}
+    assert bmc_identity(None) is None
+
+
+def test_stored_model_matches_the_same_identity(cache, tmp_path):
+    cache.store(bmc_identity(DEVICE), MODEL)
+    reloaded = FruCache(str(tmp_path), "10.0.0.5")
+    assert reloaded.load() == MODEL
+    assert reloaded.matches(bmc_identity(DEVICE))
+
+
+@pytest.mark.parametrize("change", [{"firmware": "2.70"}, {"product_id": 0x200}])
+def test_a_different_identity_does_not_match(cache, change):
+    cache.store(bmc_identity(DEVICE), MODEL)
+    assert not cache.matches(bmc_identity({**DEVICE, **change}))
+    assert not cache.matches(None)  # Get Device ID failed
+
+
+@pytest.mark.parametrize("content", [b"{\"version\": 1, \"ip\": ", b"\xff\xfe\x00garbage", b"[1, 2]", b"null",
+                                     json.dumps({"version": 0, "ip": "10.0.0.5", "model_info": MODEL}).encode(),
+                                     json.dumps({"version": 1, "ip": "10.0.0.6", "model_info": MODEL}).encode()])
+def test_corrupt_or_foreign_cache_is_ignored(cache, content):
+    with open(cache._path(), "wb") as f:
+        f.write(content)
+    assert cache.load() is None
+    assert not cache.matches(bmc_identity(DEVICE))
+
+
+def test_each_ip_has_its_own_file(tmp_path):
+    FruCache(str(tmp_path), "10.0.0.5").store(bmc_identity(DEVICE), MODEL)
+    assert FruCache(str(tmp_path), "10.0.0.6").load() is None
+    assert FruCache(str(tmp_path), "10.0.0.5:6230").load() is None
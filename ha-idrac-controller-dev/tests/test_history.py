@@ -0,0 +1,106 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_history.py
+# Ring buffer history: encoding, rollup bucket boundaries and ring wrap-around.
+from app.history import MISSING, RAW_POINTS, HistoryStore, ServerHistory, decode_value, encode_value
+
+T0 = 1_699_999_780  # 40 s past a minute boundary, 580 s past a 15-minute one
+
+
+def test_encoding():
+    assert encode_value(41.26, 10) == 413 and decode_value(413, 10) == 41.3
+    assert encode_value(4200, 1) == 4200 and decode_value(4200, 1) == 4200
+    assert encode_value(None, 1) == MISSING and encode_value("Dell Auto", 1) == MISSING
+    assert encode_value(float("nan"), 10) == MISSING
+    assert encode_value(True, 1) == MISSING
+    assert encode_value(99999, 1) == 32767 and encode_value(-99999, 1) == -32767
+    assert decode_value(MISSING, 10) is None
+
+
+def test_minute_bucket_closes_on_the_boundary():
+    history = ServerHistory(days=1)
+    history.record(T0, {"power": 100})
+    history.record(T0 + 19, {"power": 200})   # :59, still the first minute
+    history.record(T0 + 20, {"power": 400})   # :00, a new bucket
+    times, data = history.query(["power"], "1m")
+    assert times == [T0 - 40, T0 + 20]
+    assert data["power"] == {"min": [100, 400], "mean": [150, 400], "max": [200, 400]}
+
+
+def test_open_bucket_is_read_but_not_stored():
+    history = ServerHistory(days=1)
+    history.record(T0, {"inlet_temp": 22.0})
+    history.record(T0 + 5, {"inlet_temp": 23.0})
+    tier = history.tiers["1m"]
+    assert tier.count == 0
+    times, data = history.query(["inlet_temp"], "1m")
+    assert times == [T0 - 40]
+    assert data["inlet_temp"] == {"min": [22.0], "mean": [22.5], "max": [23.0]}
+
+
+def test_missing_values_are_left_out_of_rollups():
+    history = ServerHistory(days=1)
+    history.record(T0, {"power": 100, "target_fan_speed": "Dell Auto"})
+    history.record(T0 + 1, {"power": None, "target_fan_speed": "Dell Auto"})
+    history.record(T0 + 2, {"power": 300, "target_fan_speed": 30})
+    history.record(T0 + 60, {"power": None})
+    times, data = history.query(["power", "target_fan_speed"], "1m")
+    assert data["power"]["mean"] == [200, None]
+    assert data["target_fan_speed"] == {"min": [30, None], "mean": [30, None], "max": [30, None]}
+    raw_times, raw = history.query(["power"], "raw")
+    assert raw["power"] == [100, None, 300, None]
+
+
+def test_quarter_hour_rollup_spans_fifteen_minutes():
+    history = ServerHistory(days=1)
+    start = T0 - 580  # on a 15-minute boundary
+    for i in range(31):  # 0 .. 900 s in 30 s steps: the last one opens the second bucket
+        history.record(start + 30 * i, {"power": i})
+    times, data = history.query(["power"], "15m")
+    assert times == [start, start + 900]
+    assert data["power"]["min"] == [0, 30] and data["power"]["max"] == [29, 30]
+    assert data["power"]["mean"] == [14, 30]  # 14.5 rounds to even
+
+
+def test_gaps_do_not_create_empty_buckets():
+    history = ServerHistory(days=1)
+    history.record(T0, {"power": 100})
+    history.record(T0 + 3600, {"power": 200})
+    history.record(T0 + 3660, {"power": 300})
+    times, _ = history.query(["power"], "1m")
+    assert times == [T0 - 40, T0 + 3560, T0 + 3620]
+
+
+def test_raw_ring_wraps_oldest_first():
+    history = ServerHistory(days=1)
+    for i in range(RAW_POINTS + 5):
+        history.record(T0 + i, {"power": i})
+    times, data = history.query(["power"], "raw")
+    assert len(times) == RAW_POINTS
+    assert times[0] == T0 + 5 and data["power"][0] == 5 and data["power"][-1] == RAW_POINTS + 4
+    _, latest = history.query(["power"], "raw", points=3)
+    assert latest["power"] == [RAW_POINTS + 2, RAW_POINTS + 3, RAW_POINTS + 4]
+
+
+def test_quarter_ring_capacity_follows_days():
+    history = ServerHistory(days=1)
+    for i in range(100):
+        history.record(T0 + 900 * i, {"power": i})
+    times, data = history.query(["power"], "15m")
+    assert len(times) == 96  # 95 closed buckets plus the open one
+    assert data["power"]["mean"][0] == 4 and data["power"]["mean"][-1] == 99
+
+
+def test_sensor_added_later_reads_missing_before():
+    history = ServerHistory(days=1)
+    history.record(T0, {"power": 100})
+    history.record(T0 + 1, {"power": 110, "exhaust_temp": 35.5})
+    _, raw = history.query(None, "raw")
+    assert raw == {"exhaust_temp": [None, 35.5], "power": [100, 110]}
+
+
+def test_store_is_off_with_zero_days():
+    store = HistoryStore(days=0)
+    store.record("r720", T0, {"power": 100})
+    assert store.get("r720") is None
+    store.configure(1)
+    store.record("r720", T0, {"power": 100})
+    assert store.get("r720").sensors() == ["power"]
@@ -0,0 +1,102 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_history_db.py
+# On-disk history: flushes, rollup bucket boundaries, settling and retention.
+import pytest
+
+from app.history_db import SETTLE_SECONDS, HistoryDatabase
+
+H0 = 1_699_999_200  # on an hour boundary
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = HistoryDatabase(str(tmp_path / "history.db"))
+    database.open()
+    yield database
+    database.stop()
+
+
+def write(db, alias, rows):
+    for ts, values in rows:
+        db.enqueue(alias, ts, values)
+    db.flush()
+
+
+def test_raw_rows_round_trip(db):
+    write(db, "r720", [(H0, {"power": 150, "inlet_temp": 22.46}), (H0 + 15, {"power": 160, "inlet_temp": None})])
+    times, data = db.query("r720", None, "raw", H0, H0 + 60)
+    assert times == [H0, H0 + 15]
+    assert data == {"inlet_temp": [22.5, None], "power": [150, 160]}
+    assert db.query("unknown", None, "raw", H0, H0 + 60) is None
+
+
+def test_five_minute_bucket_is_half_open(db):
+    write(db, "r720", [(H0, {"power": 100}), (H0 + 299, {"power": 300}), (H0 + 300, {"power": 500})])
+    db.maintain(now=H0 + 600 + SETTLE_SECONDS)
+    times, data = db.query("r720", ["power"], "5m", H0, H0 + 3600)
+    assert times == [H0, H0 + 300]
+    assert data["power"] == {"min": [100, 500], "mean": [200, 500], "max": [300, 500]}
+
+
+def test_buckets_wait_to_settle(db):
+    write(db, "r720", [(H0, {"power": 100})])
+    db.maintain(now=H0 + 300 + SETTLE_SECONDS - 1)
+    assert db.query("r720", None, "5m", H0, H0 + 3600)[0] == []
+    db.maintain(now=H0 + 300 + SETTLE_SECONDS)
+    assert db.query("r720", None, "5m", H0, H0 + 3600)[0] == [H0]
+    # Each bucket is rolled up once
+    write(db, "r720", [(H0 + 10, {"power": 900})])
+    db.maintain(now=H0 + 600 + SETTLE_SECONDS)
+    assert db.query("r720", None, "5m", H0, H0 + 3600)[1]["power"]["max"] == [100]
+
+
+def test_hourly_mean_is_weighted_by_samples(db):
+    # 11 samples of 100 in the first 5 minutes, one of 400 in the second
+    write(db, "r720", [(H0 + 20 * i, {"power": 100}) for i in range(11)] + [(H0 + 300, {"power": 400})])
+    db.maintain(now=H0 + 3600 + SETTLE_SECONDS - 1)
+    assert db.query("r720", None, "1h", H0, H0 + 3600)[0] == []  # its last 5-minute bucket hasn't settled
+    db.maintain(now=H0 + 3600 + SETTLE_SECONDS)
+    times, data = db.query("r720", ["power"], "1h", H0, H0 + 7200)
+    assert times == [H0]
+    assert data["power"] == {"min": [100], "mean": [125], "max": [400]}
+
+
+def test_missing_values_and_layout_changes(db):
+    write(db, "r720", [(H0, {"power": 100}), (H0 + 60, {"power": None, "exhaust_temp": 40.0}),
+                       (H0 + 120, {"power": 200, "exhaust_temp": 42.0})])
+    db.maintain(now=H0 + 300 + SETTLE_SECONDS)
+    _, data = db.query("r720", None, "5m", H0, H0 + 300)
+    assert data["power"]["mean"] == [150]
+    assert data["exhaust_temp"] == {"min": [40.0], "mean": [41.0], "max": [42.0]}
+
+
+def test_gap_is_skipped(db):
+    write(db, "r720", [(H0, {"power": 100}), (H0 + 2 * 86400, {"power": 200})])
+    db.maintain(now=H0 + 2 * 86400 + 300 + SETTLE_SECONDS)
+    times, _ = db.query("r720", None, "5m", H0, H0 + 3 * 86400)
+    assert times == [H0, H0 + 2 * 86400]
+    assert db.query("r720", None, "1h", H0, H0 + 3 * 86400)[0] == [H0]
+
+
+def test_retention_trims_each_table(db):
+    db.retention["raw"] = 3600
+    write(db, "r720", [(H0, {"power": 100}), (H0 + 7200, {"power": 200})])
+    db.maintain(now=H0 + 7200 + 300 + SETTLE_SECONDS)
+    raw_times, _ = db.query("r720", None, "raw", H0, H0 + 86400)
+    assert raw_times == [H0 + 7200]
+    assert db.query("r720", None, "5m", H0, H0 + 86400)[0] == [H0, H0 + 7200]
+
+
+def test_reopen_keeps_rows_and_progress(tmp_path):
+    path = str(tmp_path / "history.db")
+    first = HistoryDatabase(path)
+    first.open()
+    write(first, "r720", [(H0, {"power": 100})])
+    first.maintain(now=H0 + 300 + SETTLE_SECONDS)
+    first.stop()
+    second = HistoryDatabase(path)
+    second.open()
+    write(second, "r720", [(H0 + 300, {"power": 300})])
+    second.maintain(now=H0 + 600 + SETTLE_SECONDS)
+    times, data = second.query("r720", ["power"], "5m", H0, H0 + 3600)
+    second.stop()
+    assert times == [H0, H0 + 300] and data["power"]["mean"] == [100, 300]
@@ -0,0 +1,94 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_ipmi_lan.py
+# Known-answer vectors for the native RMCP+ crypto, plus sessions against the fake BMC.
+# The RAKP vectors were computed independently with `openssl dgst -hmac` for
+# KUID "calvin", user "root", role 0x14, Rm = 00..0f and Rc = 10..1f.
+import pytest
+
+from app.ipmi_lan import (
+    IpmiLanError, IpmiSessionRejected, LanplusSession, aes_cbc_decrypt, aes_cbc_encrypt, decrypt_payload, derive_k1, derive_k2,
+    encrypt_payload, session_integrity_key,
+)
+
+# NIST SP 800-38A, F.2.1 CBC-AES128.Encrypt
+AES_KEY = bytes.fromhex("2b7e151628aed2a6abf7158809cf4f3c")
+AES_IV = bytes.fromhex("000102030405060708090a0b0c0d0e0f")
+AES_PLAIN = bytes.fromhex("6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51"
+                          "30c81c46a35ce411e5fbc1191a0a52eff69f2445df4f9b17ad2b417be66c3710")
+AES_CIPHER = bytes.fromhex("7649abac8119b246cee98e9b12e9197d5086cb9b507219ee95db113a917678b2"
+                           "73bed6b8e3c1743b7116e69e222295163ff1caa1681fac09120eca307586e1a7")
+
+RAKP_INPUTS = dict(kuid=b"calvin", rm=bytes(range(16)), rc=bytes(range(0x10, 0x20)), role=0x14, username=b"root")
+RAKP_VECTORS = {
+    "sha1": ("b886b453acedc68c2821e8c20e2d049163b27c22",
+             "749b8ee976a3fb84db6ed42bf121e090fa5293f0",
+             "2c0b193162d670f0ec685e81230b2a40ac8b93bd"),
+    "sha256": ("7e0aa720a1ecbbf1b48abc3db8ae6c4e46e8cac3c85a4ceba3de79a7ebcef27a",
+               "9c58b671c79325dbde827867d141abdf28be442443d8a01461ae55834270eb1e",
+               "8a7c3df56b0021cb2ed963a541d2b80154a3f977e9a1209152bd58fe09e25b79"),
+}
+
+
+def test_aes_cbc_matches_sp800_38a():
+    assert aes_cbc_encrypt(AES_KEY, AES_IV, AES_PLAIN) == AES_CIPHER
+    assert aes_cbc_decrypt(AES_KEY, AES_IV, AES_CIPHER) == AES_PLAIN
+
+
+@pytest.mark.parametrize("length", [0, 1, 15, 16, 31, 100])
+def test_payload_padding_round_trip(length):
+    payload = bytes(range(length))
+    encrypted = encrypt_payload(AES_KEY, payload)
+    assert len(encrypted) % 16 == 0
+    assert decrypt_payload(AES_KEY, encrypted) == payload
+
+
+@pytest.mark.parametrize("hash_name", sorted(RAKP_VECTORS))
+def test_rakp_key_derivation_vectors(hash_name):
+    sik, k1, k2 = RAKP_VECTORS[hash_name]
+    derived = session_integrity_key(hash_name=hash_name, **RAKP_INPUTS)
+    assert derived.hex() == sik
+    assert derive_k1(derived, hash_name).hex() == k1
+    assert derive_k2(derived, hash_name).hex() == k2
+
+
+@pytest.mark.parametrize("suite", [1, 2, 3, 17])
+def test_session_against_fake_bmc(fake_bmc, suite):
+    session = LanplusSession("127.0.0.1", "root", "calvin", port=fake_bmc.address[1], cipher_suite=suite)
+    try:
+        cc, data = session.raw(0x06, 0x01)  # Get Device ID
+        assert cc == 0 and len(data) >= 11
+    finally:
+        session.close()
+
+
+def test_wrong_password_is_rejected(fake_bmc):
+    session = LanplusSession("127.0.0.1", "root", "wrong", port=fake_bmc.address[1])
+    with pytest.raises(IpmiSessionRejected):
+        session.open(timeout=2)
+    session.close()
+
+
+@pytest.mark.parametrize("status", [0x01, 0x0B])
+def test_resource_statuses_are_retryable(status):
+    session = LanplusSession("127.0.0.1", "root", "calvin")
+    with pytest.raises(IpmiLanError) as error:
+        session._check_rakp_status("Open Session", status)
+    assert not isinstance(error.value, IpmiSessionRejected)
+    assert "insufficient resources" in str(error.value)
+
+
+@pytest.mark.parametrize("status", [0x09, 0x0A, 0x0D, 0x0F, 0x11, 0x12])
+def test_authentication_role_and_cipher_statuses_reject(status):
+    session = LanplusSession("127.0.0.1", "root", "calvin")
+    with pytest.raises(IpmiSessionRejected):
+        session._check_rakp_status("RAKP 2", status)
+
+
+def test_bmc_out_of_sessions_is_not_a_rejection(fake_bmc):
+    fake_bmc.max_sessions = 0
+    session = LanplusSession("127.0.0.1", "root", "calvin", port=fake_bmc.address[1])
+    with pytest.raises(IpmiLanError) as error:
+        session.open(timeout=2)
+    assert not isinstance(error.value, IpmiSessionRejected)
+    fake_bmc.max_sessions = None
+    assert session.raw(0x06, 0x01)[0] == 0  # a later attempt gets a session
+    session.close()
@@ -0,0 +1,115 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_ipmi_manager.py
+# IPMIManager transport behaviour, against the fake BMC and a scripted ipmitool on PATH.
+import pytest
+
+from app.ipmi_manager import IPMIManager
+
+IPMITOOL_SCRIPT = """#!/bin/sh
+echo "$@" >> "{calls}"
+case "$*" in
+  *"raw 0x06 0x01"*) echo " 20 81 02 65 02 bf a2 02 00 00 01" ;;
+  *"sdr elist"*)
+    echo "Inlet Temp       | 04h | ok  |  7.1 | 23 degrees C"
+    echo "Temp             | 0Eh | ok  |  3.1 | 41 degrees C"
+    echo "Fan1A            | 30h | ok  |  7.1 | 4200 RPM" ;;
+  *) exit 1 ;;
+esac
+"""
+
+
+@pytest.fixture
+def ipmitool_calls(tmp_path, install_ipmitool):
+    """A scripted ipmitool; returns the file it logs its arguments to."""
+    calls = tmp_path / "calls.log"
+    calls.touch()
+    install_ipmitool(IPMITOOL_SCRIPT.format(calls=calls))
+    return calls
+
+
+def native_manager(fake_bmc, password, tmp_path):
+    return IPMIManager("127.0.0.1", "root", password, transport="native", port=fake_bmc.address[1],
+                       sdr_cache_dir=str(tmp_path / "sdr"))
+
+
+def test_native_get_device_id(fake_bmc, ipmitool_calls, tmp_path):
+    manager = native_manager(fake_bmc, "calvin", tmp_path)
+    try:
+        assert manager.get_device_id()["manufacturer_id"] == 674
+        assert manager.native_session is not None
+        assert ipmitool_calls.read_text() == ""
+    finally:
+        manager.close()
+
+
+def test_rejected_session_falls_back_for_raw_requests(fake_bmc, ipmitool_calls, tmp_path):
+    manager = native_manager(fake_bmc, "wrong", tmp_path)
+    try:
+        device = manager.get_device_id()
+        assert device is not None and device["firmware"] == "2.65"
+        assert manager.native_session is None
+        assert "raw 0x06 0x01" in ipmitool_calls.read_text()
+    finally:
+        manager.close()
+
+
+def test_rejected_session_falls_back_for_sensor_reads(fake_bmc, ipmitool_calls, tmp_path):
+    manager = native_manager(fake_bmc, "wrong", tmp_path)
+    try:
+        snapshot = manager.read_sensor_snapshot(r"^Temp$", r"Inlet", r"Exhaust")
+        assert snapshot is not None
+        assert snapshot.cpu_temps == [41] and snapshot.inlet_temp == 23
+        assert manager.native_session is None and manager.sdr_cache is None
+        assert "sdr elist" in ipmitool_calls.read_text()
+    finally:
+        manager.close()
+
+
+def test_bmc_out_of_sessions_keeps_the_native_transport(fake_bmc, ipmitool_calls, tmp_path):
+    fake_bmc.max_sessions = 0
+    manager = native_manager(fake_bmc, "calvin", tmp_path)
+    try:
+        assert manager.retrieve_sdr_raw() is None  # this cycle fails ...
+        assert manager.native_session is not None and ipmitool_calls.read_text() == ""
+        fake_bmc.max_sessions = None
+        assert "Inlet Temp" in manager.retrieve_sdr_raw()  # ... and the next one gets a session
+    finally:
+        manager.close()
+
+
+# Replies to raw requests inside `ipmitool shell` that are too short or not hex at all
+GARBLED_SHELL_SCRIPT = """#!/bin/sh
+while IFS= read -r line; do
+  case "$line" in
+    "echo "*) echo "${line#echo }" ;;
+    exit) exit 0 ;;
+    "raw 0x06 0x01") echo "ipmitool: garbled reply" ;;
+    "raw 0x0a 0x20") echo " 51 02" ;;
+    *) echo " 00" ;;
+  esac
+done
+"""
+
+
+def test_garbled_replies_are_failed_reads(install_ipmitool, tmp_path):
+    install_ipmitool(GARBLED_SHELL_SCRIPT)
+    manager = IPMIManager("127.0.0.1", "root", "calvin", transport="shell", sdr_cache_dir=str(tmp_path / "sdr"))
+    try:
+        assert manager.get_device_id() is None  # ValueError from bytes.fromhex
+        assert manager.read_sensor_snapshot(r"^Temp$", r"Inlet", r"Exhaust") is None  # struct.error from a short reply
+    finally:
+        manager.close()
+
+
+def test_refresh_sdr_cache_reenumerates(fake_bmc, tmp_path, capsys):
+    manager = native_manager(fake_bmc, "calvin", tmp_path)
+    patterns = (r"^Temp$", r"Inlet", r"Exhaust")
+    try:
+        manager.read_sensor_snapshot(*patterns)
+        manager.read_sensor_snapshot(*patterns)
+        assert capsys.readouterr().out.count("Enumerating SDR repository") == 1
+        manager.refresh_sdr_cache()
+        assert manager.read_sensor_snapshot(*patterns).inlet_temp == 23
+        manager.read_sensor_snapshot(*patterns)
+        assert capsys.readouterr().out.count("Enumerating SDR repository") == 1
+    finally:
+        manager.close()
@@ -0,0 +1,65 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_ipmi_sdr.py
+# SDR record decoding and reading conversion, y = L[(M*x + B*10^K1) * 10^K2] (IPMI v2.0 section 36.3).
+import pytest
+
+from app.ipmi_sdr import convert_reading, decode_sdr_record, format_sensor_line
+
+
+def full_record(name, m=1, b=0, r_exp=0, b_exp=0, linearization=0, analog_format=0, unit=1, number=0x0E):
+    """A type 0x01 full sensor record with the conversion fields at their spec offsets."""
+    record = bytearray(48)
+    record[0:2] = (7).to_bytes(2, "little")
+    record[2], record[3] = 0x51, 0x01
+    record[7], record[8], record[9] = number, 3, 1
+    record[12], record[13] = 0x01, 0x01
+    record[20] = analog_format << 6
+    record[21] = unit
+    record[23] = linearization
+    record[24], record[25] = m & 0xFF, (m >> 8 & 0x03) << 6
+    record[26], record[27] = b & 0xFF, (b >> 8 & 0x03) << 6
+    record[29] = (r_exp & 0x0F) << 4 | b_exp & 0x0F
+    record[47] = 0xC0 | len(name)
+    return bytes(record) + name.encode()
+
+
+def test_decode_full_record_signed_factors():
+    sensor = decode_sdr_record(full_record("Temp", m=-3, b=-500, r_exp=-2, b_exp=-1))
+    assert (sensor["m"], sensor["b"], sensor["r_exp"], sensor["b_exp"]) == (-3, -500, -2, -1)
+    assert sensor["name"] == "Temp" and sensor["number"] == 0x0E
+
+
+def test_decode_ignores_other_record_types():
+    record = bytearray(full_record("OEM"))
+    record[3] = 0xC0
+    assert decode_sdr_record(bytes(record)) is None
+
+
+@pytest.mark.parametrize("fields, raw, expected", [
+    (dict(), 23, 23),                                   # plain unsigned degrees
+    (dict(m=120), 35, 4200),                            # fan tach, 120 RPM per count
+    (dict(m=2, r_exp=-2), 202, 4.04),                   # 20 mV per count
+    (dict(b=5, b_exp=1), 10, 60),                       # offset B * 10^K1
+    (dict(m=-3, b=-500, r_exp=-2, b_exp=-1), 10, -0.8),  # negative M and B: (-30 + -50) / 100
+    (dict(analog_format=2), 0xF6, -10),                 # two's complement
+    (dict(analog_format=1), 0xF5, -10),                 # one's complement
+    (dict(linearization=7), 4, 0.25),                   # 1/x
+    (dict(linearization=10), 16, 4),                    # sqrt
+    (dict(linearization=8), 12, 144),                   # x^2
+])
+def test_convert_reading(fields, raw, expected):
+    sensor = decode_sdr_record(full_record("S", **fields))
+    assert convert_reading(sensor, raw) == pytest.approx(expected)
+
+
+def test_convert_reading_without_an_analog_value():
+    assert convert_reading(decode_sdr_record(full_record("S", analog_format=3)), 10) is None
+    assert convert_reading(decode_sdr_record(full_record("S", linearization=7)), 0) is None  # 1/0
+    assert convert_reading({"analog_format": 3}, 10) is None
+
+
+def test_format_matches_ipmitool_layout():
+    sensor = decode_sdr_record(full_record("Inlet Temp", number=0x04))
+    line = format_sensor_line(sensor, {"available": True, "value": 23, "status": "ok", "states": 0})
+    assert line == "Inlet Temp       | 04h | ok  |  3.1 | 23 degrees C"
+    missing = format_sensor_line(sensor, {"available": False, "value": None, "status": "ns", "states": 0})
+    assert missing.endswith("| ns  |  3.1 | No Reading")
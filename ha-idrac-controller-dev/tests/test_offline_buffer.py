@@ -0,0 +1,72 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_offline_buffer.py
+# OfflineBuffer coalescing, eviction and replay order.
+from app.offline_buffer import OfflineBuffer
+
+
+def topics(messages):
+    return [message[0] for message in messages]
+
+
+def test_replays_in_order_of_last_update():
+    buffer = OfflineBuffer()
+    buffer.put("a", "1")
+    buffer.put("b", "1", retain=True, qos=1)
+    buffer.put("c", "1")
+    buffer.put("a", "2")  # a moves behind c
+    assert buffer.drain() == [("b", "1", True, 1), ("c", "1", False, 0), ("a", "2", False, 0)]
+    assert len(buffer) == 0 and buffer.bytes == 0
+    assert buffer.stats()["replaced"] == 1 and buffer.stats()["replayed"] == 3
+
+
+def test_keeps_only_the_newest_payload_per_topic():
+    buffer = OfflineBuffer()
+    for value in range(10):
+        buffer.put("state", str(value))
+    assert buffer.drain() == [("state", "9", False, 0)]
+    assert buffer.stats()["buffered"] == 10
+
+
+def test_evicts_the_longest_unchanged_topics_first():
+    buffer = OfflineBuffer(max_bytes=30)  # room for three 10-byte messages
+    for topic in ("t1", "t2", "t3"):
+        buffer.put(topic, "12345678")
+    buffer.put("t1", "abcdefgh")  # refreshed, so t2 is now the oldest
+    buffer.put("t4", "12345678")
+    assert topics(buffer.drain()) == ["t3", "t1", "t4"]
+    assert buffer.dropped == 1
+
+
+def test_eviction_accounts_for_sizes():
+    buffer = OfflineBuffer(max_bytes=25)
+    buffer.put("small", "x")  # 6 bytes
+    buffer.put("big", "y" * 17)  # 20 bytes, 26 in total
+    assert topics(buffer.drain()) == ["big"]
+    buffer.put("a", "b")
+    assert buffer.bytes == 2
+
+
+def test_warns_once_per_outage():
+    logged = []
+    buffer = OfflineBuffer(max_bytes=10, log=lambda level, message: logged.append(level))
+    for i in range(5):
+        buffer.put(f"t{i}", "123456789")
+    assert logged == ["warning"]
+    buffer.drain()
+    buffer.put("x", "123456789")
+    buffer.put("y", "123456789")
+    assert logged == ["warning", "warning"]
+
+
+def test_spill_and_reload_keep_order(tmp_path):
+    path = str(tmp_path / "offline.json")
+    buffer = OfflineBuffer(spill_path=path)
+    buffer.put("a", "1", retain=True)
+    buffer.put("b", "2", qos=1)
+    buffer.spill()
+    restored = OfflineBuffer(spill_path=path)
+    restored.load_spilled()
+    assert restored.drain() == [("a", "1", True, 0), ("b", "2", False, 1)]
+    # The spill file is consumed
+    again = OfflineBuffer(spill_path=path)
+    again.load_spilled()
+    assert len(again) == 0
@@ -0,0 +1,93 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_publish_filter.py
+# PublishFilter deadbands and heartbeats, on a manual clock.
+import pytest
+
+from app.publish_filter import DEFAULT_DEADBANDS, PublishFilter, parse_deadband
+
+CLASSES = {"cpu": "temperature", "fan": "fan_rpm", "power": "power", "poll_interval": "interval", "target": None}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("1", (1.0, 0.0)), ("1.5", (1.5, 0.0)), ("5%", (0.0, 0.05)), ("", (0.0, 0.0)),
+    (None, (0.0, 0.0)), ("bogus", (0.0, 0.0)), ("-3", (0.0, 0.0)),
+])
+def test_parse_deadband(spec, expected):
+    assert parse_deadband(spec) == expected
+
+
+def test_absolute_deadband_is_measured_from_the_last_value_sent(clock):
+    f = PublishFilter({"temperature": "1"}, clock=clock)
+    assert f.select({"cpu": 40}, CLASSES) == {"cpu": 40}
+    assert f.select({"cpu": 41}, CLASSES) == {}  # on the edge of the band, held back
+    assert f.select({"cpu": 40.5}, CLASSES) == {}
+    assert f.select({"cpu": 41.5}, CLASSES) == {"cpu": 41.5}  # drift adds up against the value sent
+    assert f.stats()["values_suppressed"] == 2
+
+
+def test_relative_deadband(clock):
+    f = PublishFilter({"fan_rpm": "5%"}, clock=clock)
+    f.select({"fan": 4000}, CLASSES)
+    assert f.select({"fan": 4200}, CLASSES) == {}
+    assert f.select({"fan": 4201}, CLASSES) == {"fan": 4201}
+
+
+def test_values_without_a_rule_go_out_on_any_change(clock):
+    f = PublishFilter(DEFAULT_DEADBANDS, clock=clock)
+    f.select({"target": 20, "state": "ok"}, CLASSES)
+    assert f.select({"target": 20, "state": "ok"}, CLASSES) == {}
+    assert f.select({"target": 21, "state": "failed"}, CLASSES) == {"target": 21, "state": "failed"}
+
+
+def test_heartbeat_resends_a_value_inside_its_band(clock):
+    f = PublishFilter({"temperature": "1"}, heartbeat_seconds=300, clock=clock)
+    f.select({"cpu": 40}, CLASSES)
+    clock.now = 299
+    assert f.select({"cpu": 40}, CLASSES) == {}
+    clock.now = 300
+    assert f.select({"cpu": 40}, CLASSES) == {"cpu": 40}
+    assert f.heartbeats == 1
+
+
+def test_heartbeat_zero_sends_everything(clock):
+    f = PublishFilter({"temperature": "1"}, heartbeat_seconds=0, clock=clock)
+    f.select({"cpu": 40}, CLASSES)
+    assert f.select({"cpu": 40}, CLASSES) == {"cpu": 40}
+
+
+def test_reset_sends_everything_again(clock):
+    f = PublishFilter({"temperature": "1"}, clock=clock)
+    f.select({"cpu": 40}, CLASSES)
+    f.reset()
+    assert f.select({"cpu": 40}, CLASSES) == {"cpu": 40}
+
+
+def test_document_suppressed_until_one_value_crosses(clock):
+    f = PublishFilter(DEFAULT_DEADBANDS, clock=clock)
+    values = {"cpu": 40, "fan": 4000, "power": 150}
+    assert f.document(values, CLASSES) == values
+    assert f.document({"cpu": 40.6, "fan": 4050, "power": 153}, CLASSES) is None
+    # Only the power moved past its band; the others keep the numbers last sent
+    assert f.document({"cpu": 40.6, "fan": 4050, "power": 156}, CLASSES) == {"cpu": 40, "fan": 4000, "power": 156}
+
+
+def test_adaptive_poll_interval_does_not_defeat_combined_suppression(clock):
+    f = PublishFilter(DEFAULT_DEADBANDS, clock=clock)
+    f.document({"cpu": 40, "poll_interval": 30.0}, CLASSES)
+    for interval in (28.4, 31.7, 26.0, 33.9):
+        clock.now += interval
+        assert f.document({"cpu": 40, "poll_interval": interval}, CLASSES) is None
+    # Stretched to the maximum after a quiet spell: a real change
+    assert f.document({"cpu": 40, "poll_interval": 45.0}, CLASSES) == {"cpu": 40, "poll_interval": 45.0}
@@ -0,0 +1,100 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_scheduler.py
+# AdaptiveInterval (shrink, stretch, reset) and the per-server poll phases.
+import pytest
+
+from app.scheduler import AdaptiveInterval, PhaseClock, assign_phases, default_interval_bounds, phase_evenness
+
+
+def feed(scheduler, temps, start=0, step=60):
+    return [scheduler.update(temp, start + i * step) for i, temp in enumerate(temps)]
+
+
+def test_default_bounds_never_stretch():
+    assert default_interval_bounds(60) == (20, 60)
+    assert default_interval_bounds(9) == (5, 9)
+    scheduler = AdaptiveInterval(60)
+    assert feed(scheduler, [35, 35, 35, 35, 35]) == [60] * 5
+
+
+def test_flat_readings_stretch_up_to_an_opted_in_maximum():
+    scheduler = AdaptiveInterval(60, max_interval=240)
+    assert feed(scheduler, [35, 35.5, 35, 35.2, 35, 35]) == [60, 90, 135, 202.5, 240, 240]
+
+
+def test_a_real_change_ends_the_stretch():
+    scheduler = AdaptiveInterval(60, max_interval=240)
+    feed(scheduler, [35, 35, 35])
+    assert scheduler.update(37, 180) == 60
+
+
+def test_interval_shrinks_with_temperature():
+    scheduler = AdaptiveInterval(60, low_threshold=45, critical_threshold=65)
+    assert scheduler.update(44, 0) == 60
+    scheduler.reset()
+    assert scheduler.update(55, 0) == 40  # half way to critical
+    scheduler.reset()
+    assert scheduler.update(70, 0) == 20  # at or past critical: the minimum
+
+
+def test_a_rising_temperature_shrinks_before_the_threshold():
+    scheduler = AdaptiveInterval(60, low_threshold=45, critical_threshold=65)
+    scheduler.update(40, 0)
+    # 4 °C in 60 s, smoothed to 2 °C per minute: heading for 46 °C by the next poll
+    assert scheduler.update(44, 60) == pytest.approx(58)
+    assert scheduler.rate == pytest.approx(2 / 60)
+
+
+def test_missing_reading_resets():
+    scheduler = AdaptiveInterval(60, max_interval=240)
+    feed(scheduler, [35, 35, 35])
+    assert scheduler.update(None, 180) == 60
+    assert scheduler.rate == 0 and scheduler._last_temp is None
+    assert scheduler.update(35, 240) == 60  # no previous reading: not "flat" yet
+
+
+def test_explicit_bounds_are_respected():
+    scheduler = AdaptiveInterval(60, min_interval=30, max_interval=45)
+    assert scheduler.base_interval == 45
+    assert scheduler.update(80, 0) == 30
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize("now", [1000.0, 1014.0, 1034.9, 1035.0, 1066.0])
+def test_phase_clock_delay_lands_on_the_phase(now):
+    clock = PhaseClock(0.25, clock=Clock(now))
+    delay = clock.delay(60)
+    assert (now + delay) % 60 == pytest.approx(15)
+    assert 30 <= delay < 90
+
+
+def test_phase_clock_delay_minimum_and_jitter():
+    assert PhaseClock(0.0, clock=Clock(0.0)).delay(0.2, minimum=0.5) == 0.5
+    clock = PhaseClock(0.5, jitter_seconds=2, clock=Clock(1000.0))
+    for _ in range(20):
+        assert 50 <= clock.delay(60) <= 52
+
+
+def test_phase_clock_first_delay_and_observed_phase():
+    time = Clock(1000.0)
+    clock = PhaseClock(0.25, clock=time)
+    assert clock.first_delay(60) == pytest.approx(35)
+    assert clock.observed_phase(60) is None
+    time.now = 1035.0
+    clock.mark_start()
+    assert clock.observed_phase(60) == pytest.approx(0.25)
+
+
+def test_phases_are_even_and_stable():
+    aliases = [f"r{i}" for i in range(10)]
+    phases = assign_phases(aliases)
+    assert phase_evenness(phases.values()) == pytest.approx(1.0)
+    grown = assign_phases(aliases + ["new"])
+    ranks = sorted(aliases, key=phases.get)
+    assert sorted(aliases, key=grown.get) == ranks  # nobody is reshuffled
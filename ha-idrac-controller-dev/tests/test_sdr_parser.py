@@ -0,0 +1,38 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_sdr_parser.py
+# SdrParser over `ipmitool sdr elist` output as an R720 prints it.
+from app.sdr_parser import SdrParser
+
+SDR_ELIST = """\
+Inlet Temp       | 04h | ok  |  7.1 | 23 degrees C
+Exhaust Temp     | 01h | ok  |  7.1 | 38 degrees C
+Temp             | 0Eh | ok  |  3.1 | 42 degrees C
+Temp             | 0Fh | ok  |  3.2 | 45 degrees C
+Fan1A            | 30h | ok  |  7.1 | 3600 RPM
+Fan1B            | 31h | ns  |  7.1 | No Reading
+Current 1        | 6Ah | ok  | 10.1 | 0.60 Amps
+Voltage 1        | 6Ch | ok  | 10.1 | 230 Volts
+Pwr Consumption  | 77h | ok  |  7.1 | 154 Watts
+PS1 Status       | 62h | ok  | 10.1 | Presence detected
+"""
+
+
+def test_parses_every_section():
+    snapshot = SdrParser(r"^Temp$", r"Inlet Temp", r"Exhaust Temp").parse(SDR_ELIST)
+    assert snapshot.cpu_temps == [42, 45]
+    assert (snapshot.inlet_temp, snapshot.exhaust_temp) == (23, 38)
+    assert snapshot.fans == [{"name": "Fan1A", "rpm": 3600}]
+    assert snapshot.power == 154
+    assert snapshot.voltages == [{"name": "Voltage 1", "volts": 230.0}]
+    assert snapshot.psus == [{"name": "PS1 Status", "status": "ok", "state": "Presence detected"}]
+
+
+def test_inlet_and_exhaust_without_a_cpu_pattern():
+    snapshot = SdrParser(None, r"Inlet Temp", r"Exhaust Temp").parse(SDR_ELIST)
+    assert snapshot.cpu_temps == []
+    assert (snapshot.inlet_temp, snapshot.exhaust_temp) == (23, 38)
+
+
+def test_inlet_wins_over_cpu_pattern():
+    snapshot = SdrParser(r"Temp", r"Inlet", None).parse(SDR_ELIST)
+    assert snapshot.inlet_temp == 23
+    assert snapshot.cpu_temps == [38, 42, 45]
@@ -0,0 +1,135 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_server_worker.py
+# ServerWorker behaviour that doesn't need a broker or a BMC. Workers are built
+# without __init__, with only the collaborators each test uses.
+import struct
+
+import pytest
+
+pytest.importorskip("paho.mqtt")
+from app import main  # noqa: E402
+from app.fan_actuator import MODE_MANUAL  # noqa: E402
+from app.fru_cache import FruCache, bmc_identity  # noqa: E402
+
+DEVICE = {"device_id": 0x20, "firmware": "2.65", "manufacturer_id": 674, "product_id": 0x100}
+R720 = {"manufacturer": "DELL", "model": "PowerEdge R720"}
+R730 = {"manufacturer": "DELL", "model": "PowerEdge R730"}
+
+
+class FakeIpmi:
+    connection_generation = ("native", 1)
+
+    def __init__(self, device=None, model=None):
+        self.auto_requests = 0
+        self.device = device
+        self.model = model
+        self.fru_reads = 0
+        self.sdr_refreshes = 0
+
+    def apply_dell_fan_control_profile(self):
+        self.auto_requests += 1
+        return ""
+
+    def get_device_id(self):
+        return self.device
+
+    def get_server_model_info(self):
+        self.fru_reads += 1
+        return self.model
+
+    def refresh_sdr_cache(self):
+        self.sdr_refreshes += 1
+
+
+class FakeMqtt:
+    def __init__(self):
+        self.device_info = None
+
+    def set_device_info(self, **info):
+        self.device_info = info
+
+
+class FakeFans:
+    def __init__(self):
+        self.mode = MODE_MANUAL
+
+    def invalidate(self):
+        self.mode = None
+
+
+def bare_worker(**attributes):
+    worker = main.ServerWorker.__new__(main.ServerWorker)
+    worker.alias = "r720"
+    worker.running = True
+    worker.__dict__.update(attributes)
+    return worker
+
+
+def test_unexpected_cycle_error_restores_auto_fans_and_keeps_polling(monkeypatch, capsys):
+    sleeps = []
+    monkeypatch.setattr(main.time, "sleep", sleeps.append)
+    worker = bare_worker(ipmi=FakeIpmi(), fans=FakeFans())
+    cycles = iter([struct.error("unpack_from requires a buffer of at least 10 bytes"), 30])
+
+    def run_cycle():
+        outcome = next(cycles)
+        if isinstance(outcome, Exception):
+            raise outcome
+        worker.running = False
+        return outcome
+
+    worker.initialize = lambda: True
+    worker.first_poll_delay = lambda: 0
+    worker.run_cycle = run_cycle
+    worker.cleanup = lambda: None
+    worker.run()
+    assert worker.ipmi.auto_requests == 1 and worker.fans.mode is None
+    assert sleeps == [0, main.CYCLE_ERROR_RETRY_SECONDS, 30]
+    assert "Cycle failed unexpectedly (error: unpack_from" in capsys.readouterr().out
+
+
+def model_check_worker(tmp_path, device, model, cached=None):
+    fru_cache = FruCache(str(tmp_path), "10.0.0.5")
+    if cached:
+        fru_cache.store(*cached)
+        fru_cache = FruCache(str(tmp_path), "10.0.0.5")
+    worker = bare_worker(ipmi=FakeIpmi(device, model), mqtt=FakeMqtt(), fru_cache=fru_cache, config={"idrac_ip": "10.0.0.5"},
+                         server_info={"manufacturer": "Unknown", "model": "Unknown"}, discovered_sensors={"power": "t"},
+                         _published_breaker={}, _model_check_pending=True, _sdr_refreshed_for=None)
+    worker.server_info.update(fru_cache.load() or {})
+    return worker
+
+
+def test_cached_identity_match_skips_the_fru(tmp_path):
+    worker = model_check_worker(tmp_path, DEVICE, R720, cached=(bmc_identity(DEVICE), R720))
+    worker._check_model_info()
+    assert worker.ipmi.fru_reads == 0 and worker.ipmi.sdr_refreshes == 0
+    assert not worker._model_check_pending and worker.server_info["model"] == "PowerEdge R720"
+    assert worker.discovered_sensors  # nothing to re-announce
+
+
+def test_identity_mismatch_rereads_fru_and_sdr(tmp_path):
+    swapped = {**DEVICE, "product_id": 0x200}
+    worker = model_check_worker(tmp_path, swapped, R730, cached=(bmc_identity(DEVICE), R720))
+    worker._check_model_info()
+    assert worker.ipmi.fru_reads == 1 and worker.ipmi.sdr_refreshes == 1
+    assert worker.server_info["model"] == "PowerEdge R730" and worker.mqtt.device_info["model"] == "PowerEdge R730"
+    assert worker.discovered_sensors == {} and worker._published_breaker is None
+    assert FruCache(str(tmp_path), "10.0.0.5").load() == R730
+    assert not worker._model_check_pending
+
+
+def test_failed_fru_read_retries_without_rereading_the_sdr(tmp_path):
+    swapped = {**DEVICE, "firmware": "2.70"}
+    worker = model_check_worker(tmp_path, swapped, None, cached=(bmc_identity(DEVICE), R720))
+    worker._check_model_info()
+    worker._check_model_info()
+    assert worker.ipmi.fru_reads == 2 and worker.ipmi.sdr_refreshes == 1
+    assert worker._model_check_pending
+
+
+def test_corrupt_cache_reads_the_fru(tmp_path):
+    (tmp_path / "10.0.0.5.json").write_text("{not json")
+    worker = model_check_worker(tmp_path, DEVICE, R720)
+    worker._check_model_info()
+    assert worker.ipmi.fru_reads == 1 and worker.ipmi.sdr_refreshes == 0  # nothing cached to compare against
+    assert FruCache(str(tmp_path), "10.0.0.5").load() == R720
@@ -0,0 +1,69 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_status_store.py
+# StatusStore versioning, change queries and throttled persistence.
+import json
+
+import pytest
+
+from app import status_store as status_store_module
+from app.status_store import StatusStore
+
+
+@pytest.fixture
+def store():
+    store = StatusStore()
+    store.set("r720", {"alias": "r720", "cpu_temp": 50})
+    store.set("r730", {"alias": "r730", "cpu_temp": 45})
+    return store
+
+
+def test_every_change_bumps_the_version(store):
+    assert store.version == 2
+    store.update("r720", {"cpu_temp": 51})
+    assert store.get("r720") == (3, {"alias": "r720", "cpu_temp": 51})
+    assert store.get("r730")[0] == 2
+    assert store.get("missing") == (None, None)
+
+
+def test_update_starts_from_the_default(store):
+    store.update("r640", {"status": "offline"}, default={"alias": "r640", "cpu_temp": None})
+    assert store.get("r640")[1] == {"alias": "r640", "cpu_temp": None, "status": "offline"}
+
+
+def test_changed_since_returns_only_later_entries(store):
+    store.update("r730", {"cpu_temp": 46})
+    assert store.changed_since(0) == (3, [{"alias": "r720", "cpu_temp": 50}, {"alias": "r730", "cpu_temp": 46}])
+    assert store.changed_since(2) == (3, [{"alias": "r730", "cpu_temp": 46}])
+    assert store.changed_since(3) == (3, [])
+
+
+def test_snapshot_is_not_changed_by_later_updates(store):
+    _, entries = store.snapshot()
+    store.update("r720", {"cpu_temp": 80})
+    assert entries[0]["cpu_temp"] == 50
+
+
+def test_wait_for_change_returns_at_once_if_already_moved(store):
+    assert store.wait_for_change(1, timeout=5) == 2
+    assert store.wait_for_change(2, timeout=0.01) == 2
+
+
+def test_persist_writes_only_changes_and_at_most_every_min_interval(store, tmp_path, monkeypatch):
+    path = str(tmp_path / "current_status.json")
+    clock = [100.0]
+    monkeypatch.setattr(status_store_module.time, "monotonic", lambda: clock[0])
+    assert store.persist(path, min_interval=10)
+    with open(path) as f:
+        assert [e["alias"] for e in json.load(f)] == ["r720", "r730"]
+    clock[0] += 20
+    assert not store.persist(path, min_interval=10)  # unchanged
+    store.update("r720", {"cpu_temp": 60})
+    assert store.persist(path, min_interval=10)
+    store.update("r720", {"cpu_temp": 61})
+    clock[0] += 5
+    assert not store.persist(path, min_interval=10)  # too soon after the last write
+    clock[0] += 5
+    assert store.persist(path, min_interval=10)
+    store.update("r720", {"cpu_temp": 62})
+    assert store.persist(path, min_interval=10, force=True)
+    with open(path) as f:
+        assert json.load(f)[0]["cpu_temp"] == 62
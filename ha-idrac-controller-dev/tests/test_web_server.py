@@ -0,0 +1,106 @@
+# HA-iDRAC/ha-idrac-controller-dev/tests/test_web_server.py
+# The JSON API's ETag, 304 and ?since= handling, the event backlog and response caching/compression, through Flask's test client.
+import gzip
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+
+from app import web_server  # noqa: E402
+from app.status_store import StatusStore  # noqa: E402
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = StatusStore()
+    store.set("r730", {"alias": "r730", "cpu_temp": 45})
+    store.set("r720", {"alias": "r720", "cpu_temp": 50})
+    monkeypatch.setattr(web_server, "status_store", store)
+    return store
+
+
+@pytest.fixture
+def client():
+    return web_server.app.test_client()
+
+
+def test_servers_carry_the_version_as_etag(store, client):
+    response = client.get('/api/servers')
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'"{store.epoch}-2"'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert [s["alias"] for s in response.get_json()["servers"]] == ["r720", "r730"]
+
+
+def test_matching_if_none_match_is_not_modified(store, client):
+    etag = client.get('/api/servers').headers['ETag']
+    response = client.get('/api/servers', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b""
+    store.update("r720", {"cpu_temp": 51})
+    assert client.get('/api/servers', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_since_returns_only_changed_servers(store, client):
+    version = client.get('/api/servers').get_json()["version"]
+    store.update("r730", {"cpu_temp": 46})
+    data = client.get(f'/api/servers?since={version}&fields=cpu_temp').get_json()
+    assert data == {"version": f"{store.epoch}-3", "servers": [{"alias": "r730", "cpu_temp": 46}]}
+
+
+def test_since_from_another_run_returns_everything(store, client):
+    data = client.get('/api/servers?since=deadbeef-2').get_json()
+    assert len(data["servers"]) == 2
+
+
+def test_single_server(store, client):
+    response = client.get('/api/servers/r720')
+    assert response.get_json()["server"] == {"alias": "r720", "cpu_temp": 50}
+    assert response.headers['ETag'] == f'"{store.epoch}-2"'
+    assert client.get('/api/servers/r720', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get('/api/servers/missing').status_code == 404
+
+
+def test_event_backlog_resumes_after_last_event_id(store, client, monkeypatch):
+    monkeypatch.setattr(web_server, "event_hub", web_server.EventHub(store, lambda entry: entry["alias"]))
+    store.update("r730", {"cpu_temp": 46})
+    response = client.get('/api/events', headers={'Last-Event-ID': f"{store.epoch}-2"}, buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    body = iter(response.response)
+    assert next(body) == b"retry: 5000\n\n"
+    assert next(body).startswith(f"id: {store.epoch}-3\n".encode())
+    response.close()
+
+
+@pytest.mark.parametrize("name", ["style.css", "dashboard.js"])
+def test_static_assets_are_gzipped_and_cached(client, name):
+    for _ in range(2):  # compressed on the first request, served from memory on the second
+        response = client.get(f'/static/{name}?v={web_server.ASSET_VERSION}', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert response.headers['Cache-Control'] == f"public, max-age={web_server.STATIC_MAX_AGE_SECONDS}, immutable"
+        assert response.headers['ETag'].startswith('W/')
+        with open(f"{web_server.app.static_folder}/{name}", 'rb') as f:
+            assert gzip.decompress(response.data) == f.read()
+        response.close()
+
+
+def test_static_asset_without_gzip_or_version(client):
+    response = client.get('/static/style.css')
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+    response.close()
+
+
+def test_api_is_gzipped_but_not_cached(store, client):
+    for alias in ("r620", "r630", "r640", "r650", "r660", "r670", "r680", "r690", "r710", "r740"):
+        store.set(alias, {"alias": alias, "cpu_temp": 50, "model": "PowerEdge"})
+    response = client.get('/api/servers', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert len(json.loads(gzip.decompress(response.data))["servers"]) == 12
+    etag = response.headers['ETag']
+    assert client.get('/api/servers', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,300 @@
+# HA-iDRAC/ha-idrac-controller-dev/tools/fake_bmc.py
+# A local stand-in for an iDRAC's IPMI-over-LAN (RMCP+) endpoint so the native
+# transport can be exercised without hardware.
+#
+#   python3 -m tools.fake_bmc --port 6230 --user root --password calvin
+#
+# then point a server entry at 127.0.0.1 with "ipmi_port": 6230 and
+# "ipmi_transport": "native".
+import argparse
+import hmac
+import os
+import socket
+import struct
+import time
+
+from app.ipmi_lan import (
+    CIPHER_SUITES, ICV_LENGTHS, PAYLOAD_IPMI, PAYLOAD_OPEN_SESSION_REQUEST, PAYLOAD_OPEN_SESSION_RESPONSE,
+    PAYLOAD_RAKP1, PAYLOAD_RAKP2, PAYLOAD_RAKP3, PAYLOAD_RAKP4, RMCP_HEADER, IpmiLanError,
+    build_v2_packet, derive_k1, derive_k2, ipmi_checksum, parse_v2_packet, session_integrity_key,
+)
+
+DELL_MANUFACTURER_ID = 674
+
+
+def _sensor(number, name, sensor_type, unit, entity, value, m=1, b=0, r_exp=0, b_exp=0):
+    return {"number": number, "name": name, "sensor_type": sensor_type, "unit": unit, "entity": entity,
+            "value": value, "m": m, "b": b, "r_exp": r_exp, "b_exp": b_exp}
+
+
+def default_sensors(cpus=2, fans=6):
+    sensors = [
+        _sensor(0x01, "Exhaust Temp", 0x01, 1, (7, 1), 38),
+        _sensor(0x04, "Inlet Temp", 0x01, 1, (7, 1), 23),
+    ]
+    sensors += [_sensor(0x0E + i, "Temp", 0x01, 1, (3, i + 1), 42 + 3 * i) for i in range(cpus)]
+    sensors += [_sensor(0x30 + i, f"Fan{i + 1}", 0x04, 18, (7, 1), 3600, m=120) for i in range(fans)]
+    sensors += [
+        _sensor(0x6A, "Current 1", 0x03, 5, (10, 1), 0.6, m=2, r_exp=-1),
+        _sensor(0x6C, "Voltage 1", 0x02, 4, (10, 1), 230),
+        _sensor(0x77, "Pwr Consumption", 0x03, 6, (7, 1), 154, m=14),
+    ]
+    sensors += [{"number": 0x62 + i, "name": f"PS{i + 1} Status", "sensor_type": 0x08, "entity": (10, i + 1),
+                 "states": 0x0001} for i in range(2)]
+    return sensors
+
+
+class SimulatedBMC:
+    """Answers IPMI requests (netfn, cmd, data) the way a Dell iDRAC does for the commands the add-on uses."""
+
+    def __init__(self, model="PowerEdge R720", firmware=(2, 0x65), sensors=None):
+        self.model = model
+        self.firmware = firmware
+        self.sensors = sensors if sensors is not None else default_sensors()
+        self.fan_mode = "auto"
+        self.fan_speed = None
+        self.sdr_addition_timestamp = int(time.time())
+        self.reservation = 1
+        self._records = [self._build_record(i + 1, s) for i, s in enumerate(self.sensors)]
+        self._fru = self._build_fru()
+
+    # --- Encoding helpers ---
+    def _build_record(self, record_id, sensor):
+        name = sensor["name"].encode()
+        entity_id, instance = sensor["entity"]
+        if "unit" not in sensor:  # discrete, compact record
+            body = bytes([0x20, 0x00, sensor["number"], entity_id, instance, 0x7F, 0x68, sensor["sensor_type"], 0x6F,
+                          0x7F, 0x00, 0x7F, 0x00, 0x7F, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+                          0x00, 0x00, 0xC0 | len(name)]) + name
+            return struct.pack("<HBBB", record_id, 0x51, 0x02, len(body)) + body
+        m = sensor["m"] & 0x3FF
+        b = sensor["b"] & 0x3FF
+        body = bytes([0x20, 0x00, sensor["number"], entity_id, instance, 0x7F, 0x68, sensor["sensor_type"], 0x01,
+                      0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, sensor["unit"], 0x00, 0x00,
+                      m & 0xFF, (m >> 8) << 6, b & 0xFF, (b >> 8) << 6, 0x00,
+                      ((sensor["r_exp"] & 0x0F) << 4) | (sensor["b_exp"] & 0x0F),
+                      0x00, 0x00, 0x00, 0x00, 0xFF, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+                      0x00, 0xC0 | len(name)]) + name
+        return struct.pack("<HBBB", record_id, 0x51, 0x01, len(body)) + body
+
+    def _build_fru(self):
+        def fields(values):
+            out = b"".join(bytes([0xC0 | len(v)]) + v.encode() for v in values) + b"\xC1"
+            return out
+
+        def area(prefix, values):
+            data = prefix + fields(values)
+            data += b"\x00" * ((8 - (len(data) + 1) % 8) % 8)
+            data = bytes([data[0], (len(data) + 1) // 8]) + data[2:]
+            return data + bytes([ipmi_checksum(data)])
+
+        board = area(b"\x01\x00\x19\x00\x00\x00", ["DELL", self.model, "CN7475138C0123", "0X3D66A03"])
+        product = area(b"\x01\x00\x19", ["DELL", self.model, "", "", "ABC1234", ""])
+        header = bytes([0x01, 0x00, 0x00, 0x01, 1 + len(board) // 8, 0x00, 0x00])
+        return header + bytes([ipmi_checksum(header)]) + board + product
+
+    def _raw_reading(self, sensor):
+        value = sensor["value"] / 10 ** sensor["r_exp"] - sensor["b"] * 10 ** sensor["b_exp"]
+        return max(0, min(255, int(round(value / sensor["m"]))))
+
+    # --- Command handling ---
+    def handle(self, netfn, cmd, data, lun=0):
+        """Returns (completion_code, response_data)."""
+        if netfn == 0x06 and cmd == 0x01:
+            return 0, bytes([0x20, 0x01, self.firmware[0], self.firmware[1], 0x02, 0xBF]) + \
+                struct.pack("<I", DELL_MANUFACTURER_ID)[:3] + struct.pack("<H", 0x0100) + b"\x00" * 4
+        if netfn == 0x06 and cmd == 0x38:
+            return 0, bytes([0x01, 0x80, 0x14, 0x02, 0x00, 0x00, 0x00, 0x00])
+        if netfn == 0x06 and cmd == 0x3B:
+            return 0, bytes([data[0] & 0x0F if data else 0x04])
+        if netfn == 0x06 and cmd == 0x3C:
+            return 0, b""
+        if netfn == 0x0A and cmd == 0x20:
+            return 0, bytes([0x51]) + struct.pack("<HHII", len(self._records), 0xFFFF, self.sdr_addition_timestamp, 0) + b"\x02"
+        if netfn == 0x0A and cmd == 0x22:
+            self.reservation = (self.reservation % 0xFFFF) + 1
+            return 0, struct.pack("<H", self.reservation)
+        if netfn == 0x0A and cmd == 0x23:
+            return self._get_sdr(data)
+        if netfn == 0x04 and cmd == 0x2D:
+            return self._get_sensor_reading(data[0])
+        if netfn == 0x0A and cmd == 0x10:
+            return 0, struct.pack("<HB", len(self._fru), 0)
+        if netfn == 0x0A and cmd == 0x11:
+            offset, count = struct.unpack_from("<HB", data, 1)
+            chunk = self._fru[offset:offset + count]
+            return 0, bytes([len(chunk)]) + chunk
+        if netfn == 0x30 and cmd == 0x30:
+            return self._dell_fan_command(data)
+        return 0xC1, b""
+
+    def _get_sdr(self, data):
+        reservation, record_id, offset, count = struct.unpack_from("<HHBB", data)
+        if offset and reservation != self.reservation:
+            return 0xC5, b""
+        index = max(0, record_id - 1)
+        if index >= len(self._records):
+            return 0xCB, b""
+        next_id = record_id + 1 if record_id else 2
+        if index + 1 >= len(self._records):
+            next_id = 0xFFFF
+        record = self._records[index]
+        return 0, struct.pack("<H", next_id) + record[offset:offset + (len(record) if count == 0xFF else count)]
+
+    def _get_sensor_reading(self, number):
+        sensor = next((s for s in self.sensors if s["number"] == number), None)
+        if sensor is None:
+            return 0xCB, b""
+        if "unit" not in sensor:
+            return 0, bytes([0x00, 0x40, sensor["states"] & 0xFF, 0x80 | (sensor["states"] >> 8)])
+        return 0, bytes([self._raw_reading(sensor), 0x40, 0x00, 0x80])
+
+    def _dell_fan_command(self, data):
+        if data[:2] == b"\x01\x00":
+            self.fan_mode = "manual"
+        elif data[:2] == b"\x01\x01":
+            self.fan_mode, self.fan_speed = "auto", None
+        elif data[:2] == b"\x02\xff" and len(data) > 2:
+            self.fan_speed = data[2]
+        else:
+            return 0xC9, b""
+        return 0, b""
+
+
+class LanplusBMCServer:
+    """UDP endpoint speaking the BMC side of RMCP+ (cipher suites 1, 2, 3 and 17)."""
+
+    def __init__(self, bmc, host="127.0.0.1", port=6230, users=None, max_sessions=None):
+        self.bmc = bmc
+        self.users = users or {"root": "calvin"}
+        self.max_sessions = max_sessions
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.address = self.sock.getsockname()
+        self.sessions = {}
+        self.running = True
+
+    def serve_forever(self):
+        while self.running:
+            try:
+                self.sock.settimeout(0.5)
+                packet, peer = self.sock.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                reply = self.handle_packet(packet)
+            except (IpmiLanError, IndexError, struct.error):
+                reply = None
+            if reply:
+                self.sock.sendto(reply, peer)
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+
+    def _ipmi_response(self, request, cc, data):
+        netfn, rq_seq, cmd = request[1] >> 2, request[4] >> 2, request[5]
+        header = bytes([0x81, ((netfn + 1) << 2) | (request[1] & 0x03)])
+        body = bytes([0x20, (rq_seq << 2) | (request[4] & 0x03), cmd, cc]) + data
+        return header + bytes([ipmi_checksum(header)]) + body + bytes([ipmi_checksum(body)])
+
+    def handle_packet(self, packet):
+        if len(packet) < 14 or packet[:4] != RMCP_HEADER:
+            return None
+        if packet[4] == 0x00:  # IPMI v1.5, only Get Channel Auth Capabilities is served pre-session
+            message = packet[14:14 + packet[13]]
+            cc, data = self.bmc.handle(message[1] >> 2, message[5], message[6:-1])
+            response = self._ipmi_response(message, cc, data)
+            return RMCP_HEADER + bytes([0x00]) + struct.pack("<II", 0, 0) + bytes([len(response)]) + response
+
+        session_id = struct.unpack_from("<I", packet, 6)[0]
+        session = self.sessions.get(session_id)
+        if session and session.get("active"):
+            payload_type, _, _, payload = parse_v2_packet(packet, session["k1"], session["hash"], session["aes"])
+            if payload_type != PAYLOAD_IPMI:
+                return None
+            cc, data = self.bmc.handle(payload[1] >> 2, payload[5], payload[6:-1], payload[1] & 0x03)
+            if payload[1] >> 2 == 0x06 and payload[5] == 0x3C:
+                self.sessions.pop(session_id, None)
+            session["seq"] += 1
+            return build_v2_packet(PAYLOAD_IPMI, self._ipmi_response(payload, cc, data), session["console_id"],
+                                   session["seq"], session["k1"], session["hash"], session["aes"])
+
+        payload_type, _, _, payload = parse_v2_packet(packet)
+        if payload_type == PAYLOAD_OPEN_SESSION_REQUEST:
+            return self._open_session(payload)
+        if payload_type == PAYLOAD_RAKP1:
+            return self._rakp1(payload)
+        if payload_type == PAYLOAD_RAKP3:
+            return self._rakp3(payload)
+        return None
+
+    def _open_session(self, payload):
+        tag, console_id = payload[0], struct.unpack_from("<I", payload, 4)[0]
+        algorithms = (payload[12], payload[20], payload[28])
+        suite = next((sid for sid, spec in CIPHER_SUITES.items() if spec[:3] == algorithms), None)
+        bmc_id = struct.unpack("<I", os.urandom(4))[0] | 1
+        status = 0 if suite is not None else 0x11
+        if self.max_sessions is not None and sum(s["active"] for s in self.sessions.values()) >= self.max_sessions:
+            status = 0x01
+        if status == 0:
+            self.sessions[bmc_id] = {"console_id": console_id, "suite": suite, "hash": CIPHER_SUITES[suite][3],
+                                     "active": False, "seq": 0, "k1": None, "aes": None}
+        response = bytes([tag, status, 0x04, 0]) + struct.pack("<II", console_id, bmc_id) + payload[8:32]
+        return build_v2_packet(PAYLOAD_OPEN_SESSION_RESPONSE, response)
+
+    def _rakp1(self, payload):
+        tag, bmc_id = payload[0], struct.unpack_from("<I", payload, 4)[0]
+        session = self.sessions.get(bmc_id)
+        if session is None:
+            return None
+        rm, role, ulen = payload[8:24], payload[24], payload[27]
+        user = payload[28:28 + ulen]
+        password = self.users.get(user.decode(errors="replace"))
+        status = 0 if password is not None else 0x0D
+        kuid = (password or "").encode()[:20]
+        rc, guid = os.urandom(16), os.urandom(16)
+        session.update({"rm": rm, "rc": rc, "guid": guid, "role": role, "user": user, "kuid": kuid})
+        auth = hmac.new(kuid, struct.pack("<II", session["console_id"], bmc_id) + rm + rc + guid + bytes([role, ulen]) + user,
+                        session["hash"]).digest() if status == 0 else b""
+        response = bytes([tag, status, 0, 0]) + struct.pack("<I", session["console_id"]) + rc + guid + auth
+        return build_v2_packet(PAYLOAD_RAKP2, response)
+
+    def _rakp3(self, payload):
+        tag, bmc_id = payload[0], struct.unpack_from("<I", payload, 4)[0]
+        session = self.sessions.get(bmc_id)
+        if session is None or "kuid" not in session:
+            return None
+        hash_name, kuid = session["hash"], session["kuid"]
+        role_user = bytes([session["role"], len(session["user"])]) + session["user"]
+        expected = hmac.new(kuid, session["rc"] + struct.pack("<I", session["console_id"]) + role_user, hash_name).digest()
+        if not hmac.compare_digest(expected, payload[8:]):
+            response = bytes([tag, 0x0F, 0, 0]) + struct.pack("<I", session["console_id"])
+            return build_v2_packet(PAYLOAD_RAKP4, response)
+        sik = session_integrity_key(kuid, session["rm"], session["rc"], session["role"], session["user"], hash_name)
+        icv = hmac.new(sik, session["rm"] + struct.pack("<I", bmc_id) + session["guid"], hash_name).digest()[:ICV_LENGTHS[hash_name]]
+        _, integ_alg, conf_alg, _ = CIPHER_SUITES[session["suite"]]
+        session["k1"] = derive_k1(sik, hash_name) if integ_alg else None
+        session["aes"] = derive_k2(sik, hash_name)[:16] if conf_alg else None
+        session["active"] = True
+        response = bytes([tag, 0, 0, 0]) + struct.pack("<I", session["console_id"]) + icv
+        return build_v2_packet(PAYLOAD_RAKP4, response)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local RMCP+ BMC stand-in for the HA iDRAC controller")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6230)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="calvin")
+    parser.add_argument("--model", default="PowerEdge R720")
+    args = parser.parse_args()
+
+    server = LanplusBMCServer(SimulatedBMC(model=args.model), args.host, args.port, {args.user: args.password})
+    print(f"[FAKE-BMC] Listening on {server.address[0]}:{server.address[1]} as '{args.model}'", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,76 @@
+# HA-iDRAC/ha-idrac-controller-dev/tools/fake_ipmitool.py
+# Stand-in for the ipmitool binary, used through tools/bin/ipmitool. Parses the
+# options the add-on passes and forwards each command to the fleet_sim daemon
+# (HA_IDRAC_FLEET, default 127.0.0.1:6299), then sleeps, hangs or fails the way
+# the daemon says the simulated iDRAC would. Supports `shell` mode as well.
+import socket
+import sys
+import time
+
+from tools.fleet_sim import HANG_SECONDS, send_control
+
+OPTIONS_WITH_VALUE = {"-I", "-H", "-U", "-P", "-p", "-L", "-C", "-y", "-k", "-f", "-R", "-N"}
+
+
+def parse_args(argv):
+    options, i = {}, 0
+    while i < len(argv) and argv[i].startswith("-"):
+        if argv[i] in OPTIONS_WITH_VALUE and i + 1 < len(argv):
+            options[argv[i]] = argv[i + 1]
+            i += 2
+        else:
+            i += 1
+    return options, argv[i:]
+
+
+def run_command(host, args):
+    """Returns (exit_code, output) for one command against the simulated host."""
+    try:
+        reply = send_control({"op": "exec", "host": host, "args": args})
+    except (OSError, socket.timeout, ValueError):
+        return 1, "Error: Unable to establish IPMI v2 / RMCP+ session (fleet simulator not reachable)"
+    time.sleep(reply.get("delay", 0))
+    if reply.get("outcome") == "hang":
+        time.sleep(HANG_SECONDS)
+        return 1, "Error: Unable to establish IPMI v2 / RMCP+ session"
+    if reply.get("outcome") == "fail":
+        return 1, f"Unable to send command: {' '.join(args)}"
+    return reply.get("rc", 1), reply.get("output", "")
+
+
+def shell(host):
+    while True:
+        sys.stdout.write("ipmitool> ")
+        sys.stdout.flush()
+        line = sys.stdin.readline()
+        if not line:
+            return 0
+        args = line.split()
+        if not args:
+            continue
+        if args[0] in ("exit", "quit"):
+            return 0
+        if args[0] == "echo":
+            print(" ".join(args[1:]), flush=True)
+            continue
+        _, output = run_command(host, args)
+        if output:
+            print(output, flush=True)
+
+
+def main(argv):
+    options, args = parse_args(argv)
+    host = options.get("-H", "localhost")
+    if args == ["shell"]:
+        return shell(host)
+    if not args:
+        print("No command provided!", file=sys.stderr)
+        return 1
+    code, output = run_command(host, args)
+    if output:
+        print(output, file=sys.stdout if code == 0 else sys.stderr)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,438 @@
+# HA-iDRAC/ha-idrac-controller-dev/tools/fleet_sim.py
+# A fleet of simulated iDRACs for load testing. Every virtual server has its
+# own SDR/FRU, a thermal model (CPU load heats the CPUs, fan % cools them, the
+# Dell raw fan commands switch between auto and manual) and injectable faults
+# (latency, hung requests, failed requests, offline).
+#
+# Three ways to put the fleet behind the controller:
+#   * drop-in ipmitool: run `python3 -m tools.fleet_sim serve --servers 200 --write-config servers.json`
+#     and put tools/bin first on PATH; tools/bin/ipmitool forwards each command to the daemon.
+#   * native RMCP+: add `--native-base-port 16230` and every server also listens on 127.0.0.1:<port+i>.
+#   * in-process: `attach(manager, fleet.server(ip))` swaps a SimulatedSession in behind an IPMIManager.
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import selectors
+import socket
+import struct
+import time
+
+from app import ipmi_sdr
+from app.ipmi_lan import IpmiLanError
+from tools.fake_bmc import LanplusBMCServer, SimulatedBMC, default_sensors
+
+DEFAULT_CONTROL_ADDRESS = ("127.0.0.1", 6299)
+MODELS = [("PowerEdge R620", 2, 7), ("PowerEdge R720", 2, 6), ("PowerEdge R730", 2, 6),
+          ("PowerEdge R740xd", 2, 6), ("PowerEdge R750", 2, 6)]
+MAX_FAN_RPM = 14000
+HANG_SECONDS = 3600
+
+
+def control_address():
+    value = os.getenv("HA_IDRAC_FLEET", "")
+    if not value:
+        return DEFAULT_CONTROL_ADDRESS
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+# --- Thermal model ---
+class ThermalModel:
+    """First-order model: each CPU heads toward inlet + power x thermal resistance, where the
+    resistance falls as airflow (fan %) rises. Dell auto mode runs its own fan curve."""
+
+    def __init__(self, rng, cpus=2, inlet=22.0, tdp=150.0):
+        self.rng = rng
+        self.inlet = inlet
+        self.tdp = tdp
+        self.load = rng.uniform(0.1, 0.4)
+        self.fan_percent = 30.0
+        self.cpu_temps = [inlet + 20.0 + rng.uniform(-2, 2) for _ in range(cpus)]
+        self.cpu_power = [0.0] * cpus
+        self.spike_until = 0.0
+
+    @staticmethod
+    def resistance(fan_percent):
+        return 0.12 + 0.25 / (0.2 + fan_percent / 100.0)
+
+    def auto_fan_target(self):
+        return max(15.0, min(100.0, 20.0 + 2.5 * (max(self.cpu_temps) - 50.0)))
+
+    def step(self, dt, now, fan_mode, manual_speed):
+        if dt <= 0:
+            return
+        # CPU load wanders, with occasional bursts to simulate jobs landing on the box.
+        if now >= self.spike_until and self.rng.random() < 0.002 * dt:
+            self.spike_until = now + self.rng.uniform(30, 180)
+        drift = self.rng.gauss(0, 0.03 * math.sqrt(dt))
+        target_load = 0.9 if now < self.spike_until else 0.25
+        self.load = max(0.02, min(1.0, self.load + drift + (target_load - self.load) * min(1.0, dt / 60)))
+
+        if fan_mode == "manual" and manual_speed is not None:
+            fan_target = float(manual_speed)
+        else:
+            fan_target = self.auto_fan_target()
+        self.fan_percent += (fan_target - self.fan_percent) * min(1.0, dt / 3.0)
+
+        r = self.resistance(self.fan_percent)
+        for i, temp in enumerate(self.cpu_temps):
+            power = self.tdp * (0.12 + self.load * (0.88 + 0.05 * i))
+            self.cpu_power[i] = power
+            steady = self.inlet + power * r
+            self.cpu_temps[i] = temp + (steady - temp) * min(1.0, dt / 20.0)
+
+    @property
+    def system_power(self):
+        return 90.0 + sum(self.cpu_power) + 0.004 * self.fan_percent ** 2.4
+
+    @property
+    def exhaust(self):
+        return self.inlet + self.system_power * 0.04 / (0.2 + self.fan_percent / 100.0)
+
+
+# --- Faults ---
+class FaultProfile:
+    def __init__(self, latency_ms=(0, 0), timeout_rate=0.0, failure_rate=0.0, offline=False):
+        self.latency_ms = latency_ms
+        self.timeout_rate = timeout_rate
+        self.failure_rate = failure_rate
+        self.offline = offline
+
+    def decide(self, rng):
+        """Returns (delay_seconds, outcome) with outcome one of "ok", "fail", "hang"."""
+        if self.offline:
+            return 0.0, "hang"
+        delay = rng.uniform(*self.latency_ms) / 1000.0 if self.latency_ms[1] else 0.0
+        roll = rng.random()
+        if roll < self.timeout_rate:
+            return delay, "hang"
+        if roll < self.timeout_rate + self.failure_rate:
+            return delay, "fail"
+        return delay, "ok"
+
+    def to_dict(self):
+        return {"latency_ms": list(self.latency_ms), "timeout_rate": self.timeout_rate,
+                "failure_rate": self.failure_rate, "offline": self.offline}
+
+
+# --- One virtual server ---
+class SimulatedServer(SimulatedBMC):
+    def __init__(self, ip, model, cpus, fans, rng, faults=None, native_port=None):
+        sensors = default_sensors(cpus=cpus, fans=fans)
+        super().__init__(model=model, sensors=sensors)
+        self.ip = ip
+        self.rng = rng
+        self.faults = faults or FaultProfile()
+        self.native_port = native_port
+        self.thermal = ThermalModel(rng, cpus=cpus, inlet=rng.uniform(19, 26), tdp=rng.choice([95, 120, 150, 205]))
+        self._last_step = time.monotonic()
+        self._decoded = None
+        self._fru_text = None
+        self.requests = 0
+        self._apply_thermal()
+
+    def advance(self, now=None):
+        now = time.monotonic() if now is None else now
+        dt = now - self._last_step
+        while dt > 0:
+            step = min(dt, 5.0)
+            self.thermal.step(step, now - dt + step, self.fan_mode, self.fan_speed)
+            dt -= step
+        self._last_step = now
+        self._apply_thermal()
+
+    def _apply_thermal(self):
+        cpu_index = 0
+        for sensor in self.sensors:
+            if sensor["name"] == "Temp":
+                sensor["value"] = round(self.thermal.cpu_temps[cpu_index])
+                cpu_index += 1
+            elif sensor["name"] == "Inlet Temp":
+                sensor["value"] = round(self.thermal.inlet)
+            elif sensor["name"] == "Exhaust Temp":
+                sensor["value"] = round(self.thermal.exhaust)
+            elif sensor.get("unit") == 18:
+                sensor["value"] = self.thermal.fan_percent / 100.0 * MAX_FAN_RPM
+            elif sensor["name"] == "Pwr Consumption":
+                sensor["value"] = self.thermal.system_power
+
+    def handle(self, netfn, cmd, data, lun=0):
+        self.requests += 1
+        self.advance()
+        return super().handle(netfn, cmd, data, lun)
+
+    # --- ipmitool text rendering ---
+    def _sensors(self):
+        if self._decoded is None:
+            self._decoded = ipmi_sdr.read_sensors(super().handle)
+        return self._decoded
+
+    def execute(self, args):
+        """Runs one ipmitool command line (after the global options). Returns (exit_code, output)."""
+        if not args:
+            return 1, "No command provided!"
+        command = args[0].lower()
+        if command == "raw":
+            try:
+                values = [int(a, 16) if not a.lower().startswith("0x") else int(a, 0) for a in args[1:]]
+            except ValueError:
+                return 1, f"Invalid raw data: {' '.join(args[1:])}"
+            if len(values) < 2:
+                return 1, "Not enough parameters given."
+            cc, data = self.handle(values[0], values[1], bytes(values[2:]))
+            if cc != 0:
+                return 1, (f"Unable to send RAW command (channel=0x0 netfn=0x{values[0]:x} lun=0x0 "
+                           f"cmd=0x{values[1]:x} rsp=0x{cc:x}): Invalid command")
+            return 0, "\n".join(" " + " ".join(f"{b:02x}" for b in data[i:i + 16]) for i in range(0, len(data), 16))
+        if command == "sdr":
+            self.advance()
+            sub = [a.lower() for a in args[1:]]
+            if not sub or sub[0] in ("elist", "list"):
+                return 0, ipmi_sdr.read_sensor_lines(self.handle, self._sensors())
+            if sub[0] == "type" and len(sub) > 1 and sub[1] in ipmi_sdr.SENSOR_TYPES:
+                return 0, ipmi_sdr.read_sensor_lines(self.handle, self._sensors(), ipmi_sdr.SENSOR_TYPES[sub[1]])
+            return 1, f"Invalid SDR command: {' '.join(args[1:])}"
+        if command == "fru":
+            if self._fru_text is None:
+                self._fru_text = ipmi_sdr.format_fru(ipmi_sdr.decode_fru(ipmi_sdr.read_fru(super().handle)))
+            return 0, self._fru_text
+        if command == "mc" and args[1:2] == ["info"]:
+            return 0, f"Device ID                 : 32\nFirmware Revision         : {self.firmware[0]}.{self.firmware[1]:02x}"
+        return 1, f"Invalid command: {args[0]}"
+
+    def status(self):
+        self.advance()
+        return {"ip": self.ip, "model": self.model, "fan_mode": self.fan_mode, "fan_speed": self.fan_speed,
+                "fan_percent": round(self.thermal.fan_percent, 1), "load": round(self.thermal.load, 2),
+                "cpu_temps": [round(t, 1) for t in self.thermal.cpu_temps], "requests": self.requests,
+                "faults": self.faults.to_dict(), "native_port": self.native_port}
+
+
+# --- The fleet ---
+class SimulatedFleet:
+    def __init__(self, count, seed=1, faults=None, offline=0, native_base_port=None):
+        rng = random.Random(seed)
+        self.servers = {}
+        for i in range(count):
+            ip = f"10.250.{i // 250}.{i % 250 + 1}"
+            model, cpus, fans = MODELS[i % len(MODELS)]
+            profile = FaultProfile(**(faults or {}))
+            profile.offline = i < offline
+            self.servers[ip] = SimulatedServer(ip, model, cpus, fans, random.Random(rng.random()), profile,
+                                               native_port=native_base_port + i if native_base_port else None)
+        self.rng = rng
+
+    def server(self, ip):
+        return self.servers.get(ip)
+
+    def servers_config(self, transport="ipmitool", username="root", password="calvin"):
+        """A servers_config.json list pointing the controller at every simulated server."""
+        config = []
+        for i, server in enumerate(self.servers.values()):
+            entry = {"alias": f"sim-{i + 1:04d}", "idrac_ip": server.ip, "idrac_username": username,
+                     "idrac_password": password, "ipmi_transport": transport, "enabled": True}
+            if transport == "native":
+                entry.update({"idrac_ip": "127.0.0.1", "ipmi_port": server.native_port})
+            config.append(entry)
+        return config
+
+    def summary(self):
+        servers = list(self.servers.values())
+        for server in servers:
+            server.advance()
+        hottest = [max(s.thermal.cpu_temps) for s in servers]
+        return {"servers": len(servers), "manual_fan_mode": sum(s.fan_mode == "manual" for s in servers),
+                "offline": sum(s.faults.offline for s in servers), "requests": sum(s.requests for s in servers),
+                "hottest_cpu_mean": round(sum(hottest) / len(hottest), 1) if hottest else None,
+                "hottest_cpu_max": round(max(hottest), 1) if hottest else None}
+
+    def handle_control(self, message):
+        """Serves one request from tools/bin/ipmitool, or a fault/status command."""
+        op = message.get("op", "exec")
+        if op == "exec":
+            server = self.servers.get(message.get("host"))
+            if server is None:
+                return {"delay": 0.0, "outcome": "hang"}
+            delay, outcome = server.faults.decide(server.rng)
+            if outcome != "ok":
+                return {"delay": delay, "outcome": outcome}
+            code, output = server.execute(message.get("args", []))
+            return {"delay": delay, "outcome": "ok", "rc": code, "output": output}
+        if op == "fault":
+            targets = [self.servers[h] for h in message.get("hosts", []) if h in self.servers] or list(self.servers.values())
+            for server in targets:
+                for key in ("timeout_rate", "failure_rate", "offline"):
+                    if key in message:
+                        setattr(server.faults, key, message[key])
+                if "latency_ms" in message:
+                    server.faults.latency_ms = tuple(message["latency_ms"])
+            return {"updated": len(targets)}
+        if op == "status":
+            if message.get("hosts"):
+                return {"servers": [self.servers[h].status() for h in message["hosts"] if h in self.servers]}
+            return self.summary()
+        return {"error": f"unknown op {op}"}
+
+
+# --- In-process transport ---
+class SimulatedSession:
+    """Stands in for app.ipmi_lan.LanplusSession, answering from a SimulatedServer in this process."""
+
+    def __init__(self, server, sleep=time.sleep):
+        self.server = server
+        self._sleep = sleep
+        self.is_open = False
+        self.sessions_opened = 0
+        self.requests_sent = 0
+
+    def open(self, timeout=5):
+        delay, outcome = self.server.faults.decide(self.server.rng)
+        if outcome == "hang":
+            self._sleep(timeout)
+            raise IpmiLanError(f"No response from {self.server.ip}")
+        self._sleep(delay)
+        self.is_open = True
+        self.sessions_opened += 1
+
+    def raw(self, netfn, cmd, data=b"", lun=0, timeout=5):
+        if not self.is_open:
+            self.open(timeout)
+        delay, outcome = self.server.faults.decide(self.server.rng)
+        if outcome == "hang":
+            self._sleep(timeout)
+            self.is_open = False
+            raise IpmiLanError(f"Timed out waiting for {self.server.ip}")
+        self._sleep(delay)
+        self.requests_sent += 1
+        if outcome == "fail":
+            return 0xFF, b""
+        return self.server.handle(netfn, cmd, bytes(data), lun)
+
+    def close(self):
+        self.is_open = False
+
+
+def attach(manager, server):
+    """Routes an IPMIManager (created with transport="native") to a simulated server in this process."""
+    manager.native_session = SimulatedSession(server)
+    return manager
+
+
+# --- Daemon ---
+def serve(fleet, address=DEFAULT_CONTROL_ADDRESS, log=print):
+    selector = selectors.DefaultSelector()
+    control = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    control.bind(address)
+    selector.register(control, selectors.EVENT_READ, None)
+    for server in fleet.servers.values():
+        if server.native_port:
+            endpoint = LanplusBMCServer(server, "127.0.0.1", server.native_port)
+            selector.register(endpoint.sock, selectors.EVENT_READ, endpoint)
+    log(f"[FLEET] {len(fleet.servers)} simulated servers, control socket on {address[0]}:{address[1]}")
+    # RMCP+ replies held back by injected latency: (due, sequence, socket, reply, peer)
+    delayed = []
+    sequence = 0
+    try:
+        while True:
+            timeout = max(0.0, delayed[0][0] - time.monotonic()) if delayed else None
+            for key, _ in selector.select(timeout):
+                packet, peer = key.fileobj.recvfrom(65535)
+                if key.data is None:
+                    try:
+                        reply = fleet.handle_control(json.loads(packet))
+                    except (ValueError, KeyError, TypeError) as e:
+                        reply = {"error": str(e)}
+                    try:
+                        key.fileobj.sendto(json.dumps(reply).encode(), peer)
+                    except OSError as e:
+                        log(f"[FLEET] Could not send reply to {peer}: {e}")
+                    continue
+                endpoint = key.data
+                delay, outcome = endpoint.bmc.faults.decide(endpoint.bmc.rng)
+                if outcome != "ok":
+                    continue  # dropped: the console's retries and timeout do the rest
+                try:
+                    reply = endpoint.handle_packet(packet)
+                except (IpmiLanError, IndexError, struct.error):
+                    reply = None
+                if reply:
+                    sequence += 1
+                    heapq.heappush(delayed, (time.monotonic() + delay, sequence, key.fileobj, reply, peer))
+            now = time.monotonic()
+            while delayed and delayed[0][0] <= now:
+                _, _, sock, reply, peer = heapq.heappop(delayed)
+                sock.sendto(reply, peer)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        selector.close()
+        control.close()
+
+
+def send_control(message, address=None, timeout=5):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
+    try:
+        sock.sendto(json.dumps(message).encode(), address or control_address())
+        return json.loads(sock.recv(65535))
+    finally:
+        sock.close()
+
+
+def _latency(value):
+    low, _, high = value.partition("-")
+    return float(low), float(high or low)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated iDRAC fleet for load testing the HA iDRAC controller")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="run the fleet daemon")
+    serve_parser.add_argument("--servers", type=int, default=50)
+    serve_parser.add_argument("--seed", type=int, default=1)
+    serve_parser.add_argument("--latency-ms", type=_latency, default=(5.0, 40.0), help="e.g. 5-40")
+    serve_parser.add_argument("--timeout-rate", type=float, default=0.0)
+    serve_parser.add_argument("--failure-rate", type=float, default=0.0)
+    serve_parser.add_argument("--offline", type=int, default=0, help="number of servers that never answer")
+    serve_parser.add_argument("--native-base-port", type=int, default=0)
+    serve_parser.add_argument("--transport", default="ipmitool", help="ipmi_transport written to --write-config")
+    serve_parser.add_argument("--write-config", help="write a servers_config.json for the fleet to this path")
+
+    fault_parser = sub.add_parser("fault", help="change fault injection on a running fleet")
+    fault_parser.add_argument("hosts", nargs="*", help="IPs to change (default: all)")
+    fault_parser.add_argument("--latency-ms", type=_latency)
+    fault_parser.add_argument("--timeout-rate", type=float)
+    fault_parser.add_argument("--failure-rate", type=float)
+    fault_parser.add_argument("--offline", choices=["yes", "no"])
+
+    status_parser = sub.add_parser("status", help="print a fleet summary, or the state of the given servers, as JSON")
+    status_parser.add_argument("hosts", nargs="*")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        fleet = SimulatedFleet(args.servers, seed=args.seed, offline=args.offline,
+                               native_base_port=args.native_base_port or None,
+                               faults={"latency_ms": args.latency_ms, "timeout_rate": args.timeout_rate,
+                                       "failure_rate": args.failure_rate})
+        if args.write_config:
+            with open(args.write_config, "w") as f:
+                json.dump(fleet.servers_config(args.transport), f, indent=2)
+            print(f"[FLEET] Wrote {args.write_config}", flush=True)
+        serve(fleet, control_address(), log=lambda message: print(message, flush=True))
+    elif args.command == "fault":
+        message = {"op": "fault", "hosts": args.hosts}
+        if args.latency_ms is not None:
+            message["latency_ms"] = list(args.latency_ms)
+        if args.timeout_rate is not None:
+            message["timeout_rate"] = args.timeout_rate
+        if args.failure_rate is not None:
+            message["failure_rate"] = args.failure_rate
+        if args.offline is not None:
+            message["offline"] = args.offline == "yes"
+        print(json.dumps(send_control(message)))
+    else:
+        print(json.dumps(send_control({"op": "status", "hosts": args.hosts}), indent=2))
@@ -0,0 +1,336 @@
+# HA-iDRAC/ha-idrac-controller-dev/tools/loadtest.py
+# End-to-end load test: runs the real controller (`python3 -m app.main`, workers
+# and web server) against a simulated fleet (tools/fleet_sim.py, reached through
+# the fake ipmitool in tools/bin or over native RMCP+) and a local MQTT broker
+# (tools/mini_broker.py), for each fleet size in a sweep. Reports cycle latency,
+# missed deadlines, CPU, RSS, threads, MQTT rate and web response times, and
+# saves them as JSON and CSV so runs can be compared across commits.
+#
+# Run from the add-on folder (needs the add-on's requirements installed):
+#   python3 -m tools.loadtest --sizes 1,10,50,100,250,500,1000 --interval 30 --duration 120
+#   python3 -m tools.loadtest --compare loadtest-results/a.json loadtest-results/b.json
+import argparse
+import csv
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from tools.fleet_sim import send_control
+from tools.mini_broker import MiniBroker
+
+DEV_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BIN_DIR = os.path.join(DEV_DIR, "tools", "bin")
+DEFAULT_SIZES = "1,10,50,100,250,500,1000"
+WEB_ROUTES = ["/", "/servers", "/api/servers"]
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+STOP_TIMEOUT_SECONDS = 60
+
+
+# --- Helpers ---
+def free_port(kind=socket.SOCK_STREAM):
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    values = sorted(values)
+    pick = lambda q: round(values[min(len(values) - 1, int(len(values) * q))], 4)
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": round(values[-1], 4)}
+
+
+def read_proc(pid):
+    """CPU seconds (own and reaped children, e.g. ipmitool), RSS and thread count from /proc."""
+    with open(f"/proc/{pid}/stat", "r") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    rss_kb = 0
+    with open(f"/proc/{pid}/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+    return {"cpu_seconds": (int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+            "children_cpu_seconds": (int(fields[13]) + int(fields[14])) / CLOCK_TICKS,
+            "threads": int(fields[17]), "rss_mb": rss_kb / 1024}
+
+
+def read_status(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None  # missing, or caught mid-write
+
+
+def time_request(url, timeout=10):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+        return (time.perf_counter() - start) * 1000, None
+    except (urllib.error.URLError, OSError) as e:
+        return None, str(e)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DEV_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _stop(proc):
+    if proc.poll() is not None:
+        return
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=STOP_TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# --- One fleet size ---
+def start_fleet(n, args, workdir, control):
+    command = [sys.executable, "-m", "tools.fleet_sim", "serve", "--servers", str(n), "--seed", str(args.seed),
+               "--latency-ms", args.latency_ms, "--timeout-rate", str(args.timeout_rate),
+               "--failure-rate", str(args.failure_rate), "--offline", str(args.offline),
+               "--transport", args.transport, "--write-config", os.path.join(workdir, "servers_config.json")]
+    if args.transport == "native":
+        command += ["--native-base-port", str(args.native_base_port)]
+    env = {**os.environ, "HA_IDRAC_FLEET": f"{control[0]}:{control[1]}"}
+    proc = subprocess.Popen(command, cwd=DEV_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            send_control({"op": "status"}, control, timeout=1)
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.2)
+    _stop(proc)
+    raise RuntimeError("fleet simulator did not start")
+
+
+def start_controller(args, workdir, control, broker, web_port):
+    env = {**os.environ,
+           "DATA_DIR": workdir, "PATH": f"{BIN_DIR}{os.pathsep}{os.environ.get('PATH', '')}",
+           "HA_IDRAC_FLEET": f"{control[0]}:{control[1]}", "PYTHONUNBUFFERED": "1",
+           "LOG_LEVEL": args.log_level, "CHECK_INTERVAL_SECONDS": str(args.interval),
+           "IPMI_TRANSPORT": args.transport, "POLLING_ENGINE": args.engine,
+           "MAX_CONCURRENCY": str(args.max_concurrency), "INGRESS_PORT": str(web_port),
+           "MQTT_HOST": broker.address[0], "MQTT_PORT": str(broker.address[1]),
+           "MQTT_USERNAME": "", "MQTT_PASSWORD": "", "MQTT_STATE_MODE": args.mqtt_state_mode,
+           "STATUS_PERSIST_SECONDS": "1"}
+    log = open(os.path.join(workdir, "controller.log"), "w")
+    return subprocess.Popen([sys.executable, "-m", "app.main"], cwd=DEV_DIR, env=env, stdout=log,
+                            stderr=subprocess.STDOUT), log
+
+
+def run_step(n, args):
+    workdir = tempfile.mkdtemp(prefix=f"ha_idrac_load_{n}_")
+    control = ("127.0.0.1", free_port(socket.SOCK_DGRAM))
+    web_port = free_port()
+    status_path = os.path.join(workdir, "current_status.json")
+    broker = MiniBroker().start()
+    fleet = start_fleet(n, args, workdir, control)
+    controller, log = start_controller(args, workdir, control, broker, web_port)
+    base_url = f"http://127.0.0.1:{web_port}"
+    print(f"[LOAD] {n} server(s): controller pid {controller.pid}, data in {workdir}", flush=True)
+
+    try:
+        # Warm-up: every server has finished one cycle, or the warm-up time ran out.
+        warmup_end = time.time() + args.warmup
+        polled = 0
+        while time.time() < warmup_end and controller.poll() is None:
+            status = read_status(status_path) or []
+            polled = sum(1 for s in status if s.get("cycle_count"))
+            if polled >= n:
+                break
+            time.sleep(1)
+        if controller.poll() is not None:
+            raise RuntimeError(f"controller exited with code {controller.returncode}, see {workdir}/controller.log")
+        print(f"[LOAD]   warm-up done: {polled}/{n} servers polled", flush=True)
+
+        seen = {s["alias"]: s for s in (read_status(status_path) or []) if "alias" in s}
+        cycle_seconds, start_lags, cycles, missed = [], [], 0, 0
+        samples = []
+        web = {route: {"ms": [], "errors": 0} for route in WEB_ROUTES}
+        proc_start, broker_start, start = read_proc(controller.pid), broker.stats(), time.time()
+        next_web = start
+        while time.time() - start < args.duration and controller.poll() is None:
+            samples.append(read_proc(controller.pid))
+            for entry in read_status(status_path) or []:
+                previous = seen.get(entry.get("alias"), {})
+                done = (entry.get("cycle_count") or 0) - (previous.get("cycle_count") or 0)
+                if done > 0:
+                    cycles += done
+                    missed += (entry.get("missed_deadlines") or 0) - (previous.get("missed_deadlines") or 0)
+                    # Only the latest cycle's timings are visible; with 1s sampling that is nearly every cycle.
+                    cycle_seconds.append(entry["last_cycle_seconds"])
+                    start_lags.append(entry["last_start_lag_seconds"])
+                    seen[entry["alias"]] = entry
+            if time.time() >= next_web:
+                next_web += args.web_every
+                for route in WEB_ROUTES:
+                    elapsed_ms, error = time_request(base_url + route)
+                    if error:
+                        web[route]["errors"] += 1
+                    else:
+                        web[route]["ms"].append(elapsed_ms)
+            time.sleep(1)
+        elapsed = time.time() - start
+        proc_end, broker_end = read_proc(controller.pid), broker.stats()
+    finally:
+        _stop(controller)
+        log.close()
+        _stop(fleet)
+        broker.stop()
+
+    unreachable = sum(1 for s in seen.values() if (s.get("breaker") or {}).get("state", "closed") != "closed")
+    expected_cycles = n * elapsed / args.interval
+    result = {
+        "servers": n,
+        "duration_s": round(elapsed, 1),
+        "cycles": cycles,
+        "expected_cycles": round(expected_cycles, 1),
+        "servers_polled": sum(1 for s in seen.values() if s.get("cycle_count")),
+        "servers_unreachable": unreachable,
+        "cycle_seconds": percentiles(cycle_seconds),
+        "start_lag_seconds": percentiles(start_lags),
+        "missed_deadlines": missed,
+        "cpu_percent": round(100 * (proc_end["cpu_seconds"] - proc_start["cpu_seconds"]) / elapsed, 1),
+        "children_cpu_percent": round(100 * (proc_end["children_cpu_seconds"] - proc_start["children_cpu_seconds"]) / elapsed, 1),
+        "rss_mb": {"mean": round(sum(s["rss_mb"] for s in samples) / len(samples), 1) if samples else None,
+                   "max": round(max(s["rss_mb"] for s in samples), 1) if samples else None},
+        "threads_max": max((s["threads"] for s in samples), default=None),
+        "mqtt": {"messages_per_s": round((broker_end["messages_received"] - broker_start["messages_received"]) / elapsed, 1),
+                 "bytes_per_s": round((broker_end["bytes_received"] - broker_start["bytes_received"]) / elapsed),
+                 "clients": broker_end["clients"], "retained_topics": broker_end["retained"]},
+        "web_ms": {route: {**percentiles(data["ms"]), "errors": data["errors"]} for route, data in web.items()},
+    }
+    p99 = result["cycle_seconds"]["p99"]
+    result["passed"] = (result["servers_polled"] + unreachable >= n - args.offline and missed == 0
+                        and p99 is not None and p99 < args.interval)
+    if args.keep:
+        result["workdir"] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+# --- Output ---
+def print_result(r):
+    c, lag, web = r["cycle_seconds"], r["start_lag_seconds"], r["web_ms"]["/"]
+    print(f"[LOAD]   cycles {r['cycles']}/{r['expected_cycles']:.0f}  cycle p50/p99 {c['p50']}/{c['p99']}s  "
+          f"lag p99 {lag['p99']}s  missed {r['missed_deadlines']}  cpu {r['cpu_percent']}% (+{r['children_cpu_percent']}% children)  "
+          f"rss {r['rss_mb']['max']} MB  threads {r['threads_max']}  mqtt {r['mqtt']['messages_per_s']} msg/s  "
+          f"web / p90 {web['p90']} ms  api p90 {r['web_ms'].get('/api/servers', {}).get('p90')} ms  {'PASS' if r['passed'] else 'FAIL'}", flush=True)
+
+
+def flatten(result, prefix=""):
+    row = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            row.update(flatten(value, f"{prefix}{key}."))
+        else:
+            row[f"{prefix}{key}"] = value
+    return row
+
+
+def save(results, meta, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{meta['commit']}")
+    with open(base + ".json", "w") as f:
+        json.dump({"meta": meta, "steps": results}, f, indent=2)
+    rows = [flatten(r) for r in results]
+    if rows:
+        with open(base + ".csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(dict.fromkeys(k for row in rows for k in row)))
+            writer.writeheader()
+            writer.writerows(rows)
+    return base
+
+
+def compare(paths):
+    runs = []
+    for path in paths:
+        with open(path, "r") as f:
+            runs.append(json.load(f))
+    metrics = [("cycle p99 s", lambda r: r["cycle_seconds"]["p99"]), ("missed", lambda r: r["missed_deadlines"]),
+               ("cpu %", lambda r: r["cpu_percent"]), ("rss MB", lambda r: r["rss_mb"]["max"]),
+               ("threads", lambda r: r["threads_max"]), ("msg/s", lambda r: r["mqtt"]["messages_per_s"]),
+               ("web / p90 ms", lambda r: r["web_ms"]["/"]["p90"])]
+    print("servers  metric          " + "".join(f"{run['meta']['commit']:>14}" for run in runs))
+    sizes = sorted({step["servers"] for run in runs for step in run["steps"]})
+    for n in sizes:
+        for name, get in metrics:
+            cells = []
+            for run in runs:
+                step = next((s for s in run["steps"] if s["servers"] == n), None)
+                value = get(step) if step else None
+                cells.append("-" if value is None else f"{value:>14}")
+            print(f"{n:>7}  {name:<15} " + "".join(f"{cell:>14}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the controller against a simulated iDRAC fleet.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated fleet sizes (default {DEFAULT_SIZES})")
+    parser.add_argument("--interval", type=int, default=30, help="CHECK_INTERVAL_SECONDS for the controller")
+    parser.add_argument("--duration", type=int, default=120, help="measured seconds per fleet size")
+    parser.add_argument("--warmup", type=int, default=90, help="max seconds to wait for every server's first cycle")
+    parser.add_argument("--engine", choices=["threads", "asyncio"], default="threads")
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--transport", choices=["ipmitool", "shell", "native"], default="ipmitool")
+    parser.add_argument("--native-base-port", type=int, default=17000)
+    parser.add_argument("--mqtt-state-mode", choices=["combined", "per_sensor"], default="combined")
+    parser.add_argument("--latency-ms", default="5-40", help="simulated iDRAC latency per request")
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--offline", type=int, default=0, help="simulated servers that never answer")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--web-every", type=float, default=5, help="seconds between web UI timing requests")
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument("--output", default="loadtest-results")
+    parser.add_argument("--keep", action="store_true", help="keep each step's data dir and controller log")
+    parser.add_argument("--keep-going", action="store_true", help="continue the sweep after a size fails")
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS_JSON", help="print saved runs side by side and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare)
+        return
+
+    meta = {"commit": git_commit(), "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": sys.version.split()[0],
+            "cpus": os.cpu_count(), "args": {k: v for k, v in vars(args).items() if k != "compare"}}
+    results, capacity = [], 0
+    for n in [int(size) for size in args.sizes.split(",") if size.strip()]:
+        try:
+            result = run_step(n, args)
+        except RuntimeError as e:
+            print(f"[LOAD] {n} server(s): {e}", flush=True)
+            break
+        print_result(result)
+        results.append(result)
+        if result["passed"]:
+            capacity = n
+        elif not args.keep_going:
+            break
+
+    base = save(results, meta, args.output)
+    print(f"[LOAD] Largest fleet that kept every deadline: {capacity} server(s). Results: {base}.json / .csv", flush=True)
+
+
+if __name__ == "__main__":
+    main()
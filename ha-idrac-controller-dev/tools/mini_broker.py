@@ -0,0 +1,251 @@
+# HA-iDRAC/ha-idrac-controller-dev/tools/mini_broker.py
+# Minimal MQTT 3.1.1 broker for load tests: CONNECT, PUBLISH (QoS 0/1/2),
+# SUBSCRIBE/UNSUBSCRIBE with + and # wildcards, retained messages, last will and
+# PINGREQ, all served from one selector thread. It counts what it receives so a
+# test can report MQTT messages and bytes per second. Not for production use.
+import argparse
+import selectors
+import socket
+import struct
+import threading
+import time
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+
+def topic_matches(pattern, topic):
+    pattern_parts, topic_parts = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+def _encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(encoded)
+
+
+def _string(data, pos):
+    length = struct.unpack_from("!H", data, pos)[0]
+    return data[pos + 2:pos + 2 + length], pos + 2 + length
+
+
+def publish_packet(topic, payload, retain=False):
+    body = struct.pack("!H", len(topic)) + topic.encode() + payload
+    return bytes([(PUBLISH << 4) | (1 if retain else 0)]) + _encode_length(len(body)) + body
+
+
+class _Client:
+    def __init__(self, sock, peer):
+        self.sock = sock
+        self.peer = peer
+        self.buffer = b""
+        self.client_id = None
+        self.subscriptions = set()
+        self.will = None
+
+
+class MiniBroker:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(1024)
+        self.address = self.listener.getsockname()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ, None)
+        self.clients = {}
+        self.retained = {}
+        self.running = False
+        self._thread = None
+        self._lock = threading.Lock()
+        self.messages_received = 0
+        self.bytes_received = 0
+        self.connections = 0
+        self.topics = {}
+
+    # --- Lifecycle ---
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+        for client in list(self.clients.values()):
+            self._drop(client, send_will=False)
+        self.selector.close()
+        self.listener.close()
+
+    def serve_forever(self):
+        while self.running:
+            for key, _ in self.selector.select(0.5):
+                if key.data is None:
+                    sock, peer = self.listener.accept()
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    client = _Client(sock, peer)
+                    self.clients[sock] = client
+                    self.selector.register(sock, selectors.EVENT_READ, client)
+                    continue
+                client = key.data
+                try:
+                    chunk = client.sock.recv(65536)
+                except OSError:
+                    chunk = b""
+                if not chunk:
+                    self._drop(client, send_will=True)
+                    continue
+                client.buffer += chunk
+                try:
+                    self._process(client)
+                except (OSError, IndexError, struct.error, UnicodeDecodeError):
+                    self._drop(client, send_will=True)
+
+    def stats(self):
+        with self._lock:
+            return {"messages_received": self.messages_received, "bytes_received": self.bytes_received,
+                    "connections": self.connections, "clients": len(self.clients), "retained": len(self.retained),
+                    "topics": len(self.topics)}
+
+    # --- Packets ---
+    def _process(self, client):
+        while True:
+            buffer = client.buffer
+            if len(buffer) < 2:
+                return
+            length, multiplier, pos = 0, 1, 1
+            while True:
+                if pos >= len(buffer):
+                    return
+                byte = buffer[pos]
+                length += (byte & 0x7F) * multiplier
+                multiplier *= 128
+                pos += 1
+                if not byte & 0x80:
+                    break
+            if len(buffer) < pos + length:
+                return
+            packet_type, flags, body = buffer[0] >> 4, buffer[0] & 0x0F, buffer[pos:pos + length]
+            client.buffer = buffer[pos + length:]
+            if client.sock not in self.clients:
+                return
+            self._handle(client, packet_type, flags, body)
+
+    def _handle(self, client, packet_type, flags, body):
+        if packet_type == CONNECT:
+            _, pos = _string(body, 0)  # protocol name
+            connect_flags = body[pos + 1]
+            client_id, pos = _string(body, pos + 4)
+            client.client_id = client_id.decode(errors="replace")
+            if connect_flags & 0x04:
+                will_topic, pos = _string(body, pos)
+                will_payload, pos = _string(body, pos)
+                client.will = (will_topic.decode(), will_payload, bool(connect_flags & 0x20))
+            with self._lock:
+                self.connections += 1
+            client.sock.sendall(bytes([CONNACK << 4, 2, 0, 0]))
+        elif packet_type == PUBLISH:
+            qos, retain = (flags >> 1) & 0x03, bool(flags & 0x01)
+            topic, pos = _string(body, 0)
+            topic = topic.decode()
+            packet_id = None
+            if qos:
+                packet_id = body[pos:pos + 2]
+                pos += 2
+            self._route(topic, bytes(body[pos:]), retain, len(body))
+            if qos == 1:
+                client.sock.sendall(bytes([PUBACK << 4, 2]) + packet_id)
+            elif qos == 2:
+                client.sock.sendall(bytes([PUBREC << 4, 2]) + packet_id)
+        elif packet_type == PUBREL:
+            client.sock.sendall(bytes([PUBCOMP << 4, 2]) + body[:2])
+        elif packet_type == SUBSCRIBE:
+            packet_id, pos, granted, patterns = body[:2], 2, bytearray(), []
+            while pos < len(body):
+                pattern, pos = _string(body, pos)
+                pos += 1  # requested QoS; everything is delivered at QoS 0
+                patterns.append(pattern.decode())
+                granted.append(0)
+            client.subscriptions.update(patterns)
+            client.sock.sendall(bytes([SUBACK << 4]) + _encode_length(2 + len(granted)) + packet_id + bytes(granted))
+            for topic, payload in list(self.retained.items()):
+                if any(topic_matches(p, topic) for p in patterns):
+                    client.sock.sendall(publish_packet(topic, payload, retain=True))
+        elif packet_type == UNSUBSCRIBE:
+            pos = 2
+            while pos < len(body):
+                pattern, pos = _string(body, pos)
+                client.subscriptions.discard(pattern.decode())
+            client.sock.sendall(bytes([UNSUBACK << 4, 2]) + body[:2])
+        elif packet_type == PINGREQ:
+            client.sock.sendall(bytes([PINGRESP << 4, 0]))
+        elif packet_type == DISCONNECT:
+            self._drop(client, send_will=False)
+
+    def _route(self, topic, payload, retain, size):
+        with self._lock:
+            self.messages_received += 1
+            self.bytes_received += size
+            self.topics[topic] = self.topics.get(topic, 0) + 1
+        if retain:
+            if payload:
+                self.retained[topic] = payload
+            else:
+                self.retained.pop(topic, None)
+        packet = None
+        for other in list(self.clients.values()):
+            if any(topic_matches(p, topic) for p in other.subscriptions):
+                packet = packet or publish_packet(topic, payload)
+                try:
+                    other.sock.sendall(packet)
+                except OSError:
+                    self._drop(other, send_will=True)
+
+    def publish(self, topic, payload, retain=False):
+        """Publishes from the broker itself, e.g. to simulate Home Assistant's birth message."""
+        payload = payload.encode() if isinstance(payload, str) else payload
+        self._route(topic, payload, retain, len(topic) + len(payload))
+
+    def _drop(self, client, send_will):
+        if self.clients.pop(client.sock, None) is None:
+            return
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+        if send_will and client.will:
+            topic, payload, retain = client.will
+            self._route(topic, payload, retain, len(topic) + len(payload))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minimal MQTT broker for load testing the HA iDRAC controller")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--report-seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    broker = MiniBroker(args.host, args.port).start()
+    print(f"[BROKER] Listening on {broker.address[0]}:{broker.address[1]}", flush=True)
+    last = broker.stats()
+    try:
+        while True:
+            time.sleep(args.report_seconds)
+            now = broker.stats()
+            rate = (now["messages_received"] - last["messages_received"]) / args.report_seconds
+            print(f"[BROKER] {now['clients']} clients, {rate:.1f} msg/s, {now['retained']} retained topics", flush=True)
+            last = now
+    except KeyboardInterrupt:
+        broker.stop()